@@ -0,0 +1,252 @@
+# Background jobs that run off the request path
+
+import os
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Dict
+from dotenv import load_dotenv
+
+from steam_api import fetchGameDetailsWithRetry, fetchPriceOverviews, formatPrice, formatSalePrice
+from rate_limiter import PRIORITY_BACKGROUND
+from deadline import Deadline
+from single_flight import singleFlight, WORKER_ID
+from metrics import incrementCounter
+from db_helper import (
+    getTopOwnedGameIds,
+    getCachedGameDetails,
+    cacheGameDetails,
+    setStaleGameHandler,
+    getPriceRefreshGameIds,
+    updateGamePrices,
+    acquireJobLease,
+)
+
+# Load environment variables
+load_dotenv()
+
+# Job Configuration
+BACKGROUND_JOBS_ENABLED = os.getenv("BACKGROUND_JOBS_ENABLED", "true").lower() == "true"
+BACKGROUND_JOB_WORKERS = int(os.getenv("BACKGROUND_JOB_WORKERS", "4"))
+
+# Number of most-played games to prefetch details for (the profile uses the top 10)
+WARMUP_TOP_GAMES = int(os.getenv("WARMUP_TOP_GAMES", "10"))
+
+# How often the periodic job thread checks for due jobs (seconds)
+PERIODIC_JOB_TICK_SECONDS = float(os.getenv("PERIODIC_JOB_TICK_SECONDS", "60"))
+
+# Price refresh (one multi-appid request per batch)
+PRICE_REFRESH_INTERVAL_MINUTES = int(os.getenv("PRICE_REFRESH_INTERVAL_MINUTES", "60"))
+PRICE_REFRESH_MAX_AGE_HOURS = int(os.getenv("PRICE_REFRESH_MAX_AGE_HOURS", "24"))
+PRICE_REFRESH_BATCH_SIZE = int(os.getenv("PRICE_REFRESH_BATCH_SIZE", "200"))
+PRICE_REFRESH_MAX_GAMES = int(os.getenv("PRICE_REFRESH_MAX_GAMES", "2000"))
+
+_executor = ThreadPoolExecutor(max_workers=BACKGROUND_JOB_WORKERS, thread_name_prefix="steampal-job")
+
+# Keys of queued or running jobs (so the same job isn't queued twice)
+_pendingJobs = set()
+_pendingJobsLock = threading.Lock()
+
+
+def submitJob(jobKey: str, job: Callable, *args, onDone: Optional[Callable[[], None]] = None) -> bool:
+    """
+    Queue a job on the background pool
+    onDone (if given) runs once the job's key is released, e.g. to requeue work that
+    arrived while it ran
+    Returns False if jobs are disabled or the same job is already pending
+    """
+    if not BACKGROUND_JOBS_ENABLED:
+        return False
+
+    with _pendingJobsLock:
+        if jobKey in _pendingJobs:
+            return False
+        _pendingJobs.add(jobKey)
+
+    def run():
+        try:
+            job(*args)
+        except Exception as e:
+            print(f"[BackgroundJobs] Job {jobKey} failed: {e}")
+        finally:
+            with _pendingJobsLock:
+                _pendingJobs.discard(jobKey)
+
+        if onDone:
+            try:
+                onDone()
+            except Exception as e:
+                print(f"[BackgroundJobs] Job {jobKey} follow-up failed: {e}")
+
+    _executor.submit(run)
+    return True
+
+
+# GAME DETAILS WARM-UP
+def fetchAndCacheGameDetails(
+    gameId: str,
+    priority: str = PRIORITY_BACKGROUND,
+    deadline: Optional[Deadline] = None
+) -> Optional[Dict]:
+    """
+    Fetch game details from Steam API and cache them
+    Shared by background warm-ups and request-path cache misses
+    """
+    gameData = fetchGameDetailsWithRetry(gameId, priority=priority, deadline=deadline)
+
+    if gameData:
+        cacheGameDetails(gameId, gameData)
+
+    return gameData
+
+
+def warmUpGameDetails(steamId: str, topN: int = WARMUP_TOP_GAMES) -> int:
+    """
+    Prefetch details for user's most-played games so their profile has genres
+    Returns number of games fetched
+    """
+    warmed = 0
+
+    for gameId in getTopOwnedGameIds(steamId, topN):
+        if getCachedGameDetails(gameId):
+            continue
+
+        gameData = singleFlight(
+            f"appdetails:{gameId}",
+            lambda: fetchAndCacheGameDetails(gameId),
+            lambda: getCachedGameDetails(gameId)
+        )
+
+        if gameData:
+            warmed += 1
+
+    print(f"[BackgroundJobs] Warmed {warmed} game details for user {steamId}")
+    return warmed
+
+
+def scheduleGameDetailsWarmUp(steamId: str) -> bool:
+    """
+    Queue a game details warm-up for a user
+    """
+    return submitJob(f"warmup:{steamId}", warmUpGameDetails, steamId)
+
+
+# STALE GAME DETAILS REFRESH
+def refreshGameDetails(gameId: str) -> Optional[Dict]:
+    """
+    Refetch details for a stale cache entry
+    """
+    # Workers share the fetch; only a fresh entry counts as done
+    gameData = singleFlight(
+        f"appdetails:{gameId}",
+        lambda: fetchAndCacheGameDetails(gameId),
+        lambda: getCachedGameDetails(gameId, hardMaxAgeHours=0)
+    )
+
+    incrementCounter("gameCacheRefreshes" if gameData else "gameCacheRefreshFailures")
+    return gameData
+
+
+def scheduleGameDetailsRefresh(gameId: str) -> bool:
+    """
+    Queue a refresh for a stale game details entry
+    """
+    return submitJob(f"refresh:{gameId}", refreshGameDetails, gameId)
+
+
+# PRICE REFRESH
+def refreshPrices(maxGames: int = PRICE_REFRESH_MAX_GAMES, batchSize: int = PRICE_REFRESH_BATCH_SIZE) -> int:
+    """
+    Refresh prices for liked, recently recommended and cached games
+    Returns number of games updated
+    """
+    gameIds = getPriceRefreshGameIds(maxGames, PRICE_REFRESH_MAX_AGE_HOURS)
+    updated = 0
+
+    for start in range(0, len(gameIds), batchSize):
+        prices = fetchPriceOverviews(gameIds[start:start + batchSize])
+
+        if prices is None:
+            # Steam is unhealthy or throttling - try again next run
+            incrementCounter("priceRefreshFailures")
+            break
+
+        displayPrices = {
+            gameId: (formatPrice(priceOverview), formatSalePrice(priceOverview))
+            for gameId, priceOverview in prices.items()
+        }
+        updated += updateGamePrices(prices, displayPrices)
+
+    incrementCounter("priceRefreshGames", updated)
+    print(f"[BackgroundJobs] Refreshed prices for {updated} games")
+    return updated
+
+
+def schedulePriceRefresh() -> bool:
+    """
+    Queue a price refresh
+    """
+    return submitJob("priceRefresh", refreshPrices)
+
+
+# PERIODIC JOBS
+# name -> (interval seconds, function that queues the job)
+_periodicJobs: Dict[str, tuple] = {}
+_periodicThread: Optional[threading.Thread] = None
+_periodicStop = threading.Event()
+
+
+def registerPeriodicJob(name: str, intervalSeconds: float, scheduleFn: Callable[[], bool]) -> None:
+    """
+    Queue a job every intervalSeconds (0 disables it)
+    Called from the app's startup hook, before startPeriodicJobs
+    """
+    if intervalSeconds > 0:
+        _periodicJobs[name] = (intervalSeconds, scheduleFn)
+
+
+def runPeriodicJobs() -> None:
+    """
+    Queue periodic jobs until stopped
+    The lease lasts one interval, so only one worker runs each job per interval
+    """
+    while not _periodicStop.is_set():
+        for name, (intervalSeconds, scheduleFn) in list(_periodicJobs.items()):
+            # One failing tick (e.g. "database is locked") must not stop every periodic job
+            try:
+                if acquireJobLease(name, WORKER_ID, intervalSeconds):
+                    scheduleFn()
+            except Exception as e:
+                print(f"[BackgroundJobs] Periodic job {name} failed to schedule: {e}")
+                incrementCounter("periodicJobErrors")
+
+        _periodicStop.wait(PERIODIC_JOB_TICK_SECONDS)
+
+
+def startPeriodicJobs() -> bool:
+    """
+    Start the periodic job thread (once per process)
+    """
+    global _periodicThread
+
+    if not BACKGROUND_JOBS_ENABLED or not _periodicJobs:
+        return False
+
+    if _periodicThread and _periodicThread.is_alive():
+        return False
+
+    _periodicStop.clear()
+    _periodicThread = threading.Thread(target=runPeriodicJobs, name="steampal-periodic", daemon=True)
+    _periodicThread.start()
+    return True
+
+
+def stopPeriodicJobs() -> None:
+    """
+    Stop the periodic job thread
+    """
+    _periodicStop.set()
+
+
+# Stale cache reads anywhere in the app queue a refresh here
+setStaleGameHandler(scheduleGameDetailsRefresh)
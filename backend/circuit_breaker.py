@@ -0,0 +1,185 @@
+# Circuit breakers around external dependencies (Steam, Gemini)
+
+import os
+import threading
+import time
+
+from typing import Dict
+from dotenv import load_dotenv
+
+from metrics import incrementCounter
+
+# Load environment variables
+load_dotenv()
+
+# Dependencies
+STEAM_STORE_CIRCUIT = "steam_store"      # store.steampowered.com (appdetails)
+STEAM_WEB_API_CIRCUIT = "steam_web_api"  # api.steampowered.com (owned games, profiles)
+GEMINI_CIRCUIT = "gemini"
+
+# States
+CLOSED = "closed"        # Calls go through
+OPEN = "open"            # Calls fail fast until the cool-down ends
+HALF_OPEN = "half_open"  # A trial call decides whether to close again
+
+# Defaults (override per dependency, e.g. GEMINI_CIRCUIT_FAILURE_THRESHOLD)
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_COOLDOWN_SECONDS = float(os.getenv("CIRCUIT_COOLDOWN_SECONDS", "30"))
+# A half-open trial call that never reports back frees its slot after this long
+CIRCUIT_PROBE_TIMEOUT_SECONDS = float(os.getenv("CIRCUIT_PROBE_TIMEOUT_SECONDS", "60"))
+
+
+class CircuitBreaker:
+    """
+    Per-process circuit breaker for one dependency
+    """
+    def __init__(
+        self,
+        name: str,
+        failureThreshold: int,
+        cooldownSeconds: float,
+        halfOpenMaxCalls: int = 1,
+        probeTimeoutSeconds: float = CIRCUIT_PROBE_TIMEOUT_SECONDS
+    ):
+        """
+        Initialize breaker in the closed state
+        """
+        self.name = name
+        self.failureThreshold = failureThreshold
+        self.cooldownSeconds = cooldownSeconds
+        self.halfOpenMaxCalls = halfOpenMaxCalls
+        self.probeTimeoutSeconds = probeTimeoutSeconds
+
+        self._state = CLOSED
+        self._consecutiveFailures = 0
+        self._openedAt = 0.0
+        self._halfOpenCalls = 0
+        self._probeStartedAt = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """
+        Current state (an open breaker turns half-open after the cool-down)
+        """
+        with self._lock:
+            self._checkCooldown()
+            return self._state
+
+    def allowRequest(self) -> bool:
+        """
+        Check if a call may go to the dependency
+        In half-open state this takes a trial slot: the caller must end with
+        recordSuccess(), recordFailure() or release()
+        """
+        with self._lock:
+            self._checkCooldown()
+
+            if self._state == CLOSED:
+                return True
+
+            if self._state == HALF_OPEN and self._halfOpenCalls < self.halfOpenMaxCalls:
+                self._halfOpenCalls += 1
+                self._probeStartedAt = time.monotonic()
+                return True
+
+            incrementCounter(f"circuit.{self.name}.rejected")
+            return False
+
+    def recordSuccess(self) -> None:
+        """
+        Record a healthy response
+        """
+        with self._lock:
+            if self._state != CLOSED:
+                print(f"[CircuitBreaker] {self.name} closed")
+            self._state = CLOSED
+            self._consecutiveFailures = 0
+            self._halfOpenCalls = 0
+
+    def release(self) -> None:
+        """
+        Give back a trial slot for a call that ended without a verdict
+        (rate limit wait, deadline, client error); a no-op once the call was recorded
+        """
+        with self._lock:
+            if self._state == HALF_OPEN and self._halfOpenCalls > 0:
+                self._halfOpenCalls -= 1
+
+    def recordFailure(self) -> None:
+        """
+        Record a failed call (timeout, connection error, 5xx, 429)
+        """
+        with self._lock:
+            self._consecutiveFailures += 1
+
+            if self._state == HALF_OPEN or self._consecutiveFailures >= self.failureThreshold:
+                if self._state != OPEN:
+                    print(f"[CircuitBreaker] {self.name} opened after {self._consecutiveFailures} failures")
+                    incrementCounter(f"circuit.{self.name}.opened")
+                self._state = OPEN
+                self._openedAt = time.monotonic()
+                self._halfOpenCalls = 0
+
+    def _checkCooldown(self) -> None:
+        """
+        Move from open to half-open once the cool-down has passed (lock held)
+        """
+        if self._state == OPEN and time.monotonic() - self._openedAt >= self.cooldownSeconds:
+            self._state = HALF_OPEN
+            self._halfOpenCalls = 0
+
+        # A trial call that never reported back (e.g. a crashed caller) doesn't hold the slot forever
+        if (
+            self._state == HALF_OPEN
+            and self._halfOpenCalls > 0
+            and time.monotonic() - self._probeStartedAt >= self.probeTimeoutSeconds
+        ):
+            print(f"[CircuitBreaker] {self.name} trial call never reported, allowing another")
+            incrementCounter(f"circuit.{self.name}.probeExpired")
+            self._halfOpenCalls = 0
+
+
+# Process-wide breakers
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakersLock = threading.Lock()
+
+
+def getCircuitBreaker(name: str) -> CircuitBreaker:
+    """
+    Get (or create) the breaker for a dependency
+    """
+    with _breakersLock:
+        if name not in _breakers:
+            prefix = name.upper()
+            _breakers[name] = CircuitBreaker(
+                name,
+                failureThreshold=int(os.environ.get(f"{prefix}_CIRCUIT_FAILURE_THRESHOLD", CIRCUIT_FAILURE_THRESHOLD)),
+                cooldownSeconds=float(os.environ.get(f"{prefix}_CIRCUIT_COOLDOWN_SECONDS", CIRCUIT_COOLDOWN_SECONDS)),
+                probeTimeoutSeconds=float(os.environ.get(f"{prefix}_CIRCUIT_PROBE_TIMEOUT_SECONDS", CIRCUIT_PROBE_TIMEOUT_SECONDS)),
+            )
+        return _breakers[name]
+
+
+def isCircuitOpen(name: str) -> bool:
+    """
+    Check if calls to a dependency are currently failing fast
+    """
+    return getCircuitBreaker(name).state == OPEN
+
+
+def getCircuitStates() -> Dict[str, str]:
+    """
+    Get state of every breaker
+    """
+    with _breakersLock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.state for breaker in breakers}
+
+
+def resetCircuitBreakers() -> None:
+    """
+    Drop all breakers (they are recreated closed on next use)
+    """
+    with _breakersLock:
+        _breakers.clear()
@@ -2,13 +2,40 @@
 
 import sqlite3
 import json
+import os
+import sys
 import time
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
+from dotenv import load_dotenv
 
+from metrics import incrementCounter
+
+# Load environment variables
+load_dotenv()
 
 DB_FILE = "steampal.db"
 
+# Game details cache policy (stale-while-revalidate)
+# Entries older than the soft TTL are still served while a refresh runs
+# Entries older than the hard TTL are treated as missing
+GAME_CACHE_SOFT_TTL_HOURS = int(os.getenv("GAME_CACHE_SOFT_TTL_HOURS", "168"))
+GAME_CACHE_HARD_TTL_HOURS = int(os.getenv("GAME_CACHE_HARD_TTL_HOURS", "720"))
+
+# appdetails fields kept in the cache (transformGameData, favorite genres, fallback scoring)
+GAME_DETAILS_FIELDS = [
+    field.strip()
+    for field in os.getenv(
+        "GAME_DETAILS_FIELDS",
+        "type,name,steam_appid,is_free,short_description,header_image,developers,"
+        "publishers,price_overview,release_date,genres,categories"
+    ).split(",")
+    if field.strip()
+]
+
+# Called with the gameId whenever a stale entry is served
+_staleGameHandler: Optional[Callable[[str], None]] = None
+
 
 def getConnection():
     """
@@ -39,6 +66,15 @@ def initDatabase():
             )
         """)
         
+        # Steam player summaries cache table (GetPlayerSummaries)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS playerSummaries (
+                steamId TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                cachedAt INTEGER NOT NULL
+            )
+        """)
+        
         # Recommendation table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS recommendations (
@@ -87,6 +123,30 @@ def initDatabase():
             )
         """)
         
+        # Library sync status table
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS librarySync (
+                steamId TEXT PRIMARY KEY,
+                status TEXT NOT NULL CHECK(status IN ('pending', 'syncing', 'ready', 'failed')),
+                gameCount INTEGER DEFAULT 0,
+                startedAt INTEGER,
+                finishedAt INTEGER,
+                error TEXT,
+                FOREIGN KEY (steamId) REFERENCES users(steamId)
+            )
+        """)
+        
+        # Library fingerprint table (skip full refreshes of unchanged libraries)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS libraryFingerprints (
+                steamId TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                gameCount INTEGER DEFAULT 0,
+                fullSyncAt INTEGER NOT NULL,
+                FOREIGN KEY (steamId) REFERENCES users(steamId)
+            )
+        """)
+        
         # Game details cache table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS gameCache (
@@ -96,6 +156,47 @@ def initDatabase():
             )
         """)
 
+        # Price refresh tracking table (prices refresh more often than details)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS gamePrices (
+                gameId TEXT PRIMARY KEY,
+                refreshedAt INTEGER NOT NULL
+            )
+        """)
+
+        # LLM candidate cache table (ranked candidates per profile fingerprint)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS llmCandidateCache (
+                cacheKey TEXT PRIMARY KEY,
+                candidates TEXT NOT NULL,
+                createdAt INTEGER NOT NULL
+            )
+        """)
+
+        # Ready-to-serve recommendations per user and genre selection
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS recommendationQueue (
+                queueId INTEGER PRIMARY KEY AUTOINCREMENT,
+                steamId TEXT NOT NULL,
+                genresKey TEXT NOT NULL,
+                gameId TEXT NOT NULL,
+                recommendation TEXT NOT NULL,
+                createdAt INTEGER NOT NULL,
+                UNIQUE(steamId, genresKey, gameId),
+                FOREIGN KEY (steamId) REFERENCES users(steamId)
+            )
+        """)
+
+        # Bumped whenever a user's queue is invalidated, so refills in any worker
+        # can tell their picks were generated against an old library or dislikes
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS recommendationQueueGenerations (
+                steamId TEXT PRIMARY KEY,
+                generation INTEGER NOT NULL DEFAULT 0,
+                FOREIGN KEY (steamId) REFERENCES users(steamId)
+            )
+        """)
+
         # User events table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS userEvents (
@@ -118,6 +219,43 @@ def initDatabase():
             )
         """)
         
+        # Shared rate limiter buckets table
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS rateLimitBuckets (
+                bucket TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updatedAt REAL NOT NULL,
+                blockedUntil REAL DEFAULT 0
+            )
+        """)
+        
+        # Cross-worker fetch leases table (single-flight)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS fetchLeases (
+                leaseKey TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expiresAt REAL NOT NULL
+            )
+        """)
+        
+        # Periodic job leases (one worker runs each job per interval)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS jobLeases (
+                jobName TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expiresAt REAL NOT NULL
+            )
+        """)
+        
+        # Steam app catalog table (appid -> title index)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS apps (
+                gameId TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                normalizedTitle TEXT NOT NULL
+            )
+        """)
+        
         # Create indexes for performance
         cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_recommendations_user 
@@ -139,6 +277,11 @@ def initDatabase():
             ON ownedGames(steamId, playtimeForever DESC)
         """)
 
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_apps_title
+            ON apps(normalizedTitle)
+        """)
+
         cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_filter_genres_user
             on filterGenres(steamId)
@@ -208,6 +351,101 @@ def getUser(steamId: str) -> Optional[Dict]:
         conn.close()
 
 
+# Player Summary Cache Functions
+def cachePlayerSummaries(players: List[Dict]) -> int:
+    """
+    Cache GetPlayerSummaries results and update name/avatar of known users
+    Returns number of profiles stored
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+    
+    try:
+        currentTime = int(time.time())
+        players = [player for player in players if player.get('steamid')]
+
+        cursor.executemany("""
+            INSERT OR REPLACE INTO playerSummaries (steamId, summary, cachedAt)
+            VALUES (?, ?, ?)
+        """, [(player['steamid'], json.dumps(player), currentTime) for player in players])
+
+        cursor.executemany("""
+            UPDATE users SET displayName = ?, avatarUrl = ?, profileUrl = ?
+            WHERE steamId = ?
+        """, [
+            (
+                player.get('personaname', 'Unknown'),
+                player.get('avatarfull', ''),
+                player.get('profileurl', ''),
+                player['steamid']
+            )
+            for player in players
+        ])
+        
+        conn.commit()
+        return len(players)
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"Error caching player summaries: {e}")
+        return 0
+    finally:
+        conn.close()
+
+def getCachedPlayerSummary(steamId: str) -> Optional[Dict]:
+    """
+    Get cached player summary with its cache time (None if never cached)
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            SELECT summary, cachedAt FROM playerSummaries WHERE steamId = ?
+        """, (steamId,))
+        row = cursor.fetchone()
+        
+        if not row:
+            return None
+
+        return {
+            'summary': json.loads(row['summary']),
+            'cachedAt': row['cachedAt']
+        }
+        
+    except Exception as e:
+        print(f"Error getting player summary: {e}")
+        return None
+    finally:
+        conn.close()
+
+def getStalePlayerSummaryIds(maxAgeHours: int, activeDays: int, limit: int) -> List[str]:
+    """
+    Get recently active users whose cached summary is missing or older than maxAgeHours
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+    
+    try:
+        currentTime = int(time.time())
+
+        cursor.execute("""
+            SELECT u.steamId FROM users u
+            LEFT JOIN playerSummaries p ON p.steamId = u.steamId
+            WHERE u.lastLogin >= ? AND COALESCE(p.cachedAt, 0) < ?
+            ORDER BY u.lastLogin DESC
+            LIMIT ?
+        """, (currentTime - activeDays * 86400, currentTime - maxAgeHours * 3600, limit))
+        
+        return [row['steamId'] for row in cursor.fetchall()]
+        
+    except Exception as e:
+        print(f"Error getting stale player summaries: {e}")
+        return []
+    finally:
+        conn.close()
+
+
 # Owned Cached Games Functions
 def cacheOwnedGames(steamId: str, games: List[Dict]) -> bool:
     """
@@ -271,6 +509,131 @@ def getOwnedGamesIds(steamId: str) -> List[str]:
     finally:
         conn.close()
 
+def getOwnedGamesPlaytime(steamId: str) -> Dict[str, int]:
+    """
+    Get cached total playtime (minutes) per owned game
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            SELECT gameId, playtimeForever FROM ownedGames
+            WHERE steamId = ?
+        """, (steamId,))
+        
+        rows = cursor.fetchall()
+        return {row['gameId']: row['playtimeForever'] for row in rows}
+        
+    except Exception as e:
+        print(f"Error fetching owned games playtime: {e}")
+        return {}
+    finally:
+        conn.close()
+
+def touchOwnedGamesCache(steamId: str, recentGames: List[Dict]) -> bool:
+    """
+    Mark owned games cache as fresh without rewriting it
+    Updates 2-week playtime from recently played games
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+    
+    try:
+        currentTime = int(time.time())
+
+        cursor.execute("""
+            UPDATE ownedGames SET cachedAt = ?, playtime2Weeks = 0
+            WHERE steamId = ?
+        """, (currentTime, steamId))
+
+        cursor.executemany("""
+            UPDATE ownedGames SET playtime2Weeks = ?
+            WHERE steamId = ? AND gameId = ?
+        """, [
+            (game.get('playtime_2weeks', 0), steamId, str(game.get('appid', '')))
+            for game in recentGames
+        ])
+        
+        conn.commit()
+        return True
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"Error touching owned games cache: {e}")
+        return False
+    finally:
+        conn.close()
+
+def saveLibraryFingerprint(steamId: str, fingerprint: str, gameCount: int) -> bool:
+    """
+    Save fingerprint of user's library from a full sync
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            INSERT OR REPLACE INTO libraryFingerprints
+            (steamId, fingerprint, gameCount, fullSyncAt)
+            VALUES (?, ?, ?, ?)
+        """, (steamId, fingerprint, gameCount, int(time.time())))
+        
+        conn.commit()
+        return True
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"Error saving library fingerprint: {e}")
+        return False
+    finally:
+        conn.close()
+
+def getLibraryFingerprint(steamId: str) -> Optional[Dict]:
+    """
+    Get fingerprint of user's library from the last full sync
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            SELECT * FROM libraryFingerprints WHERE steamId = ?
+        """, (steamId,))
+        
+        row = cursor.fetchone()
+        return dict(row) if row else None
+        
+    except Exception as e:
+        print(f"Error getting library fingerprint: {e}")
+        return None
+    finally:
+        conn.close()
+
+def getTopOwnedGameIds(steamId: str, limit: int = 10) -> List[str]:
+    """
+    Get IDs of user's most-played owned games
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            SELECT gameId FROM ownedGames
+            WHERE steamId = ?
+            ORDER BY playtimeForever DESC
+            LIMIT ?
+        """, (steamId, limit))
+        
+        rows = cursor.fetchall()
+        return [row['gameId'] for row in rows]
+        
+    except Exception as e:
+        print(f"Error fetching top owned game IDs: {e}")
+        return []
+    finally:
+        conn.close()
+
 def isOwnedGamesCacheRecent(steamId: str, maxAgeHours: int = 24) -> bool:
     """Check if owned games cache is recent enough"""
     conn = getConnection()
@@ -304,6 +667,65 @@ def isOwnedGamesCacheRecent(steamId: str, maxAgeHours: int = 24) -> bool:
     finally:
         conn.close()
 
+def saveLibrarySyncStatus(
+    steamId: str,
+    status: str,
+    gameCount: int = None,
+    error: str = None
+) -> bool:
+    """
+    Save progress of a user's owned games sync
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+    
+    try:
+        currentTime = int(time.time())
+        startedAt = currentTime if status in ('pending', 'syncing') else None
+        finishedAt = currentTime if status in ('ready', 'failed') else None
+
+        cursor.execute("""
+            INSERT INTO librarySync (steamId, status, gameCount, startedAt, finishedAt, error)
+            VALUES (?, ?, COALESCE(?, 0), ?, ?, ?)
+            ON CONFLICT(steamId) DO UPDATE SET
+                status = excluded.status,
+                gameCount = COALESCE(?, librarySync.gameCount),
+                startedAt = COALESCE(excluded.startedAt, librarySync.startedAt),
+                finishedAt = excluded.finishedAt,
+                error = excluded.error
+        """, (steamId, status, gameCount, startedAt, finishedAt, error, gameCount))
+        
+        conn.commit()
+        return True
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"Error saving library sync status: {e}")
+        return False
+    finally:
+        conn.close()
+
+def getLibrarySyncStatus(steamId: str) -> Optional[Dict]:
+    """
+    Get progress of a user's owned games sync
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            SELECT * FROM librarySync WHERE steamId = ?
+        """, (steamId,))
+        
+        row = cursor.fetchone()
+        return dict(row) if row else None
+        
+    except Exception as e:
+        print(f"Error getting library sync status: {e}")
+        return None
+    finally:
+        conn.close()
+
 def getUserGamingProfile(steamId: str) -> Dict:
     """
     Analyze user's gaming preferences from cached owned games
@@ -330,7 +752,9 @@ def getUserGamingProfile(steamId: str) -> Dict:
                 'recentlyActiveGames': [],
                 'gameCount': 0,
                 'mostPlayedGames': [],
-                'favoriteGenres': []
+                'favoriteGenres': [],
+                'ownedGameIds': [],
+                **getPromptExclusionGames(steamId)
             }
 
         # Convert to list
@@ -371,7 +795,10 @@ def getUserGamingProfile(steamId: str) -> Dict:
             'recentlyActiveGames': recentlyActiveGames,
             'gameCount': len(games),
             'mostPlayedGames': mostPlayedGames,
-            'favoriteGenres': favoriteGenres
+            'favoriteGenres': favoriteGenres,
+            # Every owned game, most played first (ranks raw exclusions in the AI prompt)
+            'ownedGameIds': [str(game['gameId']) for game in games],
+            **getPromptExclusionGames(steamId)
         }
         
     except Exception as e:
@@ -384,7 +811,65 @@ def getUserGamingProfile(steamId: str) -> Dict:
             'recentlyActiveGames': [],
             'gameCount': 0,
             'mostPlayedGames': [],
-            'favoriteGenres': []
+            'favoriteGenres': [],
+            'ownedGameIds': [],
+            **getPromptExclusionGames(steamId)
+        }
+    finally:
+        conn.close()
+
+def getPromptExclusionGames(steamId: str, limit: int = 50) -> Dict:
+    """
+    Most recent recommendations and dislikes as (gameId, title) tuples, newest first,
+    plus every recommended gameId newest first
+    Used to rank which exclusions are worth spelling out in the AI prompt
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+            SELECT gameId, title FROM recommendations
+            WHERE steamId = ?
+            ORDER BY createdAt DESC
+            LIMIT ?
+        """, (steamId, limit))
+        recentRecommendations = [(str(row['gameId']), row['title']) for row in cursor.fetchall()]
+
+        cursor.execute("""
+            SELECT gameId FROM recommendations
+            WHERE steamId = ?
+            ORDER BY createdAt DESC
+        """, (steamId,))
+        recommendedGameIds = [str(row['gameId']) for row in cursor.fetchall()]
+
+        cursor.execute("""
+            SELECT p.gameId,
+                   COALESCE(
+                       (SELECT r.title FROM recommendations r
+                        WHERE r.steamId = p.steamId AND r.gameId = p.gameId LIMIT 1),
+                       a.name
+                   ) AS title
+            FROM preferences p
+            LEFT JOIN apps a ON a.gameId = p.gameId
+            WHERE p.steamId = ? AND p.preference = 'disliked'
+            ORDER BY p.createdAt DESC
+            LIMIT ?
+        """, (steamId, limit))
+        dislikedGames = [(str(row['gameId']), row['title']) for row in cursor.fetchall() if row['title']]
+
+        return {
+            'recentRecommendations': recentRecommendations,
+            'dislikedGames': dislikedGames,
+            'recommendedGameIds': recommendedGameIds
+        }
+
+    except Exception as e:
+        print(f"Error getting prompt exclusion games: {e}")
+        return {
+            'recentRecommendations': [],
+            'dislikedGames': [],
+            'recommendedGameIds': []
         }
     finally:
         conn.close()
@@ -428,6 +913,13 @@ def getUserFavoriteGenres(steamId: str, topGames: List[tuple]) -> List[str]:
 
 
 # Game Details Cache Funtions
+def trimGameData(gameData: Dict) -> Dict:
+    """
+    Keep only whitelisted appdetails fields
+    """
+    return {field: gameData[field] for field in GAME_DETAILS_FIELDS if field in gameData}
+
+
 def cacheGameDetails(gameId: str, gameData: Dict) -> bool:
     """
     Cache game details from Steam API (expires after 7 days by default)
@@ -437,6 +929,7 @@ def cacheGameDetails(gameId: str, gameData: Dict) -> bool:
     
     try:
         currentTime = int(time.time())
+        gameData = trimGameData(gameData)
         
         cursor.execute("""
             INSERT OR REPLACE INTO gameCache
@@ -459,33 +952,400 @@ def cacheGameDetails(gameId: str, gameData: Dict) -> bool:
         conn.close()
 
 
-def getCachedGameDetails(gameId: str, maxAgeHours: int = 168) -> Optional[Dict]:
+def setStaleGameHandler(handler: Optional[Callable[[str], None]]) -> None:
+    """
+    Register the callback that schedules a refresh for a stale cache entry
+    """
+    global _staleGameHandler
+    _staleGameHandler = handler
+
+
+def getCachedGameDetails(
+    gameId: str,
+    maxAgeHours: int = GAME_CACHE_SOFT_TTL_HOURS,
+    hardMaxAgeHours: int = GAME_CACHE_HARD_TTL_HOURS
+) -> Optional[Dict]:
     """
     Get cached game details (returns None if expired or not found)
-    Default expiry: 7 days (168 hours)
+    Entries between maxAgeHours and hardMaxAgeHours are returned stale
+    and a background refresh is requested
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+    
+    try:
+        currentTime = int(time.time())
+        maxAgeSeconds = max(maxAgeHours, hardMaxAgeHours) * 3600
+
+        cursor.execute("""
+            SELECT gameData, cachedAt FROM gameCache
+            WHERE gameId = ? AND (? - cachedAt) < ?
+        """, (gameId, currentTime, maxAgeSeconds))
+
+        row = cursor.fetchone()
+        
+        if not row:
+            incrementCounter("gameCacheMisses")
+            return None
+
+        if currentTime - row['cachedAt'] >= maxAgeHours * 3600:
+            # Serve stale entry, refresh off the request path
+            incrementCounter("gameCacheStaleServes")
+            if _staleGameHandler:
+                _staleGameHandler(gameId)
+        else:
+            incrementCounter("gameCacheHits")
+
+        return json.loads(row['gameData'])
+        
+    except Exception as e:
+        print(f"Error fetching cached game: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def getCachedGameDetailsMany(
+    gameIds: List[str],
+    maxAgeHours: int = GAME_CACHE_SOFT_TTL_HOURS,
+    hardMaxAgeHours: int = GAME_CACHE_HARD_TTL_HOURS
+) -> Dict[str, Dict]:
+    """
+    getCachedGameDetails for several games in one query
+    Returns {gameId: gameData} for the games found (missing and expired ones are left out)
+    """
+    if not gameIds:
+        return {}
+
+    conn = getConnection()
+    cursor = conn.cursor()
+
+    try:
+        currentTime = int(time.time())
+        maxAgeSeconds = max(maxAgeHours, hardMaxAgeHours) * 3600
+        placeholders = ",".join("?" * len(gameIds))
+
+        cursor.execute(f"""
+            SELECT gameId, gameData, cachedAt FROM gameCache
+            WHERE gameId IN ({placeholders}) AND (? - cachedAt) < ?
+        """, (*gameIds, currentTime, maxAgeSeconds))
+
+        games = {}
+        for row in cursor.fetchall():
+            gameId = str(row['gameId'])
+            games[gameId] = json.loads(row['gameData'])
+
+            if currentTime - row['cachedAt'] >= maxAgeHours * 3600:
+                # Serve stale entry, refresh off the request path
+                incrementCounter("gameCacheStaleServes")
+                if _staleGameHandler:
+                    _staleGameHandler(gameId)
+            else:
+                incrementCounter("gameCacheHits")
+
+        incrementCounter("gameCacheMisses", len(set(gameIds)) - len(games))
+        return games
+
+    except Exception as e:
+        print(f"Error fetching cached games: {e}")
+        return {}
+    finally:
+        conn.close()
+
+
+def getCachedGames(
+    limit: int = 5000,
+    hardMaxAgeHours: int = GAME_CACHE_HARD_TTL_HOURS
+) -> Dict[str, Dict]:
+    """
+    Get unexpired cached game details by gameId, most recently cached first
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+
+    try:
+        currentTime = int(time.time())
+
+        cursor.execute("""
+            SELECT gameId, gameData FROM gameCache
+            WHERE (? - cachedAt) < ?
+            ORDER BY cachedAt DESC
+            LIMIT ?
+        """, (currentTime, hardMaxAgeHours * 3600, limit))
+
+        return {str(row['gameId']): json.loads(row['gameData']) for row in cursor.fetchall()}
+
+    except Exception as e:
+        print(f"Error fetching cached games: {e}")
+        return {}
+    finally:
+        conn.close()
+
+
+def trimGameCache() -> int:
+    """
+    Strip non-whitelisted fields from existing cache rows (keeps cachedAt)
+    Returns number of rows rewritten
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("SELECT gameId, gameData FROM gameCache")
+        rows = cursor.fetchall()
+
+        trimmed = 0
+        for row in rows:
+            gameData = json.loads(row['gameData'])
+            trimmedData = trimGameData(gameData)
+
+            if len(trimmedData) == len(gameData):
+                continue
+
+            cursor.execute("""
+                UPDATE gameCache SET gameData = ? WHERE gameId = ?
+            """, (json.dumps(trimmedData), row['gameId']))
+            trimmed += 1
+
+        conn.commit()
+        return trimmed
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"Error trimming game cache: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+# Price Refresh Functions
+def getPriceRefreshGameIds(limit: int, maxAgeHours: int, recentDays: int = 30) -> List[str]:
+    """
+    Get games whose prices are older than maxAgeHours
+    Liked games first, then recent recommendations, then other cached games
     """
     conn = getConnection()
     cursor = conn.cursor()
     
     try:
         currentTime = int(time.time())
-        maxAgeSeconds = maxAgeHours * 3600
 
-        cursor.execute("""
-            SELECT gameData, cachedAt FROM gameCache
-            WHERE gameId = ? AND (? - cachedAt) < ?
-        """, (gameId, currentTime, maxAgeSeconds))
+        cursor.execute("""
+            SELECT c.gameId, MIN(c.priority) AS priority, MAX(c.recency) AS recency
+            FROM (
+                SELECT gameId, 0 AS priority, createdAt AS recency
+                FROM preferences WHERE preference = 'liked'
+                UNION ALL
+                SELECT gameId, 1 AS priority, createdAt AS recency
+                FROM recommendations WHERE createdAt >= ?
+                UNION ALL
+                SELECT gameId, 2 AS priority, cachedAt AS recency
+                FROM gameCache
+            ) c
+            LEFT JOIN gamePrices p ON p.gameId = c.gameId
+            LEFT JOIN gameCache g ON g.gameId = c.gameId
+            WHERE MAX(COALESCE(p.refreshedAt, 0), COALESCE(g.cachedAt, 0)) <= ?
+            GROUP BY c.gameId
+            ORDER BY priority, recency DESC
+            LIMIT ?
+        """, (currentTime - recentDays * 86400, currentTime - maxAgeHours * 3600, limit))
+        
+        return [row['gameId'] for row in cursor.fetchall()]
+        
+    except Exception as e:
+        print(f"Error getting price refresh games: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def updateGamePrices(prices: Dict[str, Optional[Dict]], displayPrices: Dict[str, tuple]) -> int:
+    """
+    Update only price fields: price_overview in cached details and
+    (price, salePrice) on saved recommendations
+    Returns number of games updated
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+    
+    try:
+        currentTime = int(time.time())
+
+        for gameId, priceOverview in prices.items():
+            cursor.execute("SELECT gameData FROM gameCache WHERE gameId = ?", (gameId,))
+            row = cursor.fetchone()
+
+            # cachedAt is left alone so details still expire on their own schedule
+            if row:
+                gameData = json.loads(row['gameData'])
+                if priceOverview:
+                    gameData['price_overview'] = priceOverview
+                else:
+                    gameData.pop('price_overview', None)
+
+                cursor.execute("""
+                    UPDATE gameCache SET gameData = ? WHERE gameId = ?
+                """, (json.dumps(gameData), gameId))
+
+        cursor.executemany("""
+            UPDATE recommendations SET price = ?, salePrice = ? WHERE gameId = ?
+        """, [(price, salePrice, gameId) for gameId, (price, salePrice) in displayPrices.items()])
+
+        cursor.executemany("""
+            INSERT OR REPLACE INTO gamePrices (gameId, refreshedAt) VALUES (?, ?)
+        """, [(gameId, currentTime) for gameId in prices])
+        
+        conn.commit()
+        return len(prices)
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"Error updating game prices: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+# Steam App Catalog Functions
+def saveCatalogApps(apps: List[tuple]) -> int:
+    """
+    Replace the app catalog with (gameId, name, normalizedTitle) rows
+    Returns number of apps stored
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("DELETE FROM apps")
+
+        cursor.executemany("""
+            INSERT OR REPLACE INTO apps (gameId, name, normalizedTitle)
+            VALUES (?, ?, ?)
+        """, apps)
+        
+        conn.commit()
+        return len(apps)
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"Error saving app catalog: {e}")
+        raise
+    finally:
+        conn.close()
+
+def getCatalogApp(gameId: str) -> Optional[Dict]:
+    """
+    Get an app from the catalog by ID
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            SELECT gameId, name, normalizedTitle FROM apps WHERE gameId = ?
+        """, (str(gameId),))
+        
+        row = cursor.fetchone()
+        return dict(row) if row else None
+        
+    except Exception as e:
+        print(f"Error getting catalog app: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+# LLM Candidate Cache Functions
+def saveLLMCandidates(cacheKey: str, candidates: List[Dict]) -> bool:
+    """
+    Cache a fresh list of AI candidates (restarts the TTL)
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+            INSERT OR REPLACE INTO llmCandidateCache (cacheKey, candidates, createdAt)
+            VALUES (?, ?, ?)
+        """, (cacheKey, json.dumps(candidates), int(time.time())))
+
+        conn.commit()
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        print(f"Error caching LLM candidates: {e}")
+        return False
+    finally:
+        conn.close()
+
+def updateLLMCandidates(cacheKey: str, candidates: List[Dict]) -> bool:
+    """
+    Replace the unused candidates for a key, keeping the original TTL
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+
+    try:
+        if candidates:
+            cursor.execute("""
+                UPDATE llmCandidateCache SET candidates = ? WHERE cacheKey = ?
+            """, (json.dumps(candidates), cacheKey))
+        else:
+            cursor.execute("DELETE FROM llmCandidateCache WHERE cacheKey = ?", (cacheKey,))
+
+        conn.commit()
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        print(f"Error updating LLM candidates: {e}")
+        return False
+    finally:
+        conn.close()
+
+def getLLMCandidates(cacheKey: str, maxAgeHours: float) -> Optional[List[Dict]]:
+    """
+    Get unused cached AI candidates, or None if missing or older than maxAgeHours
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+
+    try:
+        cutoff = int(time.time() - maxAgeHours * 3600)
+        cursor.execute("""
+            SELECT candidates FROM llmCandidateCache
+            WHERE cacheKey = ? AND createdAt > ?
+        """, (cacheKey, cutoff))
+
+        row = cursor.fetchone()
+        return json.loads(row['candidates']) if row else None
+
+    except Exception as e:
+        print(f"Error getting LLM candidates: {e}")
+        return None
+    finally:
+        conn.close()
+
+def purgeLLMCandidates(maxAgeHours: float) -> int:
+    """
+    Delete expired candidate lists
+    Returns number of rows deleted
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+
+    try:
+        cutoff = int(time.time() - maxAgeHours * 3600)
+        cursor.execute("DELETE FROM llmCandidateCache WHERE createdAt <= ?", (cutoff,))
 
-        row = cursor.fetchone()
-        
-        if row:
-            return json.loads(row['gameData'])
+        conn.commit()
+        return cursor.rowcount
 
-        return None
-        
     except Exception as e:
-        print(f"Error fetching cached game: {e}")
-        return None
+        conn.rollback()
+        print(f"Error purging LLM candidates: {e}")
+        return 0
     finally:
         conn.close()
 
@@ -558,6 +1418,75 @@ def saveRecommendation(
     finally:
         conn.close()
 
+def saveRecommendations(
+    steamId: str,
+    recommendations: List[Dict],
+    requestedGenres: List[str] = None
+) -> List[str]:
+    """
+    Save several recommendations ({game, reasoning, matchScore}) in one transaction
+    Returns gameIds saved (games already recommended to the user are skipped)
+    """
+    if not recommendations:
+        return []
+
+    conn = getConnection()
+    cursor = conn.cursor()
+
+    try:
+        currentTime = int(time.time())
+        gameIds = [str(recommendation['game'].get('gameId', '')) for recommendation in recommendations]
+        placeholders = ",".join("?" * len(gameIds))
+
+        # Check for duplicates
+        cursor.execute(f"""
+            SELECT gameId FROM recommendations
+            WHERE steamId = ? AND gameId IN ({placeholders})
+        """, (steamId, *gameIds))
+        seen = {str(row['gameId']) for row in cursor.fetchall()}
+
+        rows = []
+        for gameId, recommendation in zip(gameIds, recommendations):
+            if gameId in seen:
+                continue
+            seen.add(gameId)
+
+            game = recommendation['game']
+            rows.append((
+                steamId,
+                gameId,
+                game.get('title', 'Unknown'),
+                game.get('thumbnail', ''),
+                game.get('releaseDate', ''),
+                game.get('publisher', ''),
+                game.get('developer', ''),
+                game.get('price', ''),
+                game.get('salePrice', ''),
+                game.get('description', ''),
+                recommendation['reasoning'],
+                json.dumps(requestedGenres or []),
+                currentTime,
+                recommendation['matchScore']
+            ))
+
+        cursor.executemany("""
+            INSERT INTO recommendations
+            (steamId, gameId, title, thumbnail,
+             releaseDate, publisher, developer, price, salePrice, description,
+             reasoning, requestedGenres, createdAt, matchScore)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+
+        conn.commit()
+        return [row[1] for row in rows]
+
+    except Exception as e:
+        conn.rollback()
+        print(f"Error saving recommendations: {e}")
+        raise
+    finally:
+        conn.close()
+
 def getUserRecommendations(
     steamId: str, 
     limit: int = 20, 
@@ -650,6 +1579,174 @@ def getRecommendedGameIds(steamId: str) -> set:
         conn.close()
 
 
+# Recommendation Queue Functions
+def getQueueGeneration(steamId: str) -> int:
+    """
+    Current queue generation for a user (bumped by clearRecommendationQueue)
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+            SELECT generation FROM recommendationQueueGenerations WHERE steamId = ?
+        """, (steamId,))
+
+        row = cursor.fetchone()
+        return row['generation'] if row else 0
+
+    except Exception as e:
+        print(f"Error getting queue generation: {e}")
+        return 0
+    finally:
+        conn.close()
+
+def enqueueRecommendation(steamId: str, genresKey: str, recommendation: Dict, generation: Optional[int] = None) -> bool:
+    """
+    Add a validated recommendation ({game, reasoning, matchScore}) to a user's queue
+    If generation is given, the insert only happens while the queue is still at that
+    generation (checked in the same statement, so an invalidation can't slip in between)
+    Returns False if the game is already queued for that genre selection or the
+    queue was invalidated
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+            INSERT OR IGNORE INTO recommendationQueue (steamId, genresKey, gameId, recommendation, createdAt)
+            SELECT ?, ?, ?, ?, ?
+            WHERE ? IS NULL OR ? = COALESCE(
+                (SELECT generation FROM recommendationQueueGenerations WHERE steamId = ?), 0
+            )
+        """, (
+            steamId,
+            genresKey,
+            str(recommendation['game'].get('gameId', '')),
+            json.dumps(recommendation),
+            int(time.time()),
+            generation,
+            generation,
+            steamId
+        ))
+
+        conn.commit()
+        return cursor.rowcount > 0
+
+    except Exception as e:
+        conn.rollback()
+        print(f"Error queueing recommendation: {e}")
+        return False
+    finally:
+        conn.close()
+
+def popQueuedRecommendation(steamId: str, genresKey: str, maxAgeHours: float) -> Optional[Dict]:
+    """
+    Remove and return the oldest queued recommendation younger than maxAgeHours
+    Expired entries for the selection are dropped
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+
+    try:
+        cutoff = int(time.time() - maxAgeHours * 3600)
+        cursor.execute("""
+            DELETE FROM recommendationQueue
+            WHERE steamId = ? AND genresKey = ? AND createdAt <= ?
+        """, (steamId, genresKey, cutoff))
+
+        cursor.execute("""
+            SELECT queueId, recommendation FROM recommendationQueue
+            WHERE steamId = ? AND genresKey = ?
+            ORDER BY queueId
+            LIMIT 1
+        """, (steamId, genresKey))
+
+        row = cursor.fetchone()
+        if row:
+            cursor.execute("DELETE FROM recommendationQueue WHERE queueId = ?", (row['queueId'],))
+
+        conn.commit()
+        return json.loads(row['recommendation']) if row else None
+
+    except Exception as e:
+        conn.rollback()
+        print(f"Error popping queued recommendation: {e}")
+        return None
+    finally:
+        conn.close()
+
+def getQueuedGameIds(steamId: str) -> List[str]:
+    """
+    Get IDs of every game queued for a user (any genre selection)
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+            SELECT DISTINCT gameId FROM recommendationQueue WHERE steamId = ?
+        """, (steamId,))
+
+        return [row['gameId'] for row in cursor.fetchall()]
+
+    except Exception as e:
+        print(f"Error getting queued game IDs: {e}")
+        return []
+    finally:
+        conn.close()
+
+def countQueuedRecommendations(steamId: str, genresKey: str, maxAgeHours: float) -> int:
+    """
+    Count unexpired queued recommendations for a genre selection
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+
+    try:
+        cutoff = int(time.time() - maxAgeHours * 3600)
+        cursor.execute("""
+            SELECT COUNT(*) AS count FROM recommendationQueue
+            WHERE steamId = ? AND genresKey = ? AND createdAt > ?
+        """, (steamId, genresKey, cutoff))
+
+        return cursor.fetchone()['count']
+
+    except Exception as e:
+        print(f"Error counting queued recommendations: {e}")
+        return 0
+    finally:
+        conn.close()
+
+def clearRecommendationQueue(steamId: str) -> int:
+    """
+    Drop every queued recommendation for a user (library or dislikes changed)
+    and bump their queue generation so in-flight refills don't queue stale picks
+    Returns number of entries removed
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("DELETE FROM recommendationQueue WHERE steamId = ?", (steamId,))
+        removed = cursor.rowcount
+
+        cursor.execute("""
+            INSERT INTO recommendationQueueGenerations (steamId, generation) VALUES (?, 1)
+            ON CONFLICT(steamId) DO UPDATE SET generation = generation + 1
+        """, (steamId,))
+
+        conn.commit()
+        return removed
+
+    except Exception as e:
+        conn.rollback()
+        print(f"Error clearing recommendation queue: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
 # Preference Management Functions
 def savePreference(steamId: str, gameId: str, preference: str):
     """
@@ -861,7 +1958,193 @@ def deleteFilterGenres(steamId: str) -> bool:
     finally:
         conn.close()
 
+# Rate Limiter Functions
+def takeRateLimitToken(bucket: str, capacity: float, refillPerSecond: float, reserve: float = 0) -> float:
+    """
+    Try to take one token from a shared token bucket
+    Tokens below the reserve are left for higher priority callers
+    Returns 0 if a token was taken, otherwise seconds to wait before trying again
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+    
+    try:
+        # Lock the database so workers can't take the same token
+        cursor.execute("BEGIN IMMEDIATE")
+        currentTime = time.time()
+
+        cursor.execute("""
+            SELECT tokens, updatedAt, blockedUntil FROM rateLimitBuckets
+            WHERE bucket = ?
+        """, (bucket,))
+
+        row = cursor.fetchone()
+
+        if row:
+            elapsed = max(0, currentTime - row['updatedAt'])
+            tokens = min(capacity, row['tokens'] + elapsed * refillPerSecond)
+            blockedUntil = row['blockedUntil'] or 0
+        else:
+            tokens = capacity
+            blockedUntil = 0
+
+        if blockedUntil > currentTime:
+            # Steam told us to back off (Retry-After)
+            waitSeconds = blockedUntil - currentTime
+        elif tokens >= reserve + 1:
+            tokens -= 1
+            waitSeconds = 0
+        else:
+            waitSeconds = (reserve + 1 - tokens) / refillPerSecond
+
+        cursor.execute("""
+            INSERT OR REPLACE INTO rateLimitBuckets
+            (bucket, tokens, updatedAt, blockedUntil)
+            VALUES (?, ?, ?, ?)
+        """, (bucket, tokens, max(currentTime, blockedUntil), blockedUntil))
+
+        conn.commit()
+        return waitSeconds
+
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def blockRateLimitBucket(bucket: str, blockedUntil: float) -> bool:
+    """
+    Empty a rate limit bucket and block it until the given timestamp
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            INSERT INTO rateLimitBuckets (bucket, tokens, updatedAt, blockedUntil)
+            VALUES (?, 0, ?, ?)
+            ON CONFLICT(bucket) DO UPDATE SET
+                tokens = 0,
+                updatedAt = MAX(rateLimitBuckets.updatedAt, excluded.updatedAt),
+                blockedUntil = MAX(rateLimitBuckets.blockedUntil, excluded.blockedUntil)
+        """, (bucket, blockedUntil, blockedUntil))
+        
+        conn.commit()
+        return True
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"Error blocking rate limit bucket: {e}")
+        return False
+    finally:
+        conn.close()
+
+# Fetch Lease Functions
+def acquireFetchLease(leaseKey: str, owner: str, leaseSeconds: float) -> bool:
+    """
+    Try to take the lease for a key (succeeds if free or expired)
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+    
+    try:
+        currentTime = time.time()
+
+        cursor.execute("""
+            INSERT INTO fetchLeases (leaseKey, owner, expiresAt)
+            VALUES (?, ?, ?)
+            ON CONFLICT(leaseKey) DO UPDATE SET
+                owner = excluded.owner,
+                expiresAt = excluded.expiresAt
+            WHERE fetchLeases.expiresAt <= ?
+        """, (leaseKey, owner, currentTime + leaseSeconds, currentTime))
+        
+        conn.commit()
+        return cursor.rowcount == 1
+        
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def releaseFetchLease(leaseKey: str, owner: str) -> bool:
+    """
+    Release a lease held by owner
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            DELETE FROM fetchLeases WHERE leaseKey = ? AND owner = ?
+        """, (leaseKey, owner))
+        
+        conn.commit()
+        return True
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"Error releasing fetch lease: {e}")
+        return False
+    finally:
+        conn.close()
+
+def isFetchLeaseHeld(leaseKey: str) -> bool:
+    """
+    Check if an unexpired lease exists for a key
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            SELECT 1 FROM fetchLeases WHERE leaseKey = ? AND expiresAt > ?
+        """, (leaseKey, time.time()))
+        
+        return cursor.fetchone() is not None
+        
+    except Exception as e:
+        print(f"Error checking fetch lease: {e}")
+        return False
+    finally:
+        conn.close()
+
+# Periodic Job Lease Functions
+def acquireJobLease(jobName: str, owner: str, leaseSeconds: float) -> bool:
+    """
+    Try to take a periodic job's lease (succeeds if free or expired)
+    Kept apart from fetch leases so job names can't collide with fetch keys
+    """
+    conn = getConnection()
+    cursor = conn.cursor()
+    
+    try:
+        currentTime = time.time()
+
+        cursor.execute("""
+            INSERT INTO jobLeases (jobName, owner, expiresAt)
+            VALUES (?, ?, ?)
+            ON CONFLICT(jobName) DO UPDATE SET
+                owner = excluded.owner,
+                expiresAt = excluded.expiresAt
+            WHERE jobLeases.expiresAt <= ?
+        """, (jobName, owner, currentTime + leaseSeconds, currentTime))
+        
+        conn.commit()
+        return cursor.rowcount == 1
+        
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
 if __name__ == "__main__":
     print("Initializing database...")
     initDatabase()
-    print("Database ready")
\ No newline at end of file
+    print("Database ready")
+
+    # One-off migration for rows cached before field trimming
+    if "--trim-game-cache" in sys.argv:
+        print(f"Trimmed {trimGameCache()} cached games")
\ No newline at end of file
@@ -0,0 +1,71 @@
+# Per-request deadlines shared by every layer of the recommendation pipeline
+
+import os
+import threading
+import time
+
+from typing import Optional
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Time budget for one POST /api/recommendations request (seconds)
+RECOMMENDATION_DEADLINE_SECONDS = float(os.getenv("RECOMMENDATION_DEADLINE_SECONDS", "8"))
+
+
+class Deadline:
+    """
+    Absolute point in time after which a request's work should stop
+    """
+    def __init__(self, seconds: float):
+        """
+        Start a deadline that expires in the given number of seconds
+        """
+        self.seconds = seconds
+        self.expiresAt = time.monotonic() + seconds
+        self._cancelled = threading.Event()
+
+    def remaining(self) -> float:
+        """
+        Seconds left (0 once expired or cancelled)
+        """
+        if self._cancelled.is_set():
+            return 0.0
+        return max(0.0, self.expiresAt - time.monotonic())
+
+    def expired(self) -> bool:
+        """
+        Check if the budget is used up
+        """
+        return self.remaining() <= 0
+
+    def cancel(self) -> None:
+        """
+        Expire the deadline now (e.g. the caller went away)
+        """
+        self._cancelled.set()
+
+    def timeout(self, default: float) -> float:
+        """
+        Timeout for one blocking call: the default, capped by the time left
+        """
+        return min(default, self.remaining())
+
+    def sleep(self, seconds: float) -> bool:
+        """
+        Back off for the given time if the budget allows it
+        Returns False (without sleeping) if the deadline would pass first
+        """
+        if seconds >= self.remaining():
+            return False
+
+        # Wakes early if cancelled
+        return not self._cancelled.wait(seconds)
+
+
+def remainingOr(deadline: Optional[Deadline], default: float) -> float:
+    """
+    Timeout for a call that may or may not run under a deadline
+    """
+    return deadline.timeout(default) if deadline else default
@@ -0,0 +1,172 @@
+# Local content-based recommender, used when the AI can't answer in time
+
+import os
+
+from typing import Dict, List, Optional, Set, Tuple
+from dotenv import load_dotenv
+
+from steam_api import transformGameData
+from metrics import incrementCounter
+from db_helper import getCachedGames
+
+# Load environment variables
+load_dotenv()
+
+# Serve a cached-game pick when the AI is down or would miss the deadline
+FALLBACK_RECOMMENDER_ENABLED = os.getenv("FALLBACK_RECOMMENDER_ENABLED", "true").lower() == "true"
+# Seconds of the request deadline kept back for the fallback (the AI gets the rest)
+FALLBACK_RESERVE_SECONDS = float(os.getenv("FALLBACK_RESERVE_SECONDS", "1"))
+# Max cached games scored per request
+FALLBACK_CANDIDATE_LIMIT = int(os.getenv("FALLBACK_CANDIDATE_LIMIT", "5000"))
+
+# Score weights (sum to 1)
+GENRE_WEIGHT = 0.6
+CATEGORY_WEIGHT = 0.2
+REQUESTED_GENRE_WEIGHT = 0.2
+
+# Categories every other game has; they say nothing about taste
+IGNORED_CATEGORIES = {
+    "steam achievements", "steam cloud", "steam trading cards", "full controller support",
+    "partial controller support", "family sharing", "steam leaderboards", "in-app purchases",
+}
+
+
+def _names(gameData: Dict, field: str) -> List[str]:
+    """
+    Descriptions of a game's genres or categories
+    """
+    return [item.get('description', '') for item in gameData.get(field) or [] if item.get('description')]
+
+
+def buildTasteProfile(gamingProfile: Dict, cachedGames: Dict[str, Dict]) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """
+    Genre and category weights from the user's top games (weighted by playtime)
+    Falls back to the ranked favorite genres when no top game is cached
+    """
+    genreWeights: Dict[str, float] = {}
+    categoryWeights: Dict[str, float] = {}
+
+    for gameId, title, hours in gamingProfile.get('topGames', []):
+        gameData = cachedGames.get(str(gameId))
+        if not gameData:
+            continue
+
+        for genre in _names(gameData, 'genres'):
+            genreWeights[genre] = genreWeights.get(genre, 0) + hours
+        for category in _names(gameData, 'categories'):
+            if category.lower() not in IGNORED_CATEGORIES:
+                categoryWeights[category] = categoryWeights.get(category, 0) + hours
+
+    if not genreWeights:
+        favoriteGenres = gamingProfile.get('favoriteGenres', [])
+        genreWeights = {genre: len(favoriteGenres) - rank for rank, genre in enumerate(favoriteGenres)}
+
+    return genreWeights, categoryWeights
+
+
+def _overlap(names: List[str], weights: Dict[str, float]) -> float:
+    """
+    Share of the user's weight covered by a game's genres or categories (0-1)
+    """
+    total = sum(weights.values())
+    if not total:
+        return 0.0
+
+    return sum(weights.get(name, 0) for name in set(names)) / total
+
+
+def scoreGame(
+    gameData: Dict,
+    genreWeights: Dict[str, float],
+    categoryWeights: Dict[str, float],
+    requestedGenres: List[str]
+) -> Optional[float]:
+    """
+    Score a cached game against the user's taste (0-1)
+    Returns None if it doesn't have any of the requested genres
+    """
+    genres = _names(gameData, 'genres')
+    requested = {genre.lower() for genre in requestedGenres or []}
+
+    requestedScore = 0.0
+    if requested:
+        matched = requested & {genre.lower() for genre in genres}
+        if not matched:
+            return None
+        requestedScore = len(matched) / len(requested)
+
+    return (
+        GENRE_WEIGHT * _overlap(genres, genreWeights)
+        + CATEGORY_WEIGHT * _overlap(_names(gameData, 'categories'), categoryWeights)
+        + REQUESTED_GENRE_WEIGHT * requestedScore
+    )
+
+
+def buildReasoning(gameData: Dict, gamingProfile: Dict, cachedGames: Dict[str, Dict], genreWeights: Dict[str, float]) -> str:
+    """
+    Template reasoning naming the shared genres and the top game they come from
+    """
+    title = gameData.get('name', 'This game')
+    shared = sorted(
+        (genre for genre in _names(gameData, 'genres') if genre in genreWeights),
+        key=lambda genre: genreWeights[genre],
+        reverse=True
+    )[:2]
+
+    if not shared:
+        return f"{title} is a well-reviewed pick from the Steam catalog that fits the genres you asked for."
+
+    sharedText = " and ".join(shared)
+
+    for gameId, topTitle, hours in gamingProfile.get('topGames', []):
+        topGame = cachedGames.get(str(gameId))
+        if topGame and shared[0] in _names(topGame, 'genres'):
+            return f"Since you've spent {hours:g} hours in {topTitle}, {title} should suit you: it's also {sharedText}."
+
+    return f"{title} matches your favorite genres: {sharedText}."
+
+
+def recommendFromCache(
+    gamingProfile: Dict,
+    requestedGenres: List[str],
+    excludeGameIds: Set[str]
+) -> Optional[Dict]:
+    """
+    Best-scoring cached game the user doesn't own and hasn't seen or disliked
+    Returns {game, reasoning, matchScore} like generateSmartRecommendation
+    """
+    if not FALLBACK_RECOMMENDER_ENABLED:
+        return None
+
+    cachedGames = getCachedGames(FALLBACK_CANDIDATE_LIMIT)
+    genreWeights, categoryWeights = buildTasteProfile(gamingProfile, cachedGames)
+
+    best = None
+    for gameId, gameData in cachedGames.items():
+        if gameId in excludeGameIds or not gameData.get('name'):
+            continue
+        if gameData.get('type', 'game') != 'game':
+            continue
+
+        score = scoreGame(gameData, genreWeights, categoryWeights, requestedGenres)
+        if score is None:
+            continue
+
+        # Ties go to the lowest gameId (compared as text) so the pick is stable
+        if best is None or score > best[0] or (score == best[0] and gameId < best[1]):
+            best = (score, gameId, gameData)
+
+    if not best:
+        print(f"[Fallback] No cached game matches {requestedGenres}")
+        incrementCounter("recommendationFallbackMisses")
+        return None
+
+    score, gameId, gameData = best
+    print(f"[Fallback] Picked {gameData['name']} (ID: {gameId}) with score {score:.2f}")
+    incrementCounter("recommendationFallbacks")
+
+    return {
+        "game": transformGameData(gameData),
+        "reasoning": buildReasoning(gameData, gamingProfile, cachedGames, genreWeights),
+        "matchScore": round(50 + 40 * score)
+    }
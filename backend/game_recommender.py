@@ -1,30 +1,68 @@
 # Main recommendation engine
 
-import re
+import os
 
-from typing import Dict, List, Optional, Set
-from llm_handler import getLLMHandler
-from steam_api import fetchGameDetailsWithRetry, transformGameData
-from db_helper import getCachedGameDetails, cacheGameDetails
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import Callable, Dict, Iterator, List, Optional, Set
+from dotenv import load_dotenv
+from llm_handler import getLLMHandler, candidateCacheKey, LLM_PROVIDER, LLM_CANDIDATE_COUNT
+from steam_api import transformGameData
+from db_helper import (
+    getCachedGameDetails,
+    getCachedGameDetailsMany,
+    getLLMCandidates,
+    saveLLMCandidates,
+    updateLLMCandidates,
+    purgeLLMCandidates,
+)
+from background_jobs import submitJob, fetchAndCacheGameDetails
+from rate_limiter import PRIORITY_INTERACTIVE
+from single_flight import singleFlight
+from steam_catalog import normalizeTitle, checkCatalogTitle
+from circuit_breaker import GEMINI_CIRCUIT, isCircuitOpen
+from deadline import Deadline
+from retry_policy import GEMINI_RETRY
+from metrics import incrementCounter
+
+# Load environment variables
+load_dotenv()
+
+# How long unused AI candidates for the same profile and genres are reused (0 disables)
+LLM_CANDIDATE_CACHE_TTL_HOURS = float(os.getenv("LLM_CANDIDATE_CACHE_TTL_HOURS", "6"))
+# How often expired AI candidate lists are purged
+LLM_CANDIDATE_PURGE_INTERVAL_SECONDS = 6 * 3600
+
+# Candidates checked against Steam at once (the best-ranked one that passes wins)
+VALIDATION_BATCH_SIZE = int(os.getenv("VALIDATION_BATCH_SIZE", "3"))
+
+# Parallel Steam fetches for candidates missing from the game cache (still rate limited per dependency)
+_validationExecutor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("VALIDATION_WORKERS", "16")),
+    thread_name_prefix="steampal-validate"
+)
 
 
 class GameRecommender:
     """
     Recommendation orchestrator
     """
-    def __init__(self, llmProvider: str = "gemini"):
+    def __init__(self, llmProvider: str = LLM_PROVIDER):
         """
         Initialize recommender
         """
         self.llm = getLLMHandler(llmProvider)
+        # Unvalidated AI candidates left over from the last call, best first
+        self.spareCandidates: List[Dict] = []
+        # Candidates still arriving from a streamed AI call
+        self._candidateStream: Optional[Iterator[Dict]] = None
+        # Whether the streamed call has yielded nothing so far
+        self._streamEmpty = False
     
     def normalizeTitle(self, title: str) -> str:
         """
         Remove non-alphanumeric chars and convert to lowercase
         """
-        if not title:
-            return ""
-        return re.sub(r'[^a-zA-Z0-9]', '', title).lower()
+        return normalizeTitle(title)
 
     def generateRecommendation(
         self,
@@ -32,76 +70,353 @@ class GameRecommender:
         requestedGenres: List[str],
         excludeGameIds: Set[str],
         logPrefix: str,
-        maxRetries: int = 3
+        maxRetries: int = 3,
+        deadline: Optional[Deadline] = None,
+        stream: bool = False,
+        onProgress: Optional[Callable[[str, Dict], None]] = None,
+        candidateCount: int = LLM_CANDIDATE_COUNT
     ) -> Optional[Dict]:
         """
         Generate AI-Powered game recommendation
+        Each AI call returns candidateCount ranked candidates that are validated locally;
+        maxRetries caps AI calls, and unused candidates stay in spareCandidates
+        Stops once the deadline (if given) runs out
+        With stream=True the first AI call is streamed and candidates are validated as
+        they arrive; onProgress(stage, data) is told about each step and gets the
+        result as soon as it is validated
         """
         
+        GEMINI_RETRY.recordAttempt()
+        llmCalls = 0
+        llmFailures = 0
+        streamed = False
+
+        # Reuse unused candidates from an earlier request with the same profile and genres
+        cacheKey = candidateCacheKey(gamingProfile, requestedGenres, candidateCount) if LLM_CANDIDATE_CACHE_TTL_HOURS > 0 else None
+        if cacheKey and not self.spareCandidates:
+            cached = getLLMCandidates(cacheKey, LLM_CANDIDATE_CACHE_TTL_HOURS)
+            if cached:
+                print(f"[{logPrefix}] > Using {len(cached)} cached AI candidates")
+                incrementCounter("llmCandidateCacheHits")
+                self.spareCandidates = cached
+
         # Validation loop
-        for attempt in range(maxRetries):
-            print(f"[{logPrefix}] > AI Attempt {attempt + 1}/{maxRetries}")
+        while True:
+            if deadline and deadline.expired():
+                print(f"[{logPrefix}] > Deadline exceeded, giving up")
+                break
+
+            candidates = self._nextCandidates(excludeGameIds, logPrefix, VALIDATION_BATCH_SIZE)
+
+            if not candidates:
+                if llmCalls >= maxRetries:
+                    break
 
-            # Ask AI to discover game
-            aiResult = self.llm.discoverGame(
+                if self._streamEmpty:
+                    # The streamed call came back empty - back off like any failed AI call
+                    self._streamEmpty = False
+                    if not self._retryAfterAIFailure(llmFailures, deadline, maxRetries, logPrefix):
+                        break
+                    llmFailures += 1
+
+                print(f"[{logPrefix}] > AI Attempt {llmCalls + 1}/{maxRetries}")
+                llmCalls += 1
+                incrementCounter("recommendationLLMCalls")
+                self._report(onProgress, "generating", {"attempt": llmCalls})
+
+                if stream and llmCalls == 1:
+                    # Validate candidates while the rest of the response streams in
+                    streamed = True
+                    self._streamEmpty = True
+                    self._candidateStream = self.llm.streamCandidates(
+                        gamingProfile=gamingProfile,
+                        requestedGenres=requestedGenres,
+                        excludeGameIds=excludeGameIds,
+                        deadline=deadline,
+                        count=candidateCount
+                    )
+                    continue
+
+                # Ask AI for ranked candidates
+                candidates = self.llm.discoverGames(
+                    gamingProfile=gamingProfile,
+                    requestedGenres=requestedGenres,
+                    excludeGameIds=excludeGameIds,
+                    deadline=deadline,
+                    count=candidateCount
+                )
+
+                if not candidates:
+                    if not self._retryAfterAIFailure(llmFailures, deadline, maxRetries, logPrefix):
+                        break
+                    llmFailures += 1
+                    continue
+
+                print(f"[{logPrefix}] > AI suggested {len(candidates)} candidates")
+                self.spareCandidates = list(candidates)
+                if cacheKey:
+                    saveLLMCandidates(cacheKey, candidates)
+                continue
+
+            for candidate in candidates:
+                self._report(onProgress, "validating", {"gameId": candidate['gameId'], "title": candidate['title']})
+            result = self._validateCandidates(candidates, excludeGameIds, logPrefix, deadline)
+            if result:
+                incrementCounter("recommendationCandidatesUsed")
+                self._report(onProgress, "result", result)
+                self._drainCandidateStream(deadline)
+                self._storeSpares(cacheKey, fresh=streamed)
+                return result
+        
+        # If loop finishes, all retries failed
+        print(f"[{logPrefix}] > Failed all {llmCalls} AI attempts.")
+        self._storeSpares(cacheKey)
+        return None
+
+    def generateRecommendations(
+        self,
+        gamingProfile: Dict,
+        requestedGenres: List[str],
+        excludeGameIds: Set[str],
+        count: int,
+        logPrefix: str,
+        maxRetries: int = 3,
+        deadline: Optional[Deadline] = None
+    ) -> List[Dict]:
+        """
+        Generate up to count distinct recommendations from one profile
+        The first AI call asks for enough candidates to cover the batch; later picks
+        use its spares and make at most one more AI call each if they run out
+        Returns what was found before the AI gave up or the deadline ran out
+        """
+        candidateCount = max(LLM_CANDIDATE_COUNT, count * 2)
+        results = []
+
+        for pick in range(count):
+            result = self.generateRecommendation(
                 gamingProfile=gamingProfile,
                 requestedGenres=requestedGenres,
-                excludeGameIds=excludeGameIds
+                excludeGameIds=excludeGameIds,
+                logPrefix=f"{logPrefix} {pick + 1}/{count}",
+                maxRetries=maxRetries if pick == 0 else 1,
+                deadline=deadline,
+                candidateCount=candidateCount
             )
-            
-            if not aiResult:
-                print(f"[{logPrefix}] > AI failed to generate recommendation, retrying...")
-                continue
-        
-            # Extract AI result
-            gameId = aiResult['gameId']
-            title = aiResult['title']
-            reasoning = aiResult['reasoning']
-            matchScore = aiResult.get('matchScore', 85)
 
-            print(f"[{logPrefix}] > AI suggested: {title} (ID: {gameId}) with match score {matchScore}%")
+            if not result:
+                break
 
-            # Fetch game details from Steam
-            gameData = self._getGameDetails(gameId)
-        
-            if not gameData:
-                print(f"[{logPrefix}] > Failed to fetch game {gameId}")
-                excludeGameIds.add(gameId)
-                continue
+            excludeGameIds.add(result["game"]["gameId"])
+            results.append(result)
 
-            steamTitle = gameData.get('name')
-            if not steamTitle:
-                print(f"[{logPrefix}] > Fetched game {gameId} has no title")
-                excludeGameIds.add(gameId)
+        return results
+
+    def _storeSpares(self, cacheKey: Optional[str], fresh: bool = False) -> None:
+        """
+        Write the unused candidates back to the cache (keeps the original TTL
+        unless they came from a streamed call, which is cached here for the first time)
+        """
+        if not cacheKey:
+            return
+
+        if fresh and self.spareCandidates:
+            saveLLMCandidates(cacheKey, self.spareCandidates)
+        else:
+            updateLLMCandidates(cacheKey, self.spareCandidates)
+
+    def _retryAfterAIFailure(self, llmFailures: int, deadline: Optional[Deadline], maxRetries: int, logPrefix: str) -> bool:
+        """
+        Decide whether to ask the AI again after a call returned no candidates
+        Backs off first (subject to the shared retry budget); False means give up
+        """
+        if isCircuitOpen(GEMINI_CIRCUIT):
+            print(f"[{logPrefix}] > AI unavailable (circuit open), giving up")
+            return False
+
+        if not GEMINI_RETRY.retryAfterFailure(llmFailures, deadline, maxAttempts=maxRetries):
+            print(f"[{logPrefix}] > AI failed to generate recommendation, giving up")
+            return False
+
+        print(f"[{logPrefix}] > AI failed to generate recommendation, retrying...")
+        return True
+
+    def _nextCandidates(self, excludeGameIds: Set[str], logPrefix: str, limit: int) -> List[Dict]:
+        """
+        Pop up to limit spare candidates to validate together
+        A streamed call yields one at a time, so validation isn't held up waiting for the rest
+        """
+        candidates = []
+
+        while len(candidates) < limit:
+            if not self.spareCandidates and (candidates or self._candidateStream is None):
+                break
+
+            candidate = self._nextCandidate(excludeGameIds, logPrefix)
+            if candidate is None:
+                break
+            candidates.append(candidate)
+
+            if not self.spareCandidates and self._candidateStream is not None:
+                break
+
+        return candidates
+
+    def _nextCandidate(self, excludeGameIds: Set[str], logPrefix: str) -> Optional[Dict]:
+        """
+        Pop the next spare candidate that is not excluded (owned, recommended, disliked)
+        The exclusion check happens here rather than trusting the AI to honor it
+        """
+        while True:
+            if self.spareCandidates:
+                candidate = self.spareCandidates.pop(0)
+            elif self._candidateStream is not None:
+                candidate = next(self._candidateStream, None)
+                if candidate is None:
+                    self._candidateStream = None
+                    return None
+                self._streamEmpty = False
+            else:
+                return None
+
+            if candidate['gameId'] in excludeGameIds:
+                print(f"[{logPrefix}] > Skipping excluded candidate {candidate['title']} (ID: {candidate['gameId']})")
+                incrementCounter("recommendationCandidatesExcluded")
                 continue
+            return candidate
+
+    def _drainCandidateStream(self, deadline: Optional[Deadline] = None) -> None:
+        """
+        Keep the rest of a streamed response as spares (after the result went out)
+        """
+        if self._candidateStream is None:
+            return
 
-            # Normalize titles for comparison
-            titleNorm = self.normalizeTitle(title)
-            steamTitleNorm = self.normalizeTitle(steamTitle)
+        for candidate in self._candidateStream:
+            self.spareCandidates.append(candidate)
+            if deadline and deadline.expired():
+                break
 
-            # Compare recommended title vs Steam API title
-            if titleNorm not in steamTitleNorm and steamTitleNorm not in titleNorm:
-                print(f"[{logPrefix}] > Title mismatch: AI='{title}', Steam='{steamTitle}'. Retrying...")
-                excludeGameIds.add(gameId)
+        self._candidateStream = None
+
+    def _report(self, onProgress: Optional[Callable[[str, Dict], None]], stage: str, data: Dict) -> None:
+        """
+        Tell a streaming caller about progress
+        """
+        if onProgress:
+            onProgress(stage, data)
+
+    def _validateCandidates(
+        self,
+        candidates: List[Dict],
+        excludeGameIds: Set[str],
+        logPrefix: str,
+        deadline: Optional[Deadline] = None
+    ) -> Optional[Dict]:
+        """
+        Check ranked candidates against the catalog and Steam, and build the recommendation
+        for the best-ranked one that passes. Cached details are read in one query and
+        the misses are fetched from Steam in parallel, so a bad candidate doesn't cost
+        a serial round trip. Rejected candidates are added to excludeGameIds; ones
+        ranked below the winner go back to spareCandidates
+        """
+        # Check appid/title agreement against the local catalog first
+        checkable = []
+        for candidate in candidates:
+            if checkCatalogTitle(candidate['gameId'], candidate['title']) is False:
+                print(f"[{logPrefix}] > Catalog title mismatch for {candidate['gameId']}: AI='{candidate['title']}'. Skipping...")
+                excludeGameIds.add(candidate['gameId'])
                 continue
+            checkable.append(candidate)
 
-            # Validation success    
-            print(f"[{logPrefix}] > Validation success: {title}")
+        if not checkable:
+            return None
 
-            # Transform to frontend format
-            transformedGame = transformGameData(gameData)
+        gameIds = [candidate['gameId'] for candidate in checkable]
+        cachedGames = getCachedGameDetailsMany(gameIds)
+
+        # Fetch game details from Steam for cache misses, all at once
+        fetches = {
+            gameId: _validationExecutor.submit(self._fetchGameDetails, gameId, deadline)
+            for gameId in gameIds
+            if gameId not in cachedGames
+        }
+        if fetches:
+            print(f"[{logPrefix}] > Fetching {len(fetches)} candidates from Steam")
+            incrementCounter("recommendationParallelFetches", len(fetches))
+
+        for index, candidate in enumerate(checkable):
+            gameId = candidate['gameId']
+            gameData = cachedGames.get(gameId)
+
+            if gameId in fetches:
+                try:
+                    gameData = fetches[gameId].result(timeout=deadline.remaining() if deadline else None)
+                except FuturesTimeoutError:
+                    print(f"[{logPrefix}] > Deadline exceeded while fetching {gameId}")
+                    self.spareCandidates[0:0] = checkable[index:]
+                    return None
+
+            result = self._checkCandidate(candidate, gameData, excludeGameIds, logPrefix)
+            if result:
+                # Not checked yet; their details are cached now if the fetches finish
+                self.spareCandidates[0:0] = checkable[index + 1:]
+                return result
 
-            return {
-                "game": transformedGame,
-                "reasoning": reasoning,
-                "matchScore": matchScore
-            }
-        
-        # If loop finishes, all retries failed
-        print(f"[{logPrefix}] > Failed all {maxRetries} attempts.")
         return None
 
-    def _getGameDetails(self, gameId: str) -> Optional[Dict]:
+    def _checkCandidate(
+        self,
+        candidate: Dict,
+        gameData: Optional[Dict],
+        excludeGameIds: Set[str],
+        logPrefix: str
+    ) -> Optional[Dict]:
+        """
+        Compare a candidate with its Steam details and build the recommendation
+        Rejected candidates are added to excludeGameIds
+        """
+        # Extract AI result
+        gameId = candidate['gameId']
+        title = candidate['title']
+        reasoning = candidate['reasoning']
+        matchScore = candidate.get('matchScore', 85)
+
+        print(f"[{logPrefix}] > Checking candidate: {title} (ID: {gameId}) with match score {matchScore}%")
+
+        if not gameData:
+            print(f"[{logPrefix}] > Failed to fetch game {gameId}")
+            excludeGameIds.add(gameId)
+            return None
+
+        steamTitle = gameData.get('name')
+        if not steamTitle:
+            print(f"[{logPrefix}] > Fetched game {gameId} has no title")
+            excludeGameIds.add(gameId)
+            return None
+
+        # Normalize titles for comparison
+        titleNorm = self.normalizeTitle(title)
+        steamTitleNorm = self.normalizeTitle(steamTitle)
+
+        # Compare recommended title vs Steam API title
+        if titleNorm not in steamTitleNorm and steamTitleNorm not in titleNorm:
+            print(f"[{logPrefix}] > Title mismatch: AI='{title}', Steam='{steamTitle}'. Skipping...")
+            excludeGameIds.add(gameId)
+            return None
+
+        # Validation success    
+        print(f"[{logPrefix}] > Validation success: {title}")
+
+        # Transform to frontend format
+        transformedGame = transformGameData(gameData)
+
+        return {
+            "game": transformedGame,
+            "reasoning": reasoning,
+            "matchScore": matchScore
+        }
+
+    def _getGameDetails(self, gameId: str, deadline: Optional[Deadline] = None) -> Optional[Dict]:
         """
         Get game details (cached or fetch)
         """
@@ -110,20 +425,80 @@ class GameRecommender:
         gameData = getCachedGameDetails(gameId)
         
         if not gameData:
-            # Cache miss, fetch from Steam API
-            gameData = fetchGameDetailsWithRetry(gameId)
-            
-            if gameData:
-                cacheGameDetails(gameId, gameData)
+            gameData = self._fetchGameDetails(gameId, deadline)
         
         return gameData
-    
+
+    def _fetchGameDetails(self, gameId: str, deadline: Optional[Deadline] = None) -> Optional[Dict]:
+        """
+        Fetch game details for a cache miss (shared with concurrent misses)
+        """
+        return singleFlight(
+            f"appdetails:{gameId}",
+            lambda: fetchAndCacheGameDetails(gameId, PRIORITY_INTERACTIVE, deadline),
+            lambda: getCachedGameDetails(gameId),
+            maxWaitSeconds=deadline.remaining() if deadline else None
+        )
+
+
+def streamSmartRecommendation(
+    gamingProfile: Dict,
+    requestedGenres: List[str],
+    excludeGameIds: Set[str],
+    onProgress: Callable[[str, Dict], None],
+    logPrefix: str = "[Stream]",
+    deadline: Optional[Deadline] = None
+) -> Optional[Dict]:
+    """
+    Public API for streamed recommendations (progress and result go to onProgress)
+    """
+    recommender = GameRecommender()
+    return recommender.generateRecommendation(
+        gamingProfile=gamingProfile,
+        requestedGenres=requestedGenres,
+        excludeGameIds=excludeGameIds,
+        logPrefix=logPrefix,
+        deadline=deadline,
+        stream=True,
+        onProgress=onProgress
+    )
+
+
+def generateSmartRecommendations(
+    gamingProfile: Dict,
+    requestedGenres: List[str],
+    excludeGameIds: Set[str],
+    count: int,
+    logPrefix: str = "[Batch]",
+    deadline: Optional[Deadline] = None
+) -> List[Dict]:
+    """
+    Public API for generating several recommendations at once
+    """
+    recommender = GameRecommender()
+    return recommender.generateRecommendations(
+        gamingProfile=gamingProfile,
+        requestedGenres=requestedGenres,
+        excludeGameIds=excludeGameIds,
+        count=count,
+        logPrefix=logPrefix,
+        deadline=deadline
+    )
+
+
+def purgeExpiredCandidates() -> bool:
+    """
+    Queue deletion of expired AI candidate lists
+    """
+    return submitJob("llmCandidatePurge", purgeLLMCandidates, LLM_CANDIDATE_CACHE_TTL_HOURS)
+
 
 def generateSmartRecommendation(
     gamingProfile: Dict,
     requestedGenres: List[str],
     excludeGameIds: Set[str],
-    logPrefix: str = "[Main:1]"
+    logPrefix: str = "[Main:1]",
+    deadline: Optional[Deadline] = None
 ) -> Optional[Dict]:
     """
     Public API for generating recommendations
@@ -133,5 +508,7 @@ def generateSmartRecommendation(
         gamingProfile=gamingProfile,
         requestedGenres=requestedGenres,
         excludeGameIds=excludeGameIds,
-        logPrefix=logPrefix
+        logPrefix=logPrefix,
+        deadline=deadline
     )
+
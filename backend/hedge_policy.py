@@ -0,0 +1,109 @@
+# Hedged requests: a backup call when the first one is slower than usual
+
+import os
+import threading
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from dotenv import load_dotenv
+
+from retry_policy import RetryBudget
+
+# Load environment variables
+load_dotenv()
+
+# Send a backup LLM call when the first one is slow (off by default: it costs extra calls)
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+# Hedge once a call has taken longer than this percentile of recent latencies
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+# Never hedge earlier than this (seconds)
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "1"))
+# Hedges allowed per call, as a fraction of traffic (per process)
+LLM_HEDGE_MAX_RATE = float(os.getenv("LLM_HEDGE_MAX_RATE", "0.1"))
+# Provider for backup calls (e.g. a faster model registered with registerLLMProvider); empty = same provider
+LLM_HEDGE_PROVIDER = os.getenv("LLM_HEDGE_PROVIDER", "")
+
+# Recent latencies kept, and needed before hedging starts
+HEDGE_LATENCY_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+
+# Runs both calls of a hedged request (separate from the request executor so hedges can't starve it)
+_hedgeExecutor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("LLM_HEDGE_WORKERS", "64")),
+    thread_name_prefix="steampal-llm-hedge"
+)
+
+
+class HedgePolicy:
+    """
+    Tracks recent call latencies to decide when to hedge, and caps the hedge rate
+    Every call deposits maxRate tokens (up to a small burst), every hedge spends one
+    """
+    def __init__(
+        self,
+        percentile: float = LLM_HEDGE_PERCENTILE,
+        minDelaySeconds: float = LLM_HEDGE_MIN_DELAY_SECONDS,
+        maxRate: float = LLM_HEDGE_MAX_RATE,
+        window: int = HEDGE_LATENCY_WINDOW,
+        minSamples: int = HEDGE_MIN_SAMPLES
+    ):
+        """
+        Start with no latency history
+        """
+        self.percentile = percentile
+        self.minDelaySeconds = minDelaySeconds
+        self.minSamples = minSamples
+        self.budget = RetryBudget(ratio=maxRate, maxTokens=max(1.0, maxRate * 10))
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def recordLatency(self, seconds: float) -> None:
+        """
+        Record how long a completed call took
+        """
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def hedgeDelay(self) -> Optional[float]:
+        """
+        Seconds to wait before hedging (None until there is enough history)
+        """
+        with self._lock:
+            if len(self._latencies) < self.minSamples:
+                return None
+            latencies = sorted(self._latencies)
+
+        index = min(len(latencies) - 1, int(len(latencies) * self.percentile / 100))
+        return max(self.minDelaySeconds, latencies[index])
+
+    def recordCall(self) -> None:
+        """
+        Record a first call (earns hedge budget)
+        """
+        self.budget.recordAttempt()
+
+    def tryHedge(self) -> bool:
+        """
+        Spend budget for a hedge (False if the hedge rate is used up)
+        """
+        return self.budget.tryRetry()
+
+
+LLM_HEDGE = HedgePolicy()
+
+
+def submitHedgeCall(fn, *args, **kwargs):
+    """
+    Start one call of a hedged request
+    """
+    return _hedgeExecutor.submit(fn, *args, **kwargs)
+
+
+def resetHedgePolicy() -> None:
+    """
+    Forget latency history and refill the hedge budget
+    """
+    with LLM_HEDGE._lock:
+        LLM_HEDGE._latencies.clear()
+    LLM_HEDGE.budget = RetryBudget(LLM_HEDGE.budget.ratio, LLM_HEDGE.budget.maxTokens)
@@ -0,0 +1,148 @@
+# Owned games library sync (runs off the login path)
+
+import hashlib
+import os
+import time
+
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+
+from steam_api import fetchUserOwnedGames, fetchRecentlyPlayedGames
+from background_jobs import scheduleGameDetailsWarmUp
+from recommendation_queue import invalidateQueue
+from single_flight import singleFlight
+from metrics import incrementCounter
+from deadline import Deadline
+from db_helper import (
+    cacheOwnedGames,
+    saveLibrarySyncStatus,
+    getLibrarySyncStatus,
+    getOwnedGamesPlaytime,
+    touchOwnedGamesCache,
+    saveLibraryFingerprint,
+    getLibraryFingerprint,
+)
+
+# Load environment variables
+load_dotenv()
+
+# Purchases that haven't been played yet don't show up in the recently played
+# probe, so do a full GetOwnedGames fetch at least this often
+LIBRARY_FULL_SYNC_MAX_AGE_HOURS = int(os.getenv("LIBRARY_FULL_SYNC_MAX_AGE_HOURS", "72"))
+
+
+def computeLibraryFingerprint(games: List[Dict]) -> str:
+    """
+    Hash of (appid, total playtime) for every game in a library
+    """
+    entries = sorted(f"{game.get('appid', '')}:{game.get('playtime_forever', 0)}" for game in games)
+    return hashlib.sha256("|".join(entries).encode("utf-8")).hexdigest()
+
+
+def probeUnchangedLibrary(steamId: str, deadline: Optional[Deadline] = None) -> Optional[List[Dict]]:
+    """
+    Check with GetRecentlyPlayedGames if the cached library is still current
+    Returns the recently played games if nothing changed, otherwise None
+    """
+    fingerprint = getLibraryFingerprint(steamId)
+    if not fingerprint:
+        return None
+
+    if time.time() - fingerprint['fullSyncAt'] > LIBRARY_FULL_SYNC_MAX_AGE_HOURS * 3600:
+        return None
+
+    cachedPlaytimes = getOwnedGamesPlaytime(steamId)
+    if not cachedPlaytimes:
+        return None
+
+    recentGames = fetchRecentlyPlayedGames(steamId, deadline)
+    if recentGames is None:
+        return None
+
+    # Any newly played game or changed playtime means a full refresh
+    for game in recentGames:
+        gameId = str(game.get('appid', ''))
+        if cachedPlaytimes.get(gameId) != game.get('playtime_forever', 0):
+            print(f"[LibrarySync] Library changed for {steamId} (game {gameId})")
+            return None
+
+    return recentGames
+
+
+def syncUserLibrary(steamId: str, forceFull: bool = False, deadline: Optional[Deadline] = None) -> bool:
+    """
+    Fetch and cache user's owned games, recording progress for the frontend
+    Unchanged libraries cost one GetRecentlyPlayedGames call
+    Steam calls are capped by the deadline if given (the cached library stays in use)
+    """
+    saveLibrarySyncStatus(steamId, "syncing")
+
+    try:
+        if not forceFull:
+            recentGames = probeUnchangedLibrary(steamId, deadline)
+            if recentGames is not None:
+                touchOwnedGamesCache(steamId, recentGames)
+                saveLibrarySyncStatus(steamId, "ready")
+                incrementCounter("libraryProbeUnchanged")
+                print(f"[LibrarySync] Library unchanged for user {steamId}")
+                return True
+
+        ownedGames = fetchUserOwnedGames(steamId, deadline)
+
+        if not ownedGames and deadline and deadline.expired():
+            saveLibrarySyncStatus(steamId, "failed", error="Library sync ran out of time")
+            incrementCounter("librarySyncDeadlineExceeded")
+            print(f"[LibrarySync] Deadline exceeded syncing library for {steamId}")
+            return False
+
+        if not ownedGames:
+            saveLibrarySyncStatus(steamId, "failed", error="Steam returned no games (profile may be private)")
+            return False
+
+        incrementCounter("libraryFullSyncs")
+        fingerprint = computeLibraryFingerprint(ownedGames)
+        storedFingerprint = getLibraryFingerprint(steamId)
+
+        if storedFingerprint and storedFingerprint['fingerprint'] == fingerprint and getOwnedGamesPlaytime(steamId):
+            # Same games and playtime - only refresh 2-week playtime
+            touchOwnedGamesCache(steamId, [game for game in ownedGames if game.get('playtime_2weeks')])
+        else:
+            cacheOwnedGames(steamId, ownedGames)
+            # Queued picks may now be owned or no longer fit the profile
+            invalidateQueue(steamId)
+
+        saveLibraryFingerprint(steamId, fingerprint, len(ownedGames))
+        saveLibrarySyncStatus(steamId, "ready", gameCount=len(ownedGames))
+        print(f"[LibrarySync] Synced {len(ownedGames)} games for user {steamId}")
+
+        # Prefetch details for top games so the profile is ready
+        scheduleGameDetailsWarmUp(steamId)
+        return True
+
+    except Exception as e:
+        print(f"[LibrarySync] Failed to sync library for {steamId}: {e}")
+        saveLibrarySyncStatus(steamId, "failed", error=str(e))
+        return False
+
+
+def syncUserLibraryOnce(steamId: str, deadline: Optional[Deadline] = None) -> bool:
+    """
+    syncUserLibrary, joining a sync already running for the user (in this or another
+    worker), e.g. a request made right after login while the login sync is still going
+    Waiting is capped by the deadline if given
+    """
+    requestedAt = int(time.time())
+
+    def finishedSync() -> Optional[bool]:
+        # A sync that finished after we asked is as good as our own
+        status = getLibrarySyncStatus(steamId)
+        if status and status['status'] in ('ready', 'failed') and (status['finishedAt'] or 0) >= requestedAt:
+            return status['status'] == 'ready'
+        return None
+
+    return bool(singleFlight(
+        f"librarySync:{steamId}",
+        lambda: syncUserLibrary(steamId, deadline=deadline),
+        finishedSync,
+        maxWaitSeconds=deadline.remaining() if deadline else None
+    ))
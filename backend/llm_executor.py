@@ -0,0 +1,57 @@
+# Bounded executor for blocking LLM pipeline work called from async endpoints
+
+import asyncio
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Awaitable, Callable, Optional
+from dotenv import load_dotenv
+
+from deadline import Deadline
+from metrics import incrementCounter
+
+# Load environment variables
+load_dotenv()
+
+# LLM calls that may be in flight at once per worker (the event loop stays free)
+LLM_EXECUTOR_WORKERS = int(os.getenv("LLM_EXECUTOR_WORKERS", "32"))
+
+# How often a waiting request checks whether its client is still connected (seconds)
+DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "0.25"))
+
+_executor = ThreadPoolExecutor(max_workers=LLM_EXECUTOR_WORKERS, thread_name_prefix="steampal-llm")
+
+
+async def runInLLMExecutor(
+    fn: Callable[..., Any],
+    *args,
+    deadline: Optional[Deadline] = None,
+    isDisconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+    **kwargs
+) -> Any:
+    """
+    Run blocking work on the LLM executor without blocking the event loop
+    The deadline is passed on to fn; if the client disconnects, it is cancelled
+    (so the work stops at its next checkpoint) and None is returned right away
+    """
+    if deadline is not None:
+        kwargs["deadline"] = deadline
+
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_executor, partial(fn, *args, **kwargs))
+
+    if isDisconnected is None:
+        return await future
+
+    while True:
+        done, _ = await asyncio.wait({future}, timeout=DISCONNECT_POLL_SECONDS)
+        if done:
+            return future.result()
+
+        if await isDisconnected():
+            print(f"[LLMExecutor] Client disconnected, cancelling work")
+            incrementCounter("llmClientDisconnects")
+            if deadline:
+                deadline.cancel()
+            return None
@@ -1,16 +1,148 @@
 # AI integration for smart game recommendations
 
 import google.generativeai as genai
+import hashlib
 import os
 import json
+import threading
+import time
 
-from typing import Dict, List, Optional, Set
+from concurrent.futures import wait, as_completed, TimeoutError as FuturesTimeoutError
+from typing import Callable, Dict, Iterator, List, Optional, Set
 from dotenv import load_dotenv
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
+from google.api_core.exceptions import DeadlineExceeded
+
+from circuit_breaker import GEMINI_CIRCUIT, getCircuitBreaker
+from deadline import Deadline
+from metrics import incrementCounter
+from prompt_budget import PromptBudget, PROMPT_TOKEN_BUDGET
+from record_replay import RECORD_MODE, GEMINI_SERVICE, ReplayModel, recordExchange, promptKey
+from llm_stub import StubModel
+from hedge_policy import LLM_HEDGE, LLM_HEDGE_ENABLED, LLM_HEDGE_PROVIDER, submitHedgeCall
 
 # Load environment variables
 load_dotenv()
 
+# "gemini", "replay" to serve recorded responses (RECORDINGS_DIR/gemini.jsonl),
+# or "stub" for deterministic local answers (benchmarks)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
+
+# Ranked candidates requested per discovery call (validated locally, extras kept as spares)
+LLM_CANDIDATE_COUNT = int(os.getenv("LLM_CANDIDATE_COUNT", "5"))
+# Extra output tokens allowed per additional candidate
+CANDIDATE_OUTPUT_TOKENS = 400
+
+# Bump whenever DISCOVERY_PROMPT_TEMPLATE or the candidate schema changes (invalidates cached candidates)
+PROMPT_TEMPLATE_VERSION = "1"
+
+# Discovery prompt (ranked sections are filled in by buildPrompt within PROMPT_TOKEN_BUDGET)
+DISCOVERY_PROMPT_TEMPLATE = """You are an expert Steam game recommendation AI with deep knowledge of:
+        - 50,000+ games in Steam's catalog
+        - Gaming trends and hidden gems
+        - Player preferences and playstyles
+
+        **USER'S GAMING PROFILE**
+
+        LIBRARY STATS:
+        - Total Games Owned: {gameCount}
+        - Total Playtime: {totalPlaytime:.0f} hours
+        - Gaming Experience: {experience}
+
+        TOP 10 MOST-PLAYED GAMES:
+        {topGamesList}
+
+        RECENTLY ACTIVE GAMES (Last 2 Weeks):
+        {recentlyActiveList}
+
+        MOST-PLAYED GAMES (50+ hours):
+        {mostPlayedList}
+
+        FAVORITE GENRES (by playtime):
+        {favoriteGenresStr}
+
+        **RECOMMENDATION REQUIREMENTS**
+
+        USER REQUESTED:
+        Genres: {requestedGenresStr}
+
+        **CRITICAL EXCLUSION RULES (VERY IMPORTANT):**
+        - Do NOT recommend any game the user already owns (they own {gameCount} games, including every game listed above).
+        - You MUST NOT, under any circumstances, recommend any game from the following list.
+        Recommending a game from this list will result in a failed response: {excludedList}
+        - Recommended game must be available on Steam
+        - Recommended game should have positive reviews (Metacritic 70+)
+        - Recommended game should match their playtime preferences
+
+        **CRITICAL CONSISTENT RULES:**
+        The 'gameId' you provide, the 'title' you provide, and the game discussed in the 'reason' MUST refer to the exact same game. Double-check this consistency before generating the final JSON output. Failure to maintain consistency will result in an invalid response.
+
+        **YOUR TASK**
+        {taskIntro}
+        1. Matches their requested genres and favorite genres
+        2. Is similar to their most-played games
+        3. They do not already own
+        4. Has strong reviews
+        5. **VALIDATION (VERY IMPORTANT):** Before outputting the JSON, verify that the game title mentioned anywhere inside your 'reason' text EXACTLY MATCHES the game corresponding to the 'gameId' you are providing. Do not mention any other game titles in the final 'reason' unless comparing directly to the user's top-played games.
+
+        {thinkingSection}
+
+        **RESPONSE FORMAT (JSON ONLY)**
+        Before you output the JSON, double check that the game ID is not excluded AND that the game title in the 'reason' field matches the 'gameId' and 'title' fields. You MUST return ONLY a valid JSON object matching this exact schema. Do not add any other text, explanations, or markdown formatting. The entire response must be the raw JSON object.
+
+        OUTPUT RULES:
+        {outputSchema}
+
+        **REASONING INSTRUCTIONS::**
+        - The "reasoning" text MUST be engaging and written directly to the user (e.g., "You'll like this because...", "Since you enjoyed...").
+        - It must clearly connect one of their most-played games to the new recommendation.
+        - Do NOT say "Based on your gaming profile."
+
+        **IMPORTANT:**
+        - gameId MUST be the actual Steam App ID (numeric string)
+        - reasoning should be 2-3 sentences mentioning their specific games and play patterns
+        - matchScore should be 0-100 (confidence level)
+        - similarTo should list 1-3 games from their library
+        - NO additional text outside the JSON
+        - Ensure the game exists on Steam and is currently available
+
+        JSON Response:
+        """
+
+# Max share of the prompt budget per ranked section
+PROMPT_SECTION_SHARES = {
+    "topGames": 0.15,
+    "recentlyActive": 0.08,
+    "recentRecommendations": 0.15,
+    "dislikedGames": 0.10,
+    "mostPlayed": 0.15,
+    "otherExclusions": 0.15,
+}
+
+def _createGeminiModel():
+    """
+    Configure the Gemini SDK and create the model client
+    """
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY not found in environment variables")
+
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel('gemini-flash-latest')
+
+
+# Model client factories by provider name (see registerLLMProvider)
+_modelFactories: Dict[str, Callable[[], object]] = {
+    "gemini": _createGeminiModel,
+    "replay": ReplayModel,
+    "stub": StubModel,
+}
+
+# One shared handler per provider (per process)
+_handlers: Dict[str, "LLMHandler"] = {}
+_handlersLock = threading.Lock()
+
+
 class LLMHandler:
     """
     Handles LLM interactions
@@ -20,17 +152,22 @@ class LLMHandler:
         Initialize LLM provider
         """
         self.provider = provider
+        # Per-thread, since one handler is shared by every request
+        self._local = threading.local()
 
-        if provider == "gemini":
-            api_key = os.getenv("GEMINI_API_KEY")
-            if not api_key:
-                raise ValueError("GEMINI_API_KEY not found in environment variables")
-            
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-flash-latest')
-        else:
+        factory = _modelFactories.get(provider)
+        if factory is None:
             raise ValueError(f"Unsupported provider: {provider}")
 
+        self.model = factory()
+
+    @property
+    def lastPromptTokens(self) -> Dict[str, int]:
+        """
+        Estimated tokens per section of the last prompt built on this thread
+        """
+        return getattr(self._local, "lastPromptTokens", {})
+
 
     # AI-Powered Game Discovery
     def discoverGame(
@@ -38,89 +175,326 @@ class LLMHandler:
         gamingProfile: Dict,
         requestedGenres: List[str],
         excludeGameIds: Set[str],
+        deadline: Optional[Deadline] = None,
     ) -> Optional[Dict]:
         """
         Use AI to discover the perfect game
+        The call is cut off when the deadline (if given) runs out
         """ 
+        candidates = self.discoverGames(gamingProfile, requestedGenres, excludeGameIds, deadline, count=1)
+        return candidates[0] if candidates else None
+
+
+    def discoverGames(
+        self,
+        gamingProfile: Dict,
+        requestedGenres: List[str],
+        excludeGameIds: Set[str],
+        deadline: Optional[Deadline] = None,
+        count: int = LLM_CANDIDATE_COUNT,
+    ) -> Optional[List[Dict]]:
+        """
+        Use AI to discover a ranked list of candidate games (best first) in one call
+        Candidates are not validated here; the caller filters them locally
+        """
+        prompt = self._preparePrompt(gamingProfile, requestedGenres, excludeGameIds, deadline, count)
+        if prompt is None:
+            return None
+
+        try:
+            config, safety_settings = self._generationSettings(count)
+
+            if LLM_HEDGE_ENABLED:
+                return self._hedgedDiscovery(prompt, config, safety_settings, excludeGameIds, deadline)
+
+            return self._discoverOnce(self.model, prompt, config, safety_settings, excludeGameIds, deadline)
+
+        except Exception as e:
+            print(f"LLM API error: {e}")
+            return None
+
+
+    def _discoverOnce(
+        self,
+        model,
+        prompt: str,
+        config,
+        safety_settings,
+        excludeGameIds: Set[str],
+        deadline: Optional[Deadline] = None,
+    ) -> Optional[List[Dict]]:
+        """
+        One discovery call: call the model, update the breaker and parse the response
+        """
+        breaker = getCircuitBreaker(GEMINI_CIRCUIT)
+
+        # Cap the call at the time left for this request
+        requestOptions = {"timeout": deadline.remaining()} if deadline else {}
+
+        # Call AI
+        startTime = time.monotonic()
+        try:
+            response = model.generate_content(
+                prompt,
+                generation_config=config,
+                safety_settings=safety_settings,
+                request_options=requestOptions
+            )
+        except Exception as e:
+            breaker.recordFailure()
+            # Failures are part of the slow tail too; a timed out call took at least its whole timeout
+            elapsed = time.monotonic() - startTime
+            if isinstance(e, (DeadlineExceeded, TimeoutError)) and requestOptions:
+                elapsed = max(elapsed, requestOptions["timeout"])
+            LLM_HEDGE.recordLatency(elapsed)
+            raise
+
+        breaker.recordSuccess()
+        LLM_HEDGE.recordLatency(time.monotonic() - startTime)
+        return self._handleResponse(prompt, response, startTime, excludeGameIds)
+
+
+    def _hedgedDiscovery(
+        self,
+        prompt: str,
+        config,
+        safety_settings,
+        excludeGameIds: Set[str],
+        deadline: Optional[Deadline] = None,
+    ) -> Optional[List[Dict]]:
+        """
+        Discovery call with a backup: if the first call is slower than the hedge
+        percentile of recent calls, a second one is sent (within the hedge rate)
+        and the first response that parses into candidates wins
+        """
+        LLM_HEDGE.recordCall()
+        calls = {submitHedgeCall(self._discoverOnce, self.model, prompt, config, safety_settings, excludeGameIds, deadline): False}
+
+        delay = LLM_HEDGE.hedgeDelay()
+        if delay is not None and (not deadline or delay < deadline.remaining()):
+            done, _ = wait(calls, timeout=delay)
+            if not done and LLM_HEDGE.tryHedge():
+                print(f"[Hedge] No AI response after {delay:.2f}s, sending a backup call")
+                incrementCounter("llmHedgesIssued")
+                hedge = submitHedgeCall(self._discoverOnce, self._hedgeModel(), prompt, config, safety_settings, excludeGameIds, deadline)
+                calls[hedge] = True
+
+        try:
+            for call in as_completed(calls, timeout=deadline.remaining() if deadline else None):
+                try:
+                    candidates = call.result()
+                except Exception as e:
+                    print(f"LLM API error: {e}")
+                    continue
+
+                if candidates:
+                    if calls[call]:
+                        print(f"[Hedge] Backup call won")
+                        incrementCounter("llmHedgesWon")
+                    return candidates
+        except FuturesTimeoutError:
+            print(f"Deadline exceeded waiting for AI response")
+
+        return None
+
+
+    def _hedgeModel(self):
+        """
+        Model for backup calls (LLM_HEDGE_PROVIDER's, or this handler's)
+        """
+        if LLM_HEDGE_PROVIDER and LLM_HEDGE_PROVIDER != self.provider:
+            try:
+                return getLLMHandler(LLM_HEDGE_PROVIDER).model
+            except Exception as e:
+                print(f"[Hedge] Hedge provider {LLM_HEDGE_PROVIDER} unavailable: {e}")
+
+        return self.model
+
+
+    def streamCandidates(
+        self,
+        gamingProfile: Dict,
+        requestedGenres: List[str],
+        excludeGameIds: Set[str],
+        deadline: Optional[Deadline] = None,
+        count: int = LLM_CANDIDATE_COUNT,
+    ) -> Iterator[Dict]:
+        """
+        Streaming discoverGames: yields each candidate as soon as its JSON object is
+        complete in the streamed response, so validation can start before the AI finishes
+        Yields nothing if the call is skipped or fails
+        """
+        prompt = self._preparePrompt(gamingProfile, requestedGenres, excludeGameIds, deadline, count)
+        if prompt is None:
+            return
+
+        breaker = getCircuitBreaker(GEMINI_CIRCUIT)
+        config, safety_settings = self._generationSettings(count)
+        requestOptions = {"timeout": deadline.remaining()} if deadline else {}
+
+        startTime = time.monotonic()
+        responseText = ""
+        parsedObjects = 0
+        seen = set()
+        recorded = False
+
+        try:
+            response = self.model.generate_content(
+                prompt,
+                generation_config=config,
+                safety_settings=safety_settings,
+                request_options=requestOptions,
+                stream=True
+            )
+
+            for chunk in response:
+                if not recorded:
+                    # First bytes back - Gemini is up
+                    breaker.recordSuccess()
+                    recorded = True
+                    print(f"[DEBUG] First AI chunk after {(time.monotonic() - startTime) * 1000:.0f}ms")
+                responseText += chunk.text
+
+                objects = completeCandidateObjects(responseText)
+                for rawObject in objects[parsedObjects:]:
+                    parsedObjects += 1
+                    candidate = self._candidateFromText(rawObject)
+                    if candidate and candidate["gameId"] not in seen:
+                        seen.add(candidate["gameId"])
+                        yield candidate
+
+        except Exception as e:
+            breaker.recordFailure()
+            recorded = True
+            print(f"LLM API error: {e}")
+            return
+
+        finally:
+            if not recorded:
+                # Stream ended (or was abandoned) before any chunk - free the half-open trial slot
+                breaker.recordFailure()
+
+        if RECORD_MODE and self.provider == "gemini":
+            recordExchange(GEMINI_SERVICE, promptKey(prompt), {"text": responseText}, (time.monotonic() - startTime) * 1000)
+
+        # Not a candidate list (e.g. a single game object) - parse the whole response
+        if parsedObjects == 0:
+            for candidate in self.parseCandidates(responseText) or []:
+                yield candidate
+
+
+    def _preparePrompt(
+        self,
+        gamingProfile: Dict,
+        requestedGenres: List[str],
+        excludeGameIds: Set[str],
+        deadline: Optional[Deadline],
+        count: int = 1,
+    ) -> Optional[str]:
+        """
+        Build the discovery prompt, or None if the call should be skipped
+        (deadline passed or Gemini circuit open)
+        """
+        if deadline and deadline.expired():
+            print(f"Deadline exceeded, skipping AI call")
+            return None
+
+        # Fail fast while Gemini is unhealthy
+        breaker = getCircuitBreaker(GEMINI_CIRCUIT)
+        if not breaker.allowRequest():
+            print(f"Gemini circuit open, skipping AI call")
+            return None
+
         # Build rich context prompt
         prompt = self.buildPrompt(
             gamingProfile,
             requestedGenres,
             excludeGameIds,
+            count,
         )
 
         # DEBUG
-        print(f"[DEBUG] Excluding {len(excludeGameIds)} games from recommendations")
-        if excludeGameIds and len(excludeGameIds) > 0:
-            sample_ids = list(excludeGameIds)[:3]
-            in_prompt = sum(1 for game_id in sample_ids if str(game_id) in prompt)
-            print(f"[DEBUG] Exclusion verification: {in_prompt}/{len(sample_ids)} sample IDs found in prompt")
-
-        if "CRITICAL EXCLUSION RULES" in prompt:
-            print(f"[DEBUG] Exclusion section found in prompt")
-        else:
-            print(f"[DEBUG] WARNING: Exclusion section not found in prompt")
-        
-        prompt_length = len(prompt)
-        estimated_tokens = prompt_length // 4 
-        print(f"[DEBUG] Prompt length: {prompt_length} chars (~{estimated_tokens} tokens)")
-        
-        if estimated_tokens > 500000:
-            print(f"[DEBUG] WARNING: Prompt approaching token limit")
+        print(f"[DEBUG] Excluding {len(excludeGameIds)} games from recommendations (enforced after the call)")
+        print(f"[DEBUG] Prompt tokens by section: {self.lastPromptTokens}")
+        incrementCounter("llmPromptTokens", self.lastPromptTokens["total"])
 
-        try:
-            # Define the generation config
-            config = genai.types.GenerationConfig(
-                    temperature=0.8, 
-                    top_p=0.95,
-                    top_k=50,
-                    max_output_tokens=2048,
-                    response_mime_type="application/json" # Force JSON output
-                )
-
-            # Define safety settings
-            safety_settings = {
-                HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_ONLY_HIGH,
-                HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_ONLY_HIGH,
-                HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_ONLY_HIGH,
-                HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_ONLY_HIGH,
-            }
-
-            # Call AI
-            response = self.model.generate_content(
-                prompt,
-                generation_config=config,
-                safety_settings=safety_settings
+        return prompt
+
+
+    def _generationSettings(self, count: int = 1):
+        """
+        Generation config and safety settings for discovery calls
+        Output budget grows with the number of candidates requested
+        """
+        # Define the generation config
+        config = genai.types.GenerationConfig(
+            temperature=0.8,
+            top_p=0.95,
+            top_k=50,
+            max_output_tokens=2048 + CANDIDATE_OUTPUT_TOKENS * (count - 1),
+            response_mime_type="application/json" # Force JSON output
+        )
+
+        # Define safety settings
+        safety_settings = {
+            HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_ONLY_HIGH,
+            HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_ONLY_HIGH,
+            HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_ONLY_HIGH,
+            HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_ONLY_HIGH,
+        }
+
+        return config, safety_settings
+
+
+    def _handleResponse(self, prompt: str, response, startTime: float, excludeGameIds: Set[str]) -> Optional[List[Dict]]:
+        """
+        Record (in record mode) and parse a discovery response into ranked candidates
+        """
+        if RECORD_MODE and self.provider == "gemini":
+            recordExchange(
+                GEMINI_SERVICE,
+                promptKey(prompt),
+                {"text": response.text},
+                (time.monotonic() - startTime) * 1000
             )
 
-            # Parse response
-            result = self.parseResponse(response.text)
+        # Parse response
+        candidates = self.parseCandidates(response.text)
 
-            if result:
-                # DEBUG
+        if candidates:
+            # DEBUG
+            for result in candidates:
                 print(f"[DEBUG] Suggested: {result['title']} (ID: {result['gameId']}, Score: {result['matchScore']}%)")
-                
-                if result['gameId'] in excludeGameIds:
-                    print(f"[DEBUG] WARNING: Suggested game {result['gameId']} is in exclusion list")
-                return result
-            else:
-                print(f"Failed to parse AI response")
-                return None
 
-        except Exception as e:
-            print(f"LLM API error: {e}")
+            excluded = sum(1 for result in candidates if result['gameId'] in excludeGameIds)
+            if excluded:
+                print(f"[DEBUG] WARNING: {excluded}/{len(candidates)} suggested games are in exclusion list")
+            return candidates
+        else:
+            print(f"Failed to parse AI response")
             return None
 
 
     # Prompt Engineering
+    def _sectionCap(self, section: str) -> int:
+        """
+        Max tokens for a ranked prompt section
+        """
+        return int(PROMPT_TOKEN_BUDGET * PROMPT_SECTION_SHARES[section])
+
     def buildPrompt(
         self,
         gamingProfile: Dict,
         requestedGenres: List[str],
         excludeGameIds: Set[str],
+        count: int = 1,
     ) -> str:
         """
         Build comprehensive AI prompt
+        With count > 1, asks for a ranked list of candidates in one response
+        Stays within PROMPT_TOKEN_BUDGET: sections are filled in priority order
+        (top games, recent activity, recent recommendations, dislikes, most played,
+        other excluded IDs) and per-section token estimates go to lastPromptTokens
         """
         # Extract profile details
         topGames = gamingProfile.get('topGames', [])
@@ -131,23 +505,19 @@ class LLMHandler:
         favoriteGenres = gamingProfile.get('favoriteGenres', [])
 
 
-        # Format top games list
-        topGamesList = "\n".join([
+        # Format game lists (ranked; trimmed to the token budget below)
+        topGamesLines = [
             f"  {i+1}. {title} — {hours:.0f} hours"
             for i, (gameId, title, hours) in enumerate(topGames)
-        ]) if topGames else "  (No significant playtime data)"
-    
-        # Format recently active games list
-        recentlyActiveList = "\n".join([
+        ]
+        recentlyActiveLines = [
             f" {title} — {hours:.0f} hours (last 2 weeks)"
             for gameId, title, hours in recentlyActiveGames[:5]
-        ]) if recentlyActiveGames else "  (No recent activity)"
-    
-        # Format most played games list
-        mostPlayedList = "\n".join([
+        ]
+        mostPlayedLines = [
             f" {title} — {hours:.0f} hours"
             for gameId, title, hours in mostPlayedGames
-        ]) if mostPlayedGames else "  (None yet)"
+        ]
 
         # Format genres
         if favoriteGenres:
@@ -160,11 +530,27 @@ class LLMHandler:
         else:
             requestedGenresStr = "No specific genres requested - recommend based on their play history"    
         
-        # Format excluded games
-        if excludeGameIds:
-            excludedList = ", ".join(list(excludeGameIds))
-        else:
-            excludedList = "None (user has no owned games or recommendations yet)"
+        # Format excluded games: recent recommendations and dislikes by title, then other IDs
+        recentRecommendations = gamingProfile.get('recentRecommendations', [])
+        dislikedGames = gamingProfile.get('dislikedGames', [])
+        recentExclusions = [f"{title} ({gameId})" for gameId, title in recentRecommendations]
+        dislikedExclusions = [f"{title} ({gameId})" for gameId, title in dislikedGames]
+
+        namedIds = {str(gameId) for gameId, _ in recentRecommendations + dislikedGames}
+        shownIds = {str(game[0]) for game in topGames + recentlyActiveGames + mostPlayedGames}
+        # Games the model is most likely to suggest again go first, so they survive trimming:
+        # owned games by playtime, then recommendations newest first
+        exclusionRank = {}
+        for gameId in gamingProfile.get('ownedGameIds', []) + gamingProfile.get('recommendedGameIds', []):
+            exclusionRank.setdefault(str(gameId), len(exclusionRank))
+        otherExclusions = sorted(
+            (
+                str(gameId) for gameId in excludeGameIds
+                if str(gameId) not in namedIds and str(gameId) not in shownIds
+            ),
+            key=lambda gameId: (exclusionRank.get(gameId, len(exclusionRank)), gameId)
+        )
+        excludedTotal = len(recentExclusions) + len(dislikedExclusions) + len(otherExclusions)
 
         if topGames and len(topGames) > 0:
             topGameHours = topGames[0][2]
@@ -187,83 +573,67 @@ class LLMHandler:
         else:
             experience = "New"
 
-        # Build prompt
-        prompt = f"""You are an expert Steam game recommendation AI with deep knowledge of:
-        - 50,000+ games in Steam's catalog
-        - Gaming trends and hidden gems
-        - Player preferences and playstyles
-
-        **USER'S GAMING PROFILE**
-
-        LIBRARY STATS:
-        - Total Games Owned: {gameCount}
-        - Total Playtime: {totalPlaytime:.0f} hours
-        - Gaming Experience: {experience}
-
-        TOP 10 MOST-PLAYED GAMES:
-        {topGamesList}
-
-        RECENTLY ACTIVE GAMES (Last 2 Weeks):
-        {recentlyActiveList}
-
-        MOST-PLAYED GAMES (50+ hours):
-        {mostPlayedList}
-
-        FAVORITE GENRES (by playtime):
-        {favoriteGenresStr}
-
-        **RECOMMENDATION REQUIREMENTS**
-
-        USER REQUESTED:
-        {f"Genres: {requestedGenresStr}"}
-
-        **CRITICAL EXCLUSION RULES (VERY IMPORTANT):**
-        - You MUST NOT, under any circumstances, recommend any game from the following list.
-        Recommending a game from this list will result in a failed response: {excludedList}
-        - Recommended game must be available on Steam
-        - Recommended game should have positive reviews (Metacritic 70+)
-        - Recommended game should match their playtime preferences
-
-        **CRITICAL CONSISTENT RULES:**
-        The 'gameId' you provide, the 'title' you provide, and the game discussed in the 'reason' MUST refer to the exact same game. Double-check this consistency before generating the final JSON output. Failure to maintain consistency will result in an invalid response.
-
-        **YOUR TASK**
-        Recommend ONE perfect game to the user that:
-        1. Matches their requested genres and favorite genres
-        2. Is similar to their most-played games
-        3. They do not already own
-        4. Has strong reviews
-        5. **VALIDATION (VERY IMPORTANT):** Before outputting the JSON, verify that the game title mentioned anywhere inside your 'reason' text EXACTLY MATCHES the game corresponding to the 'gameId' you are providing. Do not mention any other game titles in the final 'reason' unless comparing directly to the user's top-played games.
-
-        {thinkingSection}
-
-        **RESPONSE FORMAT (JSON ONLY)**
-        Before you output the JSON, double check that the game ID is not excluded AND that the game title in the 'reason' field matches the 'gameId' and 'title' fields. You MUST return ONLY a valid JSON object matching this exact schema. Do not add any other text, explanations, or markdown formatting. The entire response must be the raw JSON object.
-
-        OUTPUT RULES:
-        {{
+        # One game, or a ranked list of candidates
+        gameSchema = """{
           "gameId": ["The exact Steam App ID of the recommended game"],
           "title": ["The exact, official title of the recommended game"],
           "reasoning": "Write a compelling paragraph explaining WHY this game is a great fit for the user, referencing their specific games and play patterns. Ensure the game mentioned here matches the 'title' and 'gameId' fields.",
           "matchScore": ...,
           "similarTo": ["Up to 3 similar game titles"],
-        }}
-
-        **REASONING INSTRUCTIONS::**
-        - The "reasoning" text MUST be engaging and written directly to the user (e.g., "You'll like this because...", "Since you enjoyed...").
-        - It must clearly connect one of their most-played games to the new recommendation.
-        - Do NOT say "Based on your gaming profile."
-
-        **IMPORTANT:**
-        - gameId MUST be the actual Steam App ID (numeric string)
-        - reasoning should be 2-3 sentences mentioning their specific games and play patterns
-        - matchScore should be 0-100 (confidence level)
-        - similarTo should list 1-3 games from their library
-        - NO additional text outside the JSON
-        - Ensure the game exists on Steam and is currently available
+        }"""
+        if count > 1:
+            taskIntro = f"Recommend {count} DIFFERENT games to the user, ranked from best match to worst, each of which:"
+            outputSchema = f"""{{
+          "candidates": [
+            {gameSchema},
+            ... ({count} entries in total, best match first)
+          ]
+        }}"""
+        else:
+            taskIntro = "Recommend ONE perfect game to the user that:"
+            outputSchema = gameSchema
+
+        parts = {
+            "gameCount": gameCount,
+            "totalPlaytime": totalPlaytime,
+            "experience": experience,
+            "favoriteGenresStr": favoriteGenresStr,
+            "requestedGenresStr": requestedGenresStr,
+            "taskIntro": taskIntro,
+            "thinkingSection": thinkingSection,
+            "outputSchema": outputSchema,
+        }
+
+        # Fixed text first, then the ranked sections in priority order
+        budget = PromptBudget(PROMPT_TOKEN_BUDGET)
+        budget.add("template", DISCOVERY_PROMPT_TEMPLATE.format(
+            topGamesList="", recentlyActiveList="", mostPlayedList="", excludedList="", **parts
+        ))
+
+        topGamesLines = budget.fitLines("topGames", topGamesLines, self._sectionCap("topGames"))
+        recentlyActiveLines = budget.fitLines("recentlyActive", recentlyActiveLines, self._sectionCap("recentlyActive"))
+        recentExclusions = budget.fitLines("recentRecommendations", recentExclusions, self._sectionCap("recentRecommendations"), ", ")
+        dislikedExclusions = budget.fitLines("dislikedGames", dislikedExclusions, self._sectionCap("dislikedGames"), ", ")
+        mostPlayedLines = budget.fitLines("mostPlayed", mostPlayedLines, self._sectionCap("mostPlayed"))
+        # Raw IDs help the model least; every exclusion is enforced after the call anyway
+        otherExclusions = budget.fitLines("otherExclusions", otherExclusions, self._sectionCap("otherExclusions"), ", ")
+
+        excludedItems = recentExclusions + dislikedExclusions + otherExclusions
+        omitted = excludedTotal - len(excludedItems)
+        if excludedItems:
+            excludedList = ", ".join(excludedItems) + (f" (and {omitted} more)" if omitted > 0 else "")
+        else:
+            excludedList = "None (user has no recommendations or dislikes yet)"
+
+        prompt = DISCOVERY_PROMPT_TEMPLATE.format(
+            topGamesList="\n".join(topGamesLines) or "  (No significant playtime data)",
+            recentlyActiveList="\n".join(recentlyActiveLines) or "  (No recent activity)",
+            mostPlayedList="\n".join(mostPlayedLines) or "  (None yet)",
+            excludedList=excludedList,
+            **parts
+        )
 
-        JSON Response:
-        """
+        self._local.lastPromptTokens = budget.report()
     
         return prompt
 
@@ -276,29 +646,190 @@ class LLMHandler:
         """
         Parse AI JSON response
         """
+        candidates = self.parseCandidates(responseText)
+        return candidates[0] if candidates else None
+
+
+    def _candidateFromItem(self, item) -> Optional[Dict]:
+        """
+        Normalize one parsed candidate, or None if required fields are missing
+        """
+        # Validate required fields
+        if not isinstance(item, dict) or not ("gameId" in item and "title" in item and "reasoning" in item):
+            return None
+
+        return {
+            "gameId": str(item["gameId"]),
+            "title": item["title"],
+            "reasoning": item["reasoning"],
+            "matchScore": item.get("matchScore", 85),
+            "similarTo": item.get("similarTo", [])
+        }
+
+
+    def _candidateFromText(self, text: str) -> Optional[Dict]:
+        """
+        Parse one candidate JSON object
+        """
+        try:
+            return self._candidateFromItem(json.loads(text))
+        except json.JSONDecodeError:
+            return None
+
+
+    def parseCandidates(
+            self,
+            responseText: str
+    ) -> Optional[List[Dict]]:
+        """
+        Parse AI JSON response into ranked candidates
+        Accepts {"candidates": [...]}, a bare list, or a single game object
+        """
         try:
             # Try direct JSON parse
             result = json.loads(responseText.strip())
-        
-            # Validate required fields
-            if "gameId" in result and "title" in result and "reasoning" in result:
-                return {
-                    "gameId": str(result["gameId"]),
-                    "title": result["title"],
-                    "reasoning": result["reasoning"],
-                    "matchScore": result.get("matchScore", 85),
-                    "similarTo": result.get("similarTo", [])
-                }
-            else:
-                # The JSON was valid but missing required fields
-                print(f"Failed to parse AI response: JSON missing required fields. Got: {responseText[:200]}")
-                return None
-        
         except json.JSONDecodeError as e:
             print(f"Failed to decode AI JSON response: {e}")
             print(f"Received text: {responseText[:200]}")
             return None
 
+        if isinstance(result, dict) and isinstance(result.get("candidates"), list):
+            items = result["candidates"]
+        elif isinstance(result, list):
+            items = result
+        else:
+            items = [result]
+
+        candidates = []
+        seen = set()
+        for item in items:
+            candidate = self._candidateFromItem(item)
+            if not candidate or candidate["gameId"] in seen:
+                continue
+            seen.add(candidate["gameId"])
+            candidates.append(candidate)
+
+        if not candidates:
+            # The JSON was valid but missing required fields
+            print(f"Failed to parse AI response: JSON missing required fields. Got: {responseText[:200]}")
+            return None
+
+        return candidates
+
+
+def completeCandidateObjects(text: str) -> List[str]:
+    """
+    JSON objects fully received so far in the first array of a (partial) response,
+    i.e. the candidates of {"candidates": [...]} or of a bare list
+    """
+    arrayStart = text.find("[")
+    if arrayStart < 0:
+        return []
+
+    objects = []
+    depth = 0
+    objectStart = None
+    inString = False
+    escaped = False
+
+    for i in range(arrayStart + 1, len(text)):
+        char = text[i]
+
+        if inString:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                inString = False
+            continue
+
+        if char == '"':
+            inString = True
+        elif char == "{":
+            if depth == 0:
+                objectStart = i
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0 and objectStart is not None:
+                objects.append(text[objectStart:i + 1])
+                objectStart = None
+        elif char == "]" and depth == 0:
+            break
+
+    return objects
+
+
+def candidateCacheKey(gamingProfile: Dict, requestedGenres: List[str], count: int = LLM_CANDIDATE_COUNT) -> str:
+    """
+    Fingerprint of what shapes the AI's candidates: the normalized profile, requested
+    genres and prompt version. Playtime hours, recommendations and dislikes are left
+    out (they change on every request and are filtered locally instead)
+    """
+    normalized = {
+        "version": PROMPT_TEMPLATE_VERSION,
+        "count": count,
+        "genres": sorted(genre.lower() for genre in requestedGenres or []),
+        "gameCount": gamingProfile.get('gameCount', 0),
+        "topGames": [str(game[0]) for game in gamingProfile.get('topGames', [])],
+        "recentlyActive": sorted(str(game[0]) for game in gamingProfile.get('recentlyActiveGames', [])[:5]),
+        "mostPlayed": sorted(str(game[0]) for game in gamingProfile.get('mostPlayedGames', [])),
+        "favoriteGenres": list(gamingProfile.get('favoriteGenres', [])[:5]),
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def registerLLMProvider(name: str, factory: Callable[[], object]) -> None:
+    """
+    Add a provider; factory() returns a model client with generate_content
+    (and optionally stream=True) like Gemini's
+    """
+    with _handlersLock:
+        _modelFactories[name] = factory
+        _handlers.pop(name, None)
+
+
+def getLLMHandler(provider: Optional[str] = None) -> LLMHandler:
+    """
+    Shared handler for a provider, created on first use
+    Handlers keep no per-request state, so threads can share them
+    """
+    provider = provider or LLM_PROVIDER
+
+    handler = _handlers.get(provider)
+    if handler:
+        return handler
+
+    with _handlersLock:
+        # Created once even if several threads miss at the same time
+        handler = _handlers.get(provider)
+        if not handler:
+            handler = LLMHandler(provider)
+            _handlers[provider] = handler
+        return handler
 
-def getLLMHandler(provider: str = "gemini") -> LLMHandler:
-    return LLMHandler(provider)
\ No newline at end of file
+
+def warmLLMHandlers(providers: Optional[List[str]] = None) -> List[str]:
+    """
+    Create handlers up front (e.g. at startup) so the first request doesn't pay for it
+    Returns providers that are ready
+    """
+    ready = []
+
+    for provider in providers or [LLM_PROVIDER]:
+        try:
+            getLLMHandler(provider)
+            ready.append(provider)
+        except Exception as e:
+            print(f"[LLM] Failed to initialize provider {provider}: {e}")
+
+    return ready
+
+
+def resetLLMHandlers() -> None:
+    """
+    Drop shared handlers (they are recreated on next use)
+    """
+    with _handlersLock:
+        _handlers.clear()
\ No newline at end of file
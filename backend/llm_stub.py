@@ -0,0 +1,109 @@
+# Deterministic local LLM stand-in for benchmarks (no network, no API key, no recordings)
+
+import hashlib
+import json
+import math
+import os
+import re
+import time
+
+from typing import Dict, Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+
+from record_replay import ReplayResponse, REPLAY_STREAM_CHUNKS
+
+# Load environment variables
+load_dotenv()
+
+# Fixed latency per stub call (milliseconds)
+LLM_STUB_LATENCY_MS = float(os.getenv("LLM_STUB_LATENCY_MS", "0"))
+
+# Well-known Steam games the stub recommends from (appid, official title)
+STUB_GAMES: List[Tuple[str, str]] = [
+    ("570", "Dota 2"),
+    ("730", "Counter-Strike 2"),
+    ("440", "Team Fortress 2"),
+    ("620", "Portal 2"),
+    ("4000", "Garry's Mod"),
+    ("105600", "Terraria"),
+    ("252950", "Rocket League"),
+    ("271590", "Grand Theft Auto V"),
+    ("292030", "The Witcher 3: Wild Hunt"),
+    ("367520", "Hollow Knight"),
+    ("374320", "DARK SOULS III"),
+    ("413150", "Stardew Valley"),
+    ("489830", "The Elder Scrolls V: Skyrim Special Edition"),
+    ("632360", "Risk of Rain 2"),
+    ("814380", "Sekiro: Shadows Die Twice"),
+    ("1086940", "Baldur's Gate 3"),
+    ("1091500", "Cyberpunk 2077"),
+    ("1145360", "Hades"),
+    ("1245620", "ELDEN RING"),
+    ("1794680", "Vampire Survivors"),
+]
+
+# "Recommend 5 DIFFERENT games" in a candidate-list prompt
+_COUNT_PATTERN = re.compile(r"Recommend (\d+) DIFFERENT games")
+
+
+class StubModel:
+    """
+    Fake LLM model that answers from STUB_GAMES
+    The same prompt always gets the same answer; games whose appid appears in the
+    prompt (owned, recommended, disliked) are skipped
+    """
+    def __init__(self, latencyMs: float = LLM_STUB_LATENCY_MS, games: Optional[List[Tuple[str, str]]] = None):
+        """
+        Initialize stub
+        """
+        self.latencyMs = latencyMs
+        self.games = games or STUB_GAMES
+
+    def respond(self, prompt: str) -> str:
+        """
+        Response text for a prompt
+        """
+        match = _COUNT_PATTERN.search(prompt)
+        count = int(match.group(1)) if match else 1
+
+        mentioned = set(re.findall(r"\d+", prompt))
+        available = [game for game in self.games if game[0] not in mentioned] or self.games
+
+        # Rotate the list by a hash of the prompt so different profiles get different picks
+        offset = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16) % len(available)
+        picks = (available[offset:] + available[:offset])[:count]
+
+        candidates = [
+            {
+                "gameId": gameId,
+                "title": title,
+                "reasoning": f"Since you enjoy games like the ones you play most, you'll like {title}.",
+                "matchScore": 90 - rank * 5,
+                "similarTo": []
+            }
+            for rank, (gameId, title) in enumerate(picks)
+        ]
+
+        return json.dumps({"candidates": candidates} if match else candidates[0])
+
+    def generate_content(self, prompt: str, request_options: Optional[Dict] = None, stream: bool = False, **kwargs):
+        """
+        Answer after the configured latency (in REPLAY_STREAM_CHUNKS chunks with stream=True)
+        """
+        text = self.respond(prompt)
+
+        if stream:
+            return self._streamContent(text)
+
+        time.sleep(self.latencyMs / 1000)
+        return ReplayResponse(text)
+
+    def _streamContent(self, text: str) -> Iterator[ReplayResponse]:
+        """
+        Split a response into chunks spread over the latency
+        """
+        chunkSize = max(1, math.ceil(len(text) / REPLAY_STREAM_CHUNKS))
+
+        for start in range(0, len(text), chunkSize):
+            time.sleep(self.latencyMs / 1000 / REPLAY_STREAM_CHUNKS)
+            yield ReplayResponse(text[start:start + chunkSize])
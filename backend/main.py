@@ -1,21 +1,27 @@
-from fastapi import FastAPI, Depends, HTTPException, Query, status, Request
+from fastapi import FastAPI, Depends, HTTPException, Query, status, Request, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, StreamingResponse
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
 from dotenv import load_dotenv
 from jwt.exceptions import InvalidTokenError
+import asyncio
+import hmac
+import json
 import os
-import requests
 import jwt
 
 from models import (
     UserResponse, 
     RecommendationRequest, 
     Recommendation, 
+    BatchRecommendationRequest,
+    BatchRecommendationResponse,
     GameDetail, 
-    FilterGenresResponse
+    FilterGenresResponse,
+    LibraryStatusResponse
 )
 
 from steam_api import (
@@ -34,6 +40,7 @@ from db_helper import (
     cacheGameDetails,
     getCachedGameDetails,
     saveRecommendation,
+    saveRecommendations,
     getUserRecommendations,
     getRecommendationsCount,
     getRecommendedGameIds,
@@ -44,18 +51,67 @@ from db_helper import (
     getUserEvents,
     saveFilterGenres,
     getFilterGenres,
+    saveLibrarySyncStatus,
+    getLibrarySyncStatus,
 )
 
-from game_recommender import generateSmartRecommendation
+from game_recommender import (
+    generateSmartRecommendation,
+    generateSmartRecommendations,
+    streamSmartRecommendation,
+    purgeExpiredCandidates,
+    LLM_CANDIDATE_PURGE_INTERVAL_SECONDS,
+)
+from recommendation_queue import popRecommendation, scheduleQueueRefill, invalidateQueue
+from circuit_breaker import GEMINI_CIRCUIT, isCircuitOpen, getCircuitStates
+from library_sync import syncUserLibraryOnce
+from background_jobs import (
+    registerPeriodicJob,
+    startPeriodicJobs,
+    stopPeriodicJobs,
+    schedulePriceRefresh,
+    PRICE_REFRESH_INTERVAL_MINUTES,
+)
+from profile_service import getPlayerProfile, scheduleActiveProfilesRefresh, PROFILE_REFRESH_INTERVAL_MINUTES
+from metrics import getCounters, incrementCounter
+from deadline import Deadline, RECOMMENDATION_DEADLINE_SECONDS
+from llm_executor import runInLLMExecutor
+from llm_handler import warmLLMHandlers
+from fallback_recommender import recommendFromCache, FALLBACK_RECOMMENDER_ENABLED, FALLBACK_RESERVE_SECONDS
+from starlette.concurrency import run_in_threadpool
 
 # Load environment variables
 load_dotenv()
 
+
+# LIFECYCLE
+def registerPeriodicJobs() -> None:
+    """
+    Register every periodic background job (each worker leases a job before running it)
+    """
+    registerPeriodicJob("priceRefresh", PRICE_REFRESH_INTERVAL_MINUTES * 60, schedulePriceRefresh)
+    registerPeriodicJob("activeProfileRefresh", PROFILE_REFRESH_INTERVAL_MINUTES * 60, scheduleActiveProfilesRefresh)
+    registerPeriodicJob("llmCandidatePurge", LLM_CANDIDATE_PURGE_INTERVAL_SECONDS, purgeExpiredCandidates)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Create the LLM client and start periodic background jobs on startup, stop them on shutdown
+    """
+    warmLLMHandlers()
+    registerPeriodicJobs()
+    startPeriodicJobs()
+    yield
+    stopPeriodicJobs()
+
+
 # Initialize FastAPI
 app = FastAPI(
     title="Steam Pal API",
     version="1.0.0",
-    description="Steam companion app with OAuth authentication")
+    description="Steam companion app with OAuth authentication",
+    lifespan=lifespan)
 
 # CONFIGURATION
 
@@ -63,6 +119,8 @@ app = FastAPI(
 SECRET_KEY = os.getenv("SECRET_KEY", "your-generated-secret-jwt-key")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_EXPIRATION_HOURS = int(os.getenv("JWT_EXPIRATION_HOURS", "24"))
+# Bearer token for /metrics; unset means only loopback clients may read it
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
 
 # Steam API
 STEAM_API_KEY = os.getenv("STEAM_API_KEY", "your-steam-web-api-key")
@@ -158,6 +216,7 @@ def steamLogin():
 @app.get("/api/auth/steam/callback")
 async def steamCallback(
     request: Request,
+    backgroundTasks: BackgroundTasks,
 ):
     """
     Handle Steam OAuth callback
@@ -179,17 +238,12 @@ async def steamCallback(
         steamId = openid_claimed_id.split('/')[-1]
         print(f"Extracted Steam ID: {steamId}")
         
-        # Fetch user profile from Steam
-        profileUrl = f"http://api.steampowered.com/ISteamUser/GetPlayerSummaries/v0002/"
-        params = {"key": STEAM_API_KEY, "steamids": steamId}
-        
-        response = requests.get(profileUrl, params=params)
-        data = response.json()
+        # Get user profile (cached, fetched from Steam on first login)
+        player = getPlayerProfile(steamId)
         
-        if not data.get("response", {}).get("players"):
+        if not player:
             raise HTTPException(status_code=400, detail="Failed to fetch Steam profile")
         
-        player = data["response"]["players"][0]
         displayName = player.get("personaname", "Unknown")
         avatarUrl = player.get("avatarfull", "")
         steamProfileUrl = player.get("profileurl", "")
@@ -199,15 +253,9 @@ async def steamCallback(
         # Save user to database
         saveUser(steamId, displayName, avatarUrl, steamProfileUrl)
         
-        # Fetch and cache owned games
-        try:
-            ownedGames = fetchUserOwnedGames(steamId)
-            if ownedGames:
-                cacheOwnedGames(steamId, ownedGames)
-                print(f"Cached {len(ownedGames)} games for user {steamId}")
-        except Exception as e:
-            print(f"Failed to cache owned games: {e}")
-            # Continue login even if caching fails
+        # Sync owned games after redirecting (progress at /api/library/status)
+        saveLibrarySyncStatus(steamId, "pending")
+        backgroundTasks.add_task(syncUserLibraryOnce, steamId)
         
         # Create JWT token
         token = createJwtToken(steamId, displayName, avatarUrl)
@@ -235,11 +283,14 @@ async def getCurrentUser(currentUser: dict = Depends(verifyToken)):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    # Cached Steam profile (never waits on Steam; refreshes run in the background)
+    player = getPlayerProfile(steamId, fetchMissing=False) or {}
+    
     return UserResponse(
         steamId=user["steamId"],
-        displayName=user["displayName"],
-        avatarUrl=user["avatarUrl"],
-        profileUrl=user.get("profileUrl", ""),
+        displayName=player.get("personaname", user["displayName"]),
+        avatarUrl=player.get("avatarfull", user["avatarUrl"]),
+        profileUrl=player.get("profileurl", user.get("profileUrl", "")),
         lastLogin=datetime.fromtimestamp(user["lastLogin"]).isoformat()
     )
 
@@ -249,24 +300,86 @@ async def logout(currentUser: dict = Depends(verifyToken)):
     return {"status": "success", "message": "Logged out successfully"}
 
 
+# LIBRARY ENDPOINTS
+@app.get("/api/library/status")
+async def getLibraryStatus(currentUser: dict = Depends(verifyToken)):
+    """
+    Get progress of the user's owned games sync
+    """
+    steamId = currentUser["sub"]
+    syncStatus = getLibrarySyncStatus(steamId)
+
+    if not syncStatus:
+        # No sync recorded (e.g. library cached before sync tracking existed)
+        ownedGameIds = getOwnedGamesIds(steamId)
+        return LibraryStatusResponse(
+            steamId=steamId,
+            status="ready" if ownedGameIds else "not_started",
+            gameCount=len(ownedGameIds)
+        )
+
+    return LibraryStatusResponse(
+        steamId=steamId,
+        status=syncStatus["status"],
+        gameCount=syncStatus["gameCount"] or 0,
+        startedAt=datetime.fromtimestamp(syncStatus["startedAt"]).isoformat() if syncStatus["startedAt"] else None,
+        finishedAt=datetime.fromtimestamp(syncStatus["finishedAt"]).isoformat() if syncStatus["finishedAt"] else None,
+        error=syncStatus["error"]
+    )
+
+
 # RECOMMENDATION ENDPOINT
 @app.post("/api/recommendations")
 async def getRecommendation(
     request: RecommendationRequest,
+    httpRequest: Request,
     currentUser: dict = Depends(verifyToken)
 ):
     """
     Generate AI-powered game recommendation
     """
     steamId = currentUser["sub"]
+
+    # Serve a precomputed recommendation when one is ready (works even while the AI is down)
+    queued = popRecommendation(steamId, request.genres)
+    if queued:
+        saveFilterGenres(steamId, request.genres)
+        saveResultId = saveRecommendation(
+            steamId=steamId,
+            game=queued["game"],
+            reasoning=queued["reasoning"],
+            matchScore=queued["matchScore"],
+            requestedGenres=request.genres
+        )
+
+        if saveResultId:
+            print(f"[Queue] Served queued recommendation {saveResultId}")
+            scheduleQueueRefill(steamId, request.genres)
+            return Recommendation(
+                game=GameDetail(**queued["game"]),
+                reasoning=queued["reasoning"],
+                matchScore=queued["matchScore"]
+            )
+
+    # Fail fast while the AI dependency is unhealthy (unless the local fallback can answer)
+    if isCircuitOpen(GEMINI_CIRCUIT) and not FALLBACK_RECOMMENDER_ENABLED:
+        raise HTTPException(
+            status_code=503,
+            detail="Recommendations are temporarily unavailable. Please try again shortly."
+        )
+
+    # Time budget shared by every retry below (AI calls, Steam lookups, backoff);
+    # part of it is kept back so the fallback can still answer in time
+    deadline = Deadline(
+        max(0.0, RECOMMENDATION_DEADLINE_SECONDS - FALLBACK_RESERVE_SECONDS)
+        if FALLBACK_RECOMMENDER_ENABLED else RECOMMENDATION_DEADLINE_SECONDS
+    )
     
     try:
         # STEP 1: Check/refresh owned games cache
         if not isOwnedGamesCacheRecent(steamId, maxAgeHours=24):
             print(f"Refreshing owned games cache for {steamId}")
-            ownedGames = fetchUserOwnedGames(steamId)
-            if ownedGames:
-                cacheOwnedGames(steamId, ownedGames)
+            await run_in_threadpool(syncUserLibraryOnce, steamId, deadline)
         
         # STEP 2: Get user's gaming profile
         gamingProfile = getUserGamingProfile(steamId)
@@ -293,18 +406,36 @@ async def getRecommendation(
         maxAttempts = 3
         for attempt in range(maxAttempts):
             logPrefix = f"Main Attempt {attempt + 1}/{maxAttempts}"
+
+            if isCircuitOpen(GEMINI_CIRCUIT):
+                print(f"[{logPrefix}] AI unavailable (circuit open). Skipping AI.")
+                break
+
+            if deadline.expired():
+                print(f"[{logPrefix}] Deadline exceeded. Stopping retries.")
+                break
+
             print(f"[{logPrefix}] Generating new recommendation")    
 
-            recommendation = generateSmartRecommendation(
+            # Runs off the event loop; a client disconnect cancels the deadline
+            recommendation = await runInLLMExecutor(
+                generateSmartRecommendation,
                 gamingProfile=gamingProfile,
                 requestedGenres=requestedGenres,
                 excludeGameIds=excludeGameIds,
-                logPrefix=logPrefix
+                logPrefix=logPrefix,
+                deadline=deadline,
+                isDisconnected=httpRequest.is_disconnected
             )
 
             if not recommendation:
-                print(f"[{logPrefix}] AI failed to generate recommendation. Retrying...")
-                continue
+                # The recommender already retried AI failures under the shared retry policy;
+                # only duplicates are retried here so retries don't multiply
+                if isCircuitOpen(GEMINI_CIRCUIT):
+                    print(f"[{logPrefix}] AI unavailable (circuit open). Stopping retries.")
+                else:
+                    print(f"[{logPrefix}] AI failed to generate recommendation. Stopping retries.")
+                break
     
             # STEP 6: Save recommendation to history
             saveResultId = saveRecommendation(
@@ -319,6 +450,9 @@ async def getRecommendation(
                 # Success - recommendation saved
                 print(f"[{logPrefix}] Recommendation saved with ID: {saveResultId}")
 
+                # Have the next ones ready
+                scheduleQueueRefill(steamId, requestedGenres)
+
                 # STEP 7: Return to frontend
                 return Recommendation(
                     game=GameDetail(**recommendation["game"]),
@@ -331,7 +465,36 @@ async def getRecommendation(
 
                 excludeGameIds.add(gameId)
 
-        # If loop finishes, all attempts failed
+        # If loop finishes, all attempts failed: pick from cached games instead
+        if FALLBACK_RECOMMENDER_ENABLED and not await httpRequest.is_disconnected():
+            # Scores thousands of cached rows, so keep it off the event loop
+            fallback = await run_in_threadpool(recommendFromCache, gamingProfile, requestedGenres, excludeGameIds)
+            if fallback and saveRecommendation(
+                steamId=steamId,
+                game=fallback["game"],
+                reasoning=fallback["reasoning"],
+                matchScore=fallback["matchScore"],
+                requestedGenres=requestedGenres
+            ):
+                return Recommendation(
+                    game=GameDetail(**fallback["game"]),
+                    reasoning=fallback["reasoning"],
+                    matchScore=fallback["matchScore"]
+                )
+
+        if deadline.expired():
+            incrementCounter("recommendationDeadlineExceeded")
+            raise HTTPException(
+                status_code=504,
+                detail=f"Recommendation took longer than {RECOMMENDATION_DEADLINE_SECONDS:.0f}s. Please try again."
+            )
+
+        if isCircuitOpen(GEMINI_CIRCUIT):
+            raise HTTPException(
+                status_code=503,
+                detail="Recommendations are temporarily unavailable. Please try again shortly."
+            )
+
         print(f"Failed to find a new recommendation after {maxAttempts} attempts.")
         raise HTTPException(
             status_code=404,
@@ -348,6 +511,261 @@ async def getRecommendation(
         )
 
 
+# BATCH RECOMMENDATION ENDPOINT
+@app.post("/api/recommendations/batch")
+async def getRecommendationBatch(
+    request: BatchRecommendationRequest,
+    httpRequest: Request,
+    currentUser: dict = Depends(verifyToken)
+):
+    """
+    Generate several AI-powered recommendations at once
+    One profile build and exclusion set, queued recommendations first, then as few
+    AI calls as the batch needs; everything is saved in one insert
+    """
+    steamId = currentUser["sub"]
+    requestedGenres = request.genres
+    saveFilterGenres(steamId, requestedGenres)
+
+    # Serve precomputed recommendations first
+    recommendations = []
+    while len(recommendations) < request.count:
+        queued = popRecommendation(steamId, requestedGenres)
+        if not queued:
+            break
+        recommendations.append(queued)
+
+    if not recommendations and isCircuitOpen(GEMINI_CIRCUIT):
+        raise HTTPException(
+            status_code=503,
+            detail="Recommendations are temporarily unavailable. Please try again shortly."
+        )
+
+    deadline = Deadline(RECOMMENDATION_DEADLINE_SECONDS)
+
+    try:
+        if len(recommendations) < request.count and not isCircuitOpen(GEMINI_CIRCUIT):
+            if not isOwnedGamesCacheRecent(steamId, maxAgeHours=24):
+                print(f"Refreshing owned games cache for {steamId}")
+                await run_in_threadpool(syncUserLibraryOnce, steamId, deadline)
+
+            gamingProfile = getUserGamingProfile(steamId)
+
+            excludeGameIds = (
+                set(getOwnedGamesIds(steamId))
+                | set(getRecommendedGameIds(steamId))
+                | set(getPreferenceGameIds(steamId, "disliked"))
+                | {queued["game"]["gameId"] for queued in recommendations}
+            )
+            print(f"[Batch] Generating {request.count - len(recommendations)} recommendations, excluding {len(excludeGameIds)} games")
+
+            # Runs off the event loop; a client disconnect cancels the deadline
+            generated = await runInLLMExecutor(
+                generateSmartRecommendations,
+                gamingProfile=gamingProfile,
+                requestedGenres=requestedGenres,
+                excludeGameIds=excludeGameIds,
+                count=request.count - len(recommendations),
+                deadline=deadline,
+                isDisconnected=httpRequest.is_disconnected
+            )
+            recommendations.extend(generated or [])
+
+        if not recommendations:
+            if deadline.expired():
+                incrementCounter("recommendationDeadlineExceeded")
+                raise HTTPException(
+                    status_code=504,
+                    detail=f"Recommendation took longer than {RECOMMENDATION_DEADLINE_SECONDS:.0f}s. Please try again."
+                )
+
+            if isCircuitOpen(GEMINI_CIRCUIT):
+                raise HTTPException(
+                    status_code=503,
+                    detail="Recommendations are temporarily unavailable. Please try again shortly."
+                )
+
+            raise HTTPException(
+                status_code=404,
+                detail="Failed to find new recommendations. Please try again later."
+            )
+
+        # Save all at once (games recommended meanwhile by another request are dropped)
+        savedGameIds = set(saveRecommendations(steamId, recommendations, requestedGenres))
+        print(f"[Batch] Saved {len(savedGameIds)}/{len(recommendations)} recommendations")
+
+        # Have the next ones ready
+        scheduleQueueRefill(steamId, requestedGenres)
+
+        return BatchRecommendationResponse(recommendations=[
+            Recommendation(
+                game=GameDetail(**recommendation["game"]),
+                reasoning=recommendation["reasoning"],
+                matchScore=recommendation["matchScore"]
+            )
+            for recommendation in recommendations
+            if str(recommendation["game"]["gameId"]) in savedGameIds
+        ])
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Batch recommendation error: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate recommendations: {str(e)}"
+        )
+
+
+# STREAMING RECOMMENDATION ENDPOINT
+def formatSSE(event: str, data: Dict) -> str:
+    """
+    Format one server-sent event
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def recommendationResultEvents(recommendation: Dict) -> str:
+    """
+    Game, reasoning and final events for a saved recommendation
+    """
+    result = Recommendation(
+        game=GameDetail(**recommendation["game"]),
+        reasoning=recommendation["reasoning"],
+        matchScore=recommendation["matchScore"]
+    ).model_dump(mode="json", by_alias=True)
+
+    return (
+        formatSSE("game", result["game"])
+        + formatSSE("reasoning", {"reasoning": result["reasoning"], "match_score": result["match_score"]})
+        + formatSSE("done", result)
+    )
+
+
+async def recommendationEvents(steamId: str, requestedGenres: list):
+    """
+    Run the recommendation pipeline, yielding progress as server-sent events
+    Falls back to a cached-game pick like POST /api/recommendations
+    """
+    # Part of the budget is kept back so the fallback can still answer in time
+    deadline = Deadline(
+        max(0.0, RECOMMENDATION_DEADLINE_SECONDS - FALLBACK_RESERVE_SECONDS)
+        if FALLBACK_RECOMMENDER_ENABLED else RECOMMENDATION_DEADLINE_SECONDS
+    )
+    yield formatSSE("progress", {"stage": "started"})
+
+    try:
+        # Precomputed recommendation ready?
+        queued = popRecommendation(steamId, requestedGenres)
+        if queued:
+            saveFilterGenres(steamId, requestedGenres)
+            if saveRecommendation(steamId, queued["game"], queued["reasoning"], queued["matchScore"], requestedGenres):
+                scheduleQueueRefill(steamId, requestedGenres)
+                yield recommendationResultEvents(queued)
+                return
+
+        if isCircuitOpen(GEMINI_CIRCUIT) and not FALLBACK_RECOMMENDER_ENABLED:
+            yield formatSSE("error", {"status": 503, "detail": "Recommendations are temporarily unavailable. Please try again shortly."})
+            return
+
+        if not isOwnedGamesCacheRecent(steamId, maxAgeHours=24):
+            yield formatSSE("progress", {"stage": "library"})
+            await run_in_threadpool(syncUserLibraryOnce, steamId, deadline)
+
+        yield formatSSE("progress", {"stage": "profile"})
+        gamingProfile = getUserGamingProfile(steamId)
+        saveFilterGenres(steamId, requestedGenres)
+
+        excludeGameIds = (
+            set(getOwnedGamesIds(steamId))
+            | set(getRecommendedGameIds(steamId))
+            | set(getPreferenceGameIds(steamId, "disliked"))
+        )
+
+        if not isCircuitOpen(GEMINI_CIRCUIT):
+            # Progress from the executor thread is handed to this generator through a queue
+            loop = asyncio.get_running_loop()
+            events = asyncio.Queue()
+
+            def onProgress(stage: str, data: Dict) -> None:
+                loop.call_soon_threadsafe(events.put_nowait, (stage, data))
+
+            pipeline = asyncio.ensure_future(runInLLMExecutor(
+                streamSmartRecommendation,
+                gamingProfile=gamingProfile,
+                requestedGenres=requestedGenres,
+                excludeGameIds=excludeGameIds,
+                onProgress=onProgress,
+                logPrefix="Stream",
+                deadline=deadline
+            ))
+            pipeline.add_done_callback(lambda _: events.put_nowait(("finished", {})))
+
+            while True:
+                stage, data = await events.get()
+
+                if stage == "finished":
+                    break
+
+                if stage != "result":
+                    yield formatSSE("progress", {"stage": stage, **data})
+                    continue
+
+                # Validated - send it now; the pipeline keeps the leftover candidates in the background
+                if saveRecommendation(steamId, data["game"], data["reasoning"], data["matchScore"], requestedGenres):
+                    scheduleQueueRefill(steamId, requestedGenres)
+                    yield recommendationResultEvents(data)
+                else:
+                    yield formatSSE("error", {"status": 409, "detail": "Recommended game was already recommended. Please try again."})
+                return
+
+            # A cancelled future raises CancelledError from exception(), so check it first
+            if not pipeline.cancelled() and pipeline.exception():
+                raise pipeline.exception()
+
+        # The AI couldn't answer: pick from cached games instead
+        if FALLBACK_RECOMMENDER_ENABLED:
+            yield formatSSE("progress", {"stage": "fallback"})
+            fallback = await run_in_threadpool(recommendFromCache, gamingProfile, requestedGenres, excludeGameIds)
+            if fallback and saveRecommendation(steamId, fallback["game"], fallback["reasoning"], fallback["matchScore"], requestedGenres):
+                yield recommendationResultEvents(fallback)
+                return
+
+        if deadline.expired():
+            incrementCounter("recommendationDeadlineExceeded")
+            yield formatSSE("error", {"status": 504, "detail": f"Recommendation took longer than {RECOMMENDATION_DEADLINE_SECONDS:.0f}s. Please try again."})
+        elif isCircuitOpen(GEMINI_CIRCUIT):
+            yield formatSSE("error", {"status": 503, "detail": "Recommendations are temporarily unavailable. Please try again shortly."})
+        else:
+            yield formatSSE("error", {"status": 404, "detail": "Failed to find a new recommendation. Please try again later."})
+
+    except asyncio.CancelledError:
+        # Client went away - stop the pipeline at its next checkpoint
+        incrementCounter("llmClientDisconnects")
+        deadline.cancel()
+        raise
+    except Exception as e:
+        print(f"Streaming recommendation error: {e}")
+        yield formatSSE("error", {"status": 500, "detail": f"Failed to generate recommendation: {str(e)}"})
+
+
+@app.post("/api/recommendations/stream")
+async def streamRecommendation(
+    request: RecommendationRequest,
+    currentUser: dict = Depends(verifyToken)
+):
+    """
+    Generate AI-powered game recommendation as server-sent events
+    Emits progress events right away, then game, reasoning and done as soon as a
+    pick is validated (or a single error event with an HTTP-style status)
+    """
+    return StreamingResponse(
+        recommendationEvents(currentUser["sub"], request.genres),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # RECOMMENDATION HISTORY ENDPOINT
 @app.get("/api/recommendations/history")
 async def getRecommendationHistory(
@@ -398,6 +816,7 @@ async def dislikeGame(gameId: str, currentUser: dict = Depends(verifyToken)):
     
     try:
         savePreference(steamId, gameId, "disliked")
+        invalidateQueue(steamId)
         return {"status": "success", "gameId": gameId, "preference": "disliked", "message": f"Game {gameId} disliked"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -528,6 +947,29 @@ def healthCheck():
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
 
+def verifyMetricsAccess(request: Request) -> None:
+    """
+    Allow /metrics with the METRICS_TOKEN bearer token, or from loopback if no token is set
+    """
+    if METRICS_TOKEN:
+        expected = f"Bearer {METRICS_TOKEN}"
+        if not hmac.compare_digest(request.headers.get("Authorization", "").encode(), expected.encode()):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+        return
+
+    if not request.client or request.client.host not in ("127.0.0.1", "::1"):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Metrics are only available internally")
+
+
+@app.get("/metrics", dependencies=[Depends(verifyMetricsAccess)])
+def getMetrics():
+    """Operational counters for this worker"""
+    return {
+        "counters": getCounters(),
+        "circuits": getCircuitStates(),
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
 # USER EVENTS ENDPOINTS
 @app.post("/api/events/new")
 def createUserEvent(event: dict, currentUser: dict = Depends(verifyToken)):
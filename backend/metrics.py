@@ -0,0 +1,33 @@
+# In-process counters for operational metrics
+
+import threading
+
+from collections import defaultdict
+from typing import Dict
+
+_counters = defaultdict(int)
+_countersLock = threading.Lock()
+
+
+def incrementCounter(name: str, amount: int = 1) -> None:
+    """
+    Add to a named counter
+    """
+    with _countersLock:
+        _counters[name] += amount
+
+
+def getCounters() -> Dict[str, int]:
+    """
+    Get a snapshot of all counters
+    """
+    with _countersLock:
+        return dict(_counters)
+
+
+def resetCounters() -> None:
+    """
+    Clear all counters
+    """
+    with _countersLock:
+        _counters.clear()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict, Field, computed_field, field_validator
-from typing import List
+from typing import List, Optional
 
 # Pydantic models define the "shape" of your API data.
 
@@ -54,7 +54,25 @@ class Recommendation(BaseModel):
     reasoning: str
     matchScore: int = Field(85, serialization_alias="match_score")
 
+class BatchRecommendationRequest(BaseModel):
+    """Model for a batch recommendation request"""
+    genres: List[str] = []
+    count: int = Field(3, ge=1, le=10)
+
+class BatchRecommendationResponse(BaseModel):
+    """Model for several recommendations from one request"""
+    recommendations: List[Recommendation]
+
 class FilterGenresResponse(BaseModel):
     """Model for filter genres response"""
     steamId: str = Field(..., serialization_alias="steam_id")
-    savedGenres: List[str] = Field(..., serialization_alias="saved_genres")
\ No newline at end of file
+    savedGenres: List[str] = Field(..., serialization_alias="saved_genres")
+
+class LibraryStatusResponse(BaseModel):
+    """Model for owned games sync status"""
+    steamId: str = Field(..., serialization_alias="steam_id")
+    status: str
+    gameCount: int = Field(0, serialization_alias="game_count")
+    startedAt: Optional[str] = Field(None, serialization_alias="started_at")
+    finishedAt: Optional[str] = Field(None, serialization_alias="finished_at")
+    error: Optional[str] = None
\ No newline at end of file
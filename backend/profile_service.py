@@ -0,0 +1,142 @@
+# Cached Steam player profiles (batched GetPlayerSummaries refreshes)
+
+import os
+import threading
+import time
+
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+
+from steam_api import fetchPlayerSummaries, PLAYER_SUMMARIES_MAX_IDS
+from background_jobs import submitJob
+from metrics import incrementCounter
+from db_helper import (
+    cachePlayerSummaries,
+    getCachedPlayerSummary,
+    getStalePlayerSummaryIds,
+)
+
+# Load environment variables
+load_dotenv()
+
+# Profiles older than this are served from cache while a batched refresh runs
+PROFILE_CACHE_TTL_HOURS = int(os.getenv("PROFILE_CACHE_TTL_HOURS", "24"))
+
+# Periodic refresh of users who logged in within PROFILE_ACTIVE_DAYS
+PROFILE_REFRESH_INTERVAL_MINUTES = int(os.getenv("PROFILE_REFRESH_INTERVAL_MINUTES", "60"))
+PROFILE_ACTIVE_DAYS = int(os.getenv("PROFILE_ACTIVE_DAYS", "7"))
+PROFILE_REFRESH_MAX_USERS = int(os.getenv("PROFILE_REFRESH_MAX_USERS", "1000"))
+
+# Users waiting for the next batched refresh
+_pendingRefreshIds = set()
+_pendingRefreshLock = threading.Lock()
+
+
+def refreshPlayerSummaries(steamIds: List[str]) -> int:
+    """
+    Refresh cached profiles, up to 100 users per GetPlayerSummaries call
+    Returns number of profiles refreshed
+    """
+    refreshed = 0
+
+    for start in range(0, len(steamIds), PLAYER_SUMMARIES_MAX_IDS):
+        players = fetchPlayerSummaries(steamIds[start:start + PLAYER_SUMMARIES_MAX_IDS])
+
+        if players is None:
+            # Steam is unhealthy - cached profiles stay in use
+            incrementCounter("profileRefreshFailures")
+            break
+
+        refreshed += cachePlayerSummaries(players)
+
+    incrementCounter("profileRefreshes", refreshed)
+    return refreshed
+
+
+def flushProfileRefreshes() -> int:
+    """
+    Refresh every user queued by scheduleProfileRefresh
+    """
+    refreshed = 0
+
+    while True:
+        with _pendingRefreshLock:
+            steamIds = list(_pendingRefreshIds)
+            _pendingRefreshIds.clear()
+
+        if not steamIds:
+            return refreshed
+
+        refreshed += refreshPlayerSummaries(steamIds)
+
+
+def scheduleProfileRefresh(steamId: str) -> bool:
+    """
+    Queue a user for the next batched profile refresh
+    """
+    with _pendingRefreshLock:
+        _pendingRefreshIds.add(steamId)
+
+    return submitJob("profileRefresh", flushProfileRefreshes, onDone=_rescheduleProfileRefreshes)
+
+
+def _rescheduleProfileRefreshes() -> None:
+    """
+    Queue another flush for users added after the last one drained the queue
+    (their scheduleProfileRefresh call was deduped against the running flush)
+    """
+    with _pendingRefreshLock:
+        if not _pendingRefreshIds:
+            return
+
+    submitJob("profileRefresh", flushProfileRefreshes, onDone=_rescheduleProfileRefreshes)
+
+
+def refreshActiveProfiles() -> int:
+    """
+    Refresh stale profiles of recently active users
+    """
+    steamIds = getStalePlayerSummaryIds(PROFILE_CACHE_TTL_HOURS, PROFILE_ACTIVE_DAYS, PROFILE_REFRESH_MAX_USERS)
+    refreshed = refreshPlayerSummaries(steamIds)
+
+    print(f"[ProfileService] Refreshed {refreshed}/{len(steamIds)} active profiles")
+    return refreshed
+
+
+def scheduleActiveProfilesRefresh() -> bool:
+    """
+    Queue a refresh of stale active profiles
+    """
+    return submitJob("activeProfileRefresh", refreshActiveProfiles)
+
+
+def getPlayerProfile(steamId: str, fetchMissing: bool = True) -> Optional[Dict]:
+    """
+    Get a user's Steam profile summary
+    Fresh cache entries are returned as is, stale ones are returned and
+    queued for a batched refresh, and unknown users are fetched now
+    (or only queued if fetchMissing is False)
+    """
+    cached = getCachedPlayerSummary(steamId)
+
+    if cached:
+        if time.time() - cached['cachedAt'] >= PROFILE_CACHE_TTL_HOURS * 3600:
+            incrementCounter("profileCacheStaleServes")
+            scheduleProfileRefresh(steamId)
+        else:
+            incrementCounter("profileCacheHits")
+        return cached['summary']
+
+    incrementCounter("profileCacheMisses")
+    if not fetchMissing:
+        scheduleProfileRefresh(steamId)
+        return None
+
+    players = fetchPlayerSummaries([steamId])
+
+    if not players:
+        return None
+
+    cachePlayerSummaries(players)
+    return players[0]
+
@@ -0,0 +1,79 @@
+# Token budget for LLM prompts, so prompt size stays bounded regardless of library size
+
+import os
+
+from typing import Dict, List
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Max estimated tokens for one discovery prompt (template + profile + exclusions)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "4000"))
+
+# Rough chars-per-token ratio for English text
+CHARS_PER_TOKEN = 4
+
+
+def estimateTokens(text: str) -> int:
+    """
+    Estimate the token count of a piece of text
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class PromptBudget:
+    """
+    Tracks estimated tokens per prompt section against a total budget
+    Sections are filled in priority order; each list keeps its items in rank
+    order and stops at the first item that no longer fits
+    """
+    def __init__(self, totalTokens: int = PROMPT_TOKEN_BUDGET):
+        """
+        Start with an empty budget
+        """
+        self.totalTokens = totalTokens
+        self.sections: Dict[str, int] = {}
+
+    def used(self) -> int:
+        """
+        Tokens used so far
+        """
+        return sum(self.sections.values())
+
+    def remaining(self) -> int:
+        """
+        Tokens left (0 once over budget)
+        """
+        return max(0, self.totalTokens - self.used())
+
+    def add(self, section: str, text: str) -> str:
+        """
+        Account for a fixed section (always included)
+        """
+        self.sections[section] = self.sections.get(section, 0) + estimateTokens(text)
+        return text
+
+    def fitLines(self, section: str, lines: List[str], maxTokens: int = None, separator: str = "\n") -> List[str]:
+        """
+        Keep the leading lines that fit in the remaining budget (and maxTokens, if given)
+        """
+        limit = self.remaining() if maxTokens is None else min(maxTokens, self.remaining())
+        kept = []
+        tokens = 0
+
+        for line in lines:
+            lineTokens = estimateTokens(line + separator)
+            if tokens + lineTokens > limit:
+                break
+            kept.append(line)
+            tokens += lineTokens
+
+        self.sections[section] = self.sections.get(section, 0) + tokens
+        return kept
+
+    def report(self) -> Dict[str, int]:
+        """
+        Estimated tokens per section, plus the total
+        """
+        return {**self.sections, "total": self.used()}
@@ -0,0 +1,112 @@
+# Shared token-bucket rate limiter for outbound Steam calls
+
+import os
+import random
+import time
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from dotenv import load_dotenv
+
+from db_helper import takeRateLimitToken, blockRateLimitBucket
+
+# Load environment variables
+load_dotenv()
+
+# Priority classes
+PRIORITY_INTERACTIVE = "interactive"  # User is waiting on the result
+PRIORITY_BACKGROUND = "background"    # Refresh jobs, warm-ups
+
+# Buckets
+STEAM_STORE_BUCKET = "steam_store"
+
+# Steam store throttles around 200 requests per 5 minutes per IP
+STEAM_STORE_RATE_LIMIT = int(os.getenv("STEAM_STORE_RATE_LIMIT", "200"))
+STEAM_STORE_RATE_WINDOW_SECONDS = int(os.getenv("STEAM_STORE_RATE_WINDOW_SECONDS", "300"))
+
+# Fraction of the bucket that background callers are not allowed to use
+RATE_LIMIT_BACKGROUND_RESERVE = float(os.getenv("RATE_LIMIT_BACKGROUND_RESERVE", "0.25"))
+
+# How long a caller is willing to wait for a token (seconds)
+RATE_LIMIT_MAX_WAIT_SECONDS = {
+    PRIORITY_INTERACTIVE: float(os.getenv("RATE_LIMIT_INTERACTIVE_MAX_WAIT_SECONDS", "10")),
+    PRIORITY_BACKGROUND: float(os.getenv("RATE_LIMIT_BACKGROUND_MAX_WAIT_SECONDS", "120")),
+}
+
+# Used when Steam sends a 429 without a usable Retry-After header
+DEFAULT_RETRY_AFTER_SECONDS = float(os.getenv("RATE_LIMIT_DEFAULT_RETRY_AFTER_SECONDS", "30"))
+
+# bucket -> (capacity, window seconds)
+BUCKETS = {
+    STEAM_STORE_BUCKET: (STEAM_STORE_RATE_LIMIT, STEAM_STORE_RATE_WINDOW_SECONDS),
+}
+
+
+def acquireToken(
+    bucket: str = STEAM_STORE_BUCKET,
+    priority: str = PRIORITY_INTERACTIVE,
+    maxWaitSeconds: Optional[float] = None
+) -> bool:
+    """
+    Wait for a token from a bucket shared by all workers
+    Returns False if no token became available within maxWaitSeconds
+    """
+    capacity, windowSeconds = BUCKETS[bucket]
+    refillPerSecond = capacity / windowSeconds
+
+    # Background callers leave a reserve for interactive lookups
+    reserve = capacity * RATE_LIMIT_BACKGROUND_RESERVE if priority == PRIORITY_BACKGROUND else 0
+
+    if maxWaitSeconds is None:
+        maxWaitSeconds = RATE_LIMIT_MAX_WAIT_SECONDS.get(priority, 0)
+
+    giveUpAt = time.time() + maxWaitSeconds
+
+    while True:
+        try:
+            waitSeconds = takeRateLimitToken(bucket, capacity, refillPerSecond, reserve)
+        except Exception as e:
+            # Limiter state unavailable - don't block Steam calls on it
+            print(f"[RateLimiter] Error taking token from {bucket}: {e}")
+            return True
+
+        if waitSeconds <= 0:
+            return True
+
+        remaining = giveUpAt - time.time()
+        if waitSeconds > remaining:
+            print(f"[RateLimiter] No {bucket} token for {priority} caller within {maxWaitSeconds:.0f}s")
+            return False
+
+        # Jitter so waiting workers don't all wake up at the same moment
+        time.sleep(waitSeconds + random.uniform(0, 0.1))
+
+
+def reportRetryAfter(bucket: str, retryAfterSeconds: float) -> None:
+    """
+    Block a bucket for every worker after Steam returned 429
+    """
+    print(f"[RateLimiter] {bucket} rate limited, blocking for {retryAfterSeconds:.0f}s")
+    blockRateLimitBucket(bucket, time.time() + retryAfterSeconds)
+
+
+def parseRetryAfter(headerValue, default: float = DEFAULT_RETRY_AFTER_SECONDS) -> float:
+    """
+    Parse a Retry-After header (delay in seconds or HTTP date)
+    """
+    if not isinstance(headerValue, str) or not headerValue.strip():
+        return default
+
+    value = headerValue.strip()
+
+    if value.isdigit():
+        return float(value)
+
+    try:
+        retryAt = parsedate_to_datetime(value)
+        if retryAt.tzinfo is None:
+            retryAt = retryAt.replace(tzinfo=timezone.utc)
+        return max(0.0, (retryAt - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return default
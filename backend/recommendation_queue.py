@@ -0,0 +1,146 @@
+# Precomputed recommendations, so most clicks are served without waiting on the AI
+
+import os
+
+from typing import Dict, List, Optional, Set
+from dotenv import load_dotenv
+
+from game_recommender import generateSmartRecommendation
+from background_jobs import submitJob
+from deadline import Deadline
+from metrics import incrementCounter
+from db_helper import (
+    getUserGamingProfile,
+    getOwnedGamesIds,
+    getRecommendedGameIds,
+    getPreferenceGameIds,
+    getQueueGeneration,
+    enqueueRecommendation,
+    popQueuedRecommendation,
+    getQueuedGameIds,
+    countQueuedRecommendations,
+    clearRecommendationQueue,
+)
+
+# Load environment variables
+load_dotenv()
+
+# Validated recommendations kept ready per user and genre selection (0 disables the queue)
+RECOMMENDATION_QUEUE_SIZE = int(os.getenv("RECOMMENDATION_QUEUE_SIZE", "3"))
+# Queued entries older than this are dropped (prices and reasoning go stale)
+RECOMMENDATION_QUEUE_MAX_AGE_HOURS = float(os.getenv("RECOMMENDATION_QUEUE_MAX_AGE_HOURS", "24"))
+# Time budget for generating one queued recommendation in the background
+RECOMMENDATION_QUEUE_DEADLINE_SECONDS = float(os.getenv("RECOMMENDATION_QUEUE_DEADLINE_SECONDS", "30"))
+
+def genresKey(requestedGenres: Optional[List[str]]) -> str:
+    """
+    Normalized key for a genre selection
+    """
+    return ",".join(sorted({genre.strip().lower() for genre in requestedGenres or []}))
+
+
+def _excludedGameIds(steamId: str) -> Set[str]:
+    """
+    Games the user must not be recommended: owned, already recommended or disliked
+    """
+    return (
+        set(getOwnedGamesIds(steamId))
+        | set(getRecommendedGameIds(steamId))
+        | set(getPreferenceGameIds(steamId, "disliked"))
+    )
+
+
+def refillQueue(steamId: str, requestedGenres: List[str]) -> int:
+    """
+    Generate recommendations until the user's queue for this selection is full
+    Returns number of recommendations queued
+    """
+    key = genresKey(requestedGenres)
+    generation = getQueueGeneration(steamId)
+    queued = 0
+    missing = RECOMMENDATION_QUEUE_SIZE - countQueuedRecommendations(steamId, key, RECOMMENDATION_QUEUE_MAX_AGE_HOURS)
+
+    if missing <= 0:
+        return 0
+
+    gamingProfile = getUserGamingProfile(steamId)
+    excludeGameIds = _excludedGameIds(steamId) | set(getQueuedGameIds(steamId))
+
+    for slot in range(missing):
+        recommendation = generateSmartRecommendation(
+            gamingProfile=gamingProfile,
+            requestedGenres=requestedGenres,
+            excludeGameIds=excludeGameIds,
+            logPrefix=f"Queue {slot + 1}/{missing}",
+            deadline=Deadline(RECOMMENDATION_QUEUE_DEADLINE_SECONDS)
+        )
+
+        if not recommendation:
+            incrementCounter("recommendationQueueRefillFailures")
+            break
+
+        # The generation lives in the DB, so invalidations from any worker are seen here
+        if getQueueGeneration(steamId) != generation:
+            print(f"[RecommendationQueue] Queue for {steamId} invalidated during refill, stopping")
+            break
+
+        excludeGameIds.add(recommendation["game"]["gameId"])
+        if enqueueRecommendation(steamId, key, recommendation, generation):
+            queued += 1
+
+    incrementCounter("recommendationQueueRefills", queued)
+    print(f"[RecommendationQueue] Queued {queued} recommendations for {steamId} ({key or 'any genre'})")
+    return queued
+
+
+def scheduleQueueRefill(steamId: str, requestedGenres: List[str]) -> bool:
+    """
+    Queue a background refill for a user's genre selection
+    """
+    if RECOMMENDATION_QUEUE_SIZE <= 0:
+        return False
+
+    return submitJob(
+        f"recommendationQueue:{steamId}:{genresKey(requestedGenres)}",
+        refillQueue,
+        steamId,
+        list(requestedGenres or [])
+    )
+
+
+def popRecommendation(steamId: str, requestedGenres: List[str]) -> Optional[Dict]:
+    """
+    Take the next ready recommendation for a selection ({game, reasoning, matchScore})
+    Entries the user has since bought, disliked or been recommended are dropped
+    """
+    if RECOMMENDATION_QUEUE_SIZE <= 0:
+        return None
+
+    excludeGameIds = None
+    while True:
+        recommendation = popQueuedRecommendation(steamId, genresKey(requestedGenres), RECOMMENDATION_QUEUE_MAX_AGE_HOURS)
+        if not recommendation:
+            break
+
+        if excludeGameIds is None:
+            excludeGameIds = _excludedGameIds(steamId)
+
+        gameId = str(recommendation["game"].get("gameId", ""))
+        if gameId not in excludeGameIds:
+            break
+
+        print(f"[RecommendationQueue] Dropped queued recommendation {gameId} for {steamId} (no longer eligible)")
+        incrementCounter("recommendationQueueStale")
+
+    incrementCounter("recommendationQueueHits" if recommendation else "recommendationQueueMisses")
+    return recommendation
+
+
+def invalidateQueue(steamId: str) -> int:
+    """
+    Drop a user's queued recommendations (their library or dislikes changed)
+    """
+    removed = clearRecommendationQueue(steamId)
+    if removed:
+        print(f"[RecommendationQueue] Dropped {removed} queued recommendations for {steamId}")
+    return removed
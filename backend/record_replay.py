@@ -0,0 +1,258 @@
+# Record/replay of Steam and Gemini traffic for offline load tests and benchmarks
+
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# "record" appends every Steam/Gemini exchange to RECORDINGS_DIR
+RECORD_MODE = os.getenv("RECORD_MODE", "off").lower() == "record"
+RECORDINGS_DIR = os.getenv("RECORDINGS_DIR", "recordings")
+
+# Services (one <service>.jsonl fixture file each)
+STEAM_SERVICE = "steam"
+GEMINI_SERVICE = "gemini"
+
+# Query params that never take part in matching (and are never written to disk)
+IGNORED_PARAMS = {"key"}
+
+# Chunks per replayed streaming LLM response
+REPLAY_STREAM_CHUNKS = 8
+
+_recordLock = threading.Lock()
+
+
+# RECORDING
+def requestKey(path: str, params: Optional[Dict] = None) -> str:
+    """
+    Stable key for a request (path plus sorted params, secrets dropped)
+    """
+    cleanParams = sorted(
+        (str(name), str(value))
+        for name, value in (params or {}).items()
+        if name not in IGNORED_PARAMS
+    )
+    return path + "?" + "&".join(f"{name}={value}" for name, value in cleanParams)
+
+
+def promptKey(prompt: str) -> str:
+    """
+    Key for an LLM prompt
+    """
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def recordExchange(service: str, key: str, response: Dict, elapsedMs: float, directory: Optional[str] = None) -> None:
+    """
+    Append one request/response pair to the service's fixture file
+    """
+    directory = directory or RECORDINGS_DIR
+    entry = {"key": key, "response": response, "elapsedMs": round(elapsedMs, 1)}
+
+    try:
+        with _recordLock:
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f"{service}.jsonl"), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+    except Exception as e:
+        print(f"[RecordReplay] Failed to record {service} exchange: {e}")
+
+
+def recordHttpExchange(url: str, params: Dict, response, elapsedMs: float) -> None:
+    """
+    Record a Steam HTTP response (status, Retry-After and body)
+    """
+    if not RECORD_MODE:
+        return
+
+    recordExchange(
+        STEAM_SERVICE,
+        requestKey(urlparse(url).path, params),
+        {
+            "status": response.status_code,
+            "retryAfter": response.headers.get("Retry-After"),
+            "body": response.text,
+        },
+        elapsedMs
+    )
+
+
+def loadRecordings(service: str, directory: Optional[str] = None) -> Dict[str, List[Dict]]:
+    """
+    Load a fixture file as key -> recorded entries (in recording order)
+    """
+    path = os.path.join(directory or RECORDINGS_DIR, f"{service}.jsonl")
+    recordings = {}
+
+    if not os.path.exists(path):
+        print(f"[RecordReplay] No recordings at {path}")
+        return recordings
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                recordings.setdefault(entry["key"], []).append(entry)
+
+    return recordings
+
+
+# REPLAY BEHAVIOUR
+class ReplayProfile:
+    """
+    Latency distribution and injected failures for replayed responses
+
+    latency is "none", "recorded" (use the captured timings),
+    "fixed:<ms>" or "lognormal:<median ms>:<sigma>"
+    """
+    def __init__(self, latency: str = "recorded", errorRate: float = 0.0, seed: Optional[int] = None):
+        """
+        Parse the latency spec and seed the random source
+        """
+        self.latency = latency
+        self.errorRate = errorRate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        kind, _, args = latency.partition(":")
+        if kind not in ("none", "recorded", "fixed", "lognormal"):
+            raise ValueError(f"Unsupported latency spec: {latency}")
+        self._kind = kind
+        self._args = [float(arg) for arg in args.split(":")] if args else []
+
+    def sampleLatencyMs(self, recordedMs: float = 0.0) -> float:
+        """
+        Latency to apply to one response
+        """
+        if self._kind == "recorded":
+            return recordedMs
+        if self._kind == "fixed":
+            return self._args[0]
+        if self._kind == "lognormal":
+            medianMs, sigma = self._args
+            with self._lock:
+                return medianMs * math.exp(self._random.gauss(0, sigma))
+        return 0.0
+
+    def roll(self, rate: float) -> bool:
+        """
+        True with the given probability
+        """
+        with self._lock:
+            return self._random.random() < rate
+
+    def shouldFail(self) -> bool:
+        """
+        Whether to inject a failure for this response
+        """
+        return self.roll(self.errorRate)
+
+
+def replayProfileFromEnv(prefix: str) -> ReplayProfile:
+    """
+    Build a profile from <prefix>_LATENCY, <prefix>_ERROR_RATE and <prefix>_SEED
+    """
+    seed = os.getenv(f"{prefix}_SEED")
+    return ReplayProfile(
+        latency=os.getenv(f"{prefix}_LATENCY", "recorded"),
+        errorRate=float(os.getenv(f"{prefix}_ERROR_RATE", "0")),
+        seed=int(seed) if seed else None,
+    )
+
+
+# LLM REPLAY
+class ReplayResponse:
+    """
+    Minimal stand-in for a Gemini response
+    """
+    def __init__(self, text: str):
+        self.text = text
+
+
+class ReplayModel:
+    """
+    Fake LLM model that replays recorded Gemini responses
+    Exact prompt matches are replayed first, otherwise recordings are cycled in order
+    """
+    def __init__(self, directory: Optional[str] = None, profile: Optional[ReplayProfile] = None):
+        """
+        Load recorded Gemini responses
+        """
+        self.profile = profile or replayProfileFromEnv("LLM_REPLAY")
+        self.recordings = loadRecordings(GEMINI_SERVICE, directory)
+        self._ordered = [entry for entries in self.recordings.values() for entry in entries]
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def _pickEntry(self, prompt: str) -> Dict:
+        """
+        Recording for a prompt
+        """
+        with self._lock:
+            entries = self.recordings.get(promptKey(prompt))
+            if entries:
+                return entries[0]
+
+            if not self._ordered:
+                raise RuntimeError("No recorded Gemini responses to replay")
+
+            entry = self._ordered[self._next % len(self._ordered)]
+            self._next += 1
+            return entry
+
+    def generate_content(self, prompt: str, request_options: Optional[Dict] = None, stream: bool = False, **kwargs):
+        """
+        Replay a response with the configured latency and error rate
+        Honors request_options["timeout"] like the real client
+        With stream=True, returns chunks spread over the latency
+        """
+        if stream:
+            return self._streamContent(prompt, request_options)
+
+        entry = self._pickEntry(prompt)
+        latencySeconds = self.profile.sampleLatencyMs(entry.get("elapsedMs", 0)) / 1000
+        timeout = (request_options or {}).get("timeout")
+
+        if timeout is not None and latencySeconds > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("LLM replay timed out")
+
+        time.sleep(latencySeconds)
+
+        if self.profile.shouldFail():
+            raise RuntimeError("Injected LLM replay failure")
+
+        return ReplayResponse(entry["response"]["text"])
+
+    def _streamContent(self, prompt: str, request_options: Optional[Dict] = None) -> Iterator[ReplayResponse]:
+        """
+        Replay a response as REPLAY_STREAM_CHUNKS chunks
+        """
+        entry = self._pickEntry(prompt)
+        latencySeconds = self.profile.sampleLatencyMs(entry.get("elapsedMs", 0)) / 1000
+        timeout = (request_options or {}).get("timeout")
+
+        if self.profile.shouldFail():
+            raise RuntimeError("Injected LLM replay failure")
+
+        text = entry["response"]["text"]
+        chunkSize = max(1, math.ceil(len(text) / REPLAY_STREAM_CHUNKS))
+        elapsed = 0.0
+
+        for start in range(0, len(text), chunkSize):
+            delay = latencySeconds / REPLAY_STREAM_CHUNKS
+            if timeout is not None and elapsed + delay > timeout:
+                raise TimeoutError("LLM replay timed out")
+            time.sleep(delay)
+            elapsed += delay
+            yield ReplayResponse(text[start:start + chunkSize])
@@ -0,0 +1,126 @@
+# Local stand-in for the Steam Web API and store API, replaying recorded responses
+#
+# Usage:
+#   python replay_server.py --port 8100 --latency lognormal:80:0.5 --error-rate 0.02
+# then run the backend with
+#   STEAM_API_BASE=http://localhost:8100 STEAM_STORE_API=http://localhost:8100/api
+
+import argparse
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, parse_qsl
+
+from record_replay import (
+    STEAM_SERVICE,
+    ReplayProfile,
+    loadRecordings,
+    requestKey,
+)
+
+
+class ReplayState:
+    """
+    Recordings plus per-key cursors (repeated requests cycle through their recordings)
+    """
+    def __init__(self, recordings: Dict[str, List[Dict]], profile: ReplayProfile, rateLimitRate: float = 0.0):
+        self.recordings = recordings
+        self.profile = profile
+        self.rateLimitRate = rateLimitRate
+        self._cursors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def nextEntry(self, key: str) -> Optional[Dict]:
+        """
+        Next recording for a request key
+        """
+        entries = self.recordings.get(key)
+        if not entries:
+            return None
+
+        with self._lock:
+            index = self._cursors.get(key, 0)
+            self._cursors[key] = index + 1
+        return entries[index % len(entries)]
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """
+    Serve recorded responses for GET requests
+    """
+    state: ReplayState = None
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        key = requestKey(parsed.path, dict(parse_qsl(parsed.query)))
+        entry = self.state.nextEntry(key)
+
+        if entry is None:
+            self._send(404, '{"error": "no recording"}')
+            return
+
+        time.sleep(self.state.profile.sampleLatencyMs(entry.get("elapsedMs", 0)) / 1000)
+
+        # Injected failures (429 first so rate limit handling can be exercised on its own)
+        if self.state.profile.roll(self.state.rateLimitRate):
+            self._send(429, "", retryAfter="1")
+            return
+        if self.state.profile.shouldFail():
+            self._send(503, "")
+            return
+
+        response = entry["response"]
+        self._send(response["status"], response["body"], response.get("retryAfter"))
+
+    def _send(self, status: int, body: str, retryAfter: Optional[str] = None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if retryAfter:
+            self.send_header("Retry-After", retryAfter)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Keep load test output quiet
+        pass
+
+
+def createReplayServer(
+    host: str = "127.0.0.1",
+    port: int = 8100,
+    directory: Optional[str] = None,
+    profile: Optional[ReplayProfile] = None,
+    rateLimitRate: float = 0.0
+) -> ThreadingHTTPServer:
+    """
+    Build a replay server (call serve_forever to run it)
+    """
+    state = ReplayState(loadRecordings(STEAM_SERVICE, directory), profile or ReplayProfile(), rateLimitRate)
+    handler = type("BoundReplayHandler", (ReplayHandler,), {"state": state})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded Steam responses")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--recordings", default=None, help="Recordings directory (default RECORDINGS_DIR)")
+    parser.add_argument("--latency", default="recorded", help="none, recorded, fixed:<ms> or lognormal:<median ms>:<sigma>")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of responses replaced by 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of responses replaced by 429")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = createReplayServer(
+        args.host,
+        args.port,
+        args.recordings,
+        ReplayProfile(args.latency, args.error_rate, args.seed),
+        args.rate_limit_rate
+    )
+    print(f"Replaying Steam on http://{args.host}:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,177 @@
+# Shared retry policy for outbound calls (Steam, Gemini)
+
+import os
+import random
+import threading
+import time
+
+from typing import Dict, Optional
+from dotenv import load_dotenv
+
+from deadline import Deadline
+from metrics import incrementCounter
+
+# Load environment variables
+load_dotenv()
+
+# Retries allowed per first attempt, as a fraction of traffic (per process)
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+# Burst of retries available when traffic is low
+RETRY_BUDGET_MAX_TOKENS = float(os.getenv("RETRY_BUDGET_MAX_TOKENS", "10"))
+
+# HTTP statuses worth retrying (throttling and server errors)
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Exception types worth retrying, by class name so optional SDKs need not be imported
+RETRYABLE_EXCEPTION_NAMES = {
+    # requests / urllib3
+    "Timeout", "ConnectTimeout", "ReadTimeout", "ConnectionError", "ChunkedEncodingError",
+    # builtins
+    "TimeoutError", "ConnectionResetError",
+    # google.api_core (Gemini)
+    "ServiceUnavailable", "DeadlineExceeded", "ResourceExhausted", "InternalServerError", "TooManyRequests",
+}
+
+
+def isRetryableStatus(statusCode: int) -> bool:
+    """
+    Check if an HTTP status is a transient failure
+    """
+    return statusCode in RETRYABLE_STATUS_CODES
+
+
+def isRetryableError(error: BaseException) -> bool:
+    """
+    Check if an exception is a transient failure (timeouts, connection drops, overload)
+    """
+    return any(cls.__name__ in RETRYABLE_EXCEPTION_NAMES for cls in type(error).__mro__)
+
+
+class RetryBudget:
+    """
+    Caps retries at a fraction of first attempts so retries can't multiply load during an outage
+    Every first attempt deposits `ratio` tokens (up to maxTokens), every retry spends one
+    """
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, maxTokens: float = RETRY_BUDGET_MAX_TOKENS):
+        """
+        Start with a full budget
+        """
+        self.ratio = ratio
+        self.maxTokens = maxTokens
+        self._tokens = maxTokens
+        self._lock = threading.Lock()
+
+    def recordAttempt(self) -> None:
+        """
+        Record a first attempt
+        """
+        with self._lock:
+            self._tokens = min(self._tokens + self.ratio, self.maxTokens)
+
+    def tryRetry(self) -> bool:
+        """
+        Spend a token for a retry (False if the budget is used up)
+        """
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RetryPolicy:
+    """
+    Max attempts, full-jitter exponential backoff and a shared retry budget for one dependency
+    """
+    def __init__(
+        self,
+        name: str,
+        maxAttempts: int = 3,
+        baseDelaySeconds: float = 0.5,
+        maxDelaySeconds: float = 8.0,
+        budget: Optional[RetryBudget] = None
+    ):
+        """
+        Initialize policy
+        """
+        self.name = name
+        self.maxAttempts = maxAttempts
+        self.baseDelaySeconds = baseDelaySeconds
+        self.maxDelaySeconds = maxDelaySeconds
+        self.budget = budget or RetryBudget()
+
+    def backoffSeconds(self, attempt: int) -> float:
+        """
+        Full-jitter delay before retry number `attempt` (0-based)
+        """
+        return random.uniform(0, min(self.maxDelaySeconds, self.baseDelaySeconds * (2 ** attempt)))
+
+    def recordAttempt(self) -> None:
+        """
+        Record a first attempt (earns retry budget)
+        """
+        self.budget.recordAttempt()
+
+    def retryAfterFailure(
+        self,
+        attempt: int,
+        deadline: Optional[Deadline] = None,
+        waitForBackoff: bool = True,
+        maxAttempts: Optional[int] = None
+    ) -> bool:
+        """
+        Decide whether to retry after attempt `attempt` (0-based) failed transiently,
+        and sleep the backoff if so (callers that already waited, e.g. on the
+        rate limiter, pass waitForBackoff=False)
+        Returns False if attempts, retry budget or deadline are used up
+        """
+        if attempt + 1 >= (maxAttempts or self.maxAttempts):
+            return False
+
+        if not self.budget.tryRetry():
+            print(f"[RetryPolicy] {self.name} retry budget exhausted")
+            incrementCounter(f"retry.{self.name}.budgetExhausted")
+            return False
+
+        delay = self.backoffSeconds(attempt) if waitForBackoff else 0
+
+        if deadline:
+            if not deadline.sleep(delay):
+                incrementCounter(f"retry.{self.name}.deadlineExceeded")
+                return False
+        elif delay > 0:
+            time.sleep(delay)
+
+        incrementCounter(f"retry.{self.name}.retries")
+        return True
+
+
+def _policyFromEnv(name: str, maxAttempts: int, baseDelaySeconds: float, maxDelaySeconds: float) -> RetryPolicy:
+    """
+    Build a policy with <NAME>_RETRY_* overrides
+    """
+    prefix = name.upper()
+    return RetryPolicy(
+        name,
+        maxAttempts=int(os.getenv(f"{prefix}_RETRY_MAX_ATTEMPTS", maxAttempts)),
+        baseDelaySeconds=float(os.getenv(f"{prefix}_RETRY_BASE_DELAY_SECONDS", baseDelaySeconds)),
+        maxDelaySeconds=float(os.getenv(f"{prefix}_RETRY_MAX_DELAY_SECONDS", maxDelaySeconds)),
+    )
+
+
+# Per-dependency policies (each with its own budget)
+STEAM_STORE_RETRY = _policyFromEnv("steam_store", 3, 1.0, 8.0)
+STEAM_WEB_API_RETRY = _policyFromEnv("steam_web_api", 2, 0.5, 4.0)
+GEMINI_RETRY = _policyFromEnv("gemini", 3, 0.5, 4.0)
+
+RETRY_POLICIES: Dict[str, RetryPolicy] = {
+    policy.name: policy for policy in (STEAM_STORE_RETRY, STEAM_WEB_API_RETRY, GEMINI_RETRY)
+}
+
+
+def resetRetryBudgets() -> None:
+    """
+    Refill every policy's retry budget
+    """
+    for policy in RETRY_POLICIES.values():
+        policy.budget = RetryBudget(policy.budget.ratio, policy.budget.maxTokens)
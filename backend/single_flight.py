@@ -0,0 +1,118 @@
+# Single-flight coalescing for concurrent duplicate fetches
+
+import os
+import socket
+import threading
+import time
+
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional
+from dotenv import load_dotenv
+
+from db_helper import acquireFetchLease, releaseFetchLease, isFetchLeaseHeld
+
+# Load environment variables
+load_dotenv()
+
+# How long another worker may hold a key before we stop waiting on it (seconds)
+SINGLE_FLIGHT_LEASE_SECONDS = float(os.getenv("SINGLE_FLIGHT_LEASE_SECONDS", "15"))
+SINGLE_FLIGHT_POLL_SECONDS = float(os.getenv("SINGLE_FLIGHT_POLL_SECONDS", "0.2"))
+
+# Identifies this worker in lease rows
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# In-process fetches: key -> future shared by every waiting caller
+_inFlight: Dict[str, Future] = {}
+_inFlightLock = threading.Lock()
+
+
+def singleFlight(
+    key: str,
+    fetchFn: Callable[[], Any],
+    lookupFn: Optional[Callable[[], Any]] = None,
+    leaseSeconds: float = SINGLE_FLIGHT_LEASE_SECONDS,
+    maxWaitSeconds: Optional[float] = None
+) -> Any:
+    """
+    Run fetchFn once for all concurrent callers of the same key
+    Callers in this process share one future. If lookupFn is given, a lease row
+    also coalesces callers in other workers, which read the stored result with it.
+    Callers that wait on someone else's fetch give up (None) after maxWaitSeconds.
+    """
+    with _inFlightLock:
+        future = _inFlight.get(key)
+        isLeader = future is None
+        if isLeader:
+            future = Future()
+            _inFlight[key] = future
+
+    if not isLeader:
+        print(f"[SingleFlight] Joining in-flight fetch for {key}")
+        try:
+            return future.result(timeout=maxWaitSeconds)
+        except FutureTimeoutError:
+            print(f"[SingleFlight] Gave up waiting for {key}")
+            return None
+
+    try:
+        result = _runWithLease(key, fetchFn, lookupFn, leaseSeconds, maxWaitSeconds)
+        future.set_result(result)
+        return result
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inFlightLock:
+            _inFlight.pop(key, None)
+
+
+def _runWithLease(
+    key: str,
+    fetchFn: Callable[[], Any],
+    lookupFn: Optional[Callable[[], Any]],
+    leaseSeconds: float,
+    maxWaitSeconds: Optional[float] = None
+) -> Any:
+    """
+    Fetch under a cross-worker lease, or wait for the worker holding it
+    """
+    if lookupFn is None:
+        return fetchFn()
+
+    try:
+        hasLease = acquireFetchLease(key, WORKER_ID, leaseSeconds)
+    except Exception as e:
+        # Lease table unavailable - fall back to in-process coalescing only
+        print(f"[SingleFlight] Error acquiring lease for {key}: {e}")
+        return fetchFn()
+
+    if hasLease:
+        try:
+            # Another worker may have stored the result just before we got the lease
+            result = lookupFn()
+            if result is not None:
+                return result
+            return fetchFn()
+        finally:
+            releaseFetchLease(key, WORKER_ID)
+
+    # Another worker is fetching - wait for its result
+    print(f"[SingleFlight] Waiting on another worker for {key}")
+    giveUpAt = time.time() + (leaseSeconds if maxWaitSeconds is None else min(leaseSeconds, maxWaitSeconds))
+
+    while time.time() < giveUpAt:
+        time.sleep(SINGLE_FLIGHT_POLL_SECONDS)
+
+        result = lookupFn()
+        if result is not None:
+            return result
+
+        if not isFetchLeaseHeld(key):
+            break
+
+    # Holder finished without a stored result or went away
+    result = lookupFn()
+    if result is not None:
+        return result
+
+    return fetchFn()
@@ -6,32 +6,149 @@ import time
 from typing import Optional, Dict, List
 from dotenv import load_dotenv
 
+from rate_limiter import (
+    STEAM_STORE_BUCKET,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_BACKGROUND,
+    RATE_LIMIT_MAX_WAIT_SECONDS,
+    acquireToken,
+    reportRetryAfter,
+    parseRetryAfter,
+)
+from circuit_breaker import (
+    STEAM_STORE_CIRCUIT,
+    STEAM_WEB_API_CIRCUIT,
+    getCircuitBreaker,
+)
+from db_helper import trimGameData
+from record_replay import recordHttpExchange
+from deadline import Deadline, remainingOr
+from retry_policy import (
+    STEAM_STORE_RETRY,
+    STEAM_WEB_API_RETRY,
+    RetryPolicy,
+    isRetryableStatus,
+    isRetryableError,
+)
 
 # Load environment variables
 load_dotenv()
 
 # Steam API Configuration
-STEAM_API_BASE = "https://api.steampowered.com"
-STEAM_STORE_API = "https://store.steampowered.com/api"
+# (point both at replay_server.py for offline load tests)
+STEAM_API_BASE = os.getenv("STEAM_API_BASE", "https://api.steampowered.com")
+STEAM_STORE_API = os.getenv("STEAM_STORE_API", "https://store.steampowered.com/api")
 STEAM_API_KEY = os.getenv("STEAM_API_KEY", "your-steam-web-api-key")
 
 # API Configuration
 API_TIMEOUT_SECONDS = int(os.getenv("API_TIMEOUT_SECONDS", "10"))
 
+# GetPlayerSummaries accepts at most 100 steamids per call
+PLAYER_SUMMARIES_MAX_IDS = 100
+
+# appdetails filter groups ("basic" covers name, type, header_image, short_description)
+STEAM_STORE_FILTERS = os.getenv(
+    "STEAM_STORE_FILTERS",
+    "basic,price_overview,release_date,developers,publishers,genres,categories"
+)
+
+
+def _recordRequestFailure(circuitName: str, error: Exception) -> None:
+    """
+    Count timeouts, connection errors and 5xx responses against a breaker
+    (a 4xx means Steam answered, so it counts as healthy)
+    """
+    response = getattr(error, "response", None)
+    if response is not None and response.status_code < 500:
+        # Client error - the dependency itself is healthy
+        getCircuitBreaker(circuitName).recordSuccess()
+        return
+    getCircuitBreaker(circuitName).recordFailure()
+
+
+def _steamGet(
+    url: str,
+    params: Dict,
+    timeout: float = API_TIMEOUT_SECONDS,
+    retryPolicy: Optional[RetryPolicy] = None,
+    deadline: Optional[Deadline] = None
+) -> requests.Response:
+    """
+    GET a Steam endpoint (recorded to fixtures when RECORD_MODE=record)
+    With a retry policy, transient errors and statuses are retried with backoff
+    (backoff and each attempt's timeout are capped by the deadline if given)
+    """
+    if retryPolicy:
+        retryPolicy.recordAttempt()
+
+    attempt = 0
+    while True:
+        try:
+            startTime = time.monotonic()
+            response = requests.get(url, params=params, timeout=remainingOr(deadline, timeout))
+            recordHttpExchange(url, params, response, (time.monotonic() - startTime) * 1000)
+        except Exception as e:
+            if retryPolicy and isRetryableError(e) and retryPolicy.retryAfterFailure(attempt, deadline):
+                attempt += 1
+                continue
+            raise
+
+        if retryPolicy and isRetryableStatus(response.status_code) and retryPolicy.retryAfterFailure(attempt, deadline):
+            attempt += 1
+            continue
+
+        return response
+
+
+def _appDetailsParams(gameId: str) -> Dict:
+    """
+    Query params for a single-app appdetails request
+    """
+    params = {"appids": gameId, "cc": "US"}
+    if STEAM_STORE_FILTERS:
+        params["filters"] = STEAM_STORE_FILTERS
+    return params
+
 
 # GAME DETAILS
-def fetchGameDetails(gameId: str) -> Optional[dict]:
+def fetchGameDetails(
+    gameId: str,
+    priority: str = PRIORITY_INTERACTIVE,
+    deadline: Optional[Deadline] = None
+) -> Optional[dict]:
     """
     Fetch game details from Steam API 
     """
     print(f"[fetchGameDetails] Fetching game {gameId} from Steam API")
 
+    if deadline and deadline.expired():
+        print(f"[fetchGameDetails] Deadline exceeded, skipping {gameId}")
+        return None
+
+    breaker = getCircuitBreaker(STEAM_STORE_CIRCUIT)
+    if not breaker.allowRequest():
+        print(f"[fetchGameDetails] Steam store circuit open, skipping {gameId}")
+        return None
+
     try:
+        maxWait = remainingOr(deadline, RATE_LIMIT_MAX_WAIT_SECONDS[priority])
+        if not acquireToken(STEAM_STORE_BUCKET, priority, maxWait):
+            print(f"[fetchGameDetails] Rate limit wait exceeded for {gameId}")
+            return None
+
         url = f"{STEAM_STORE_API}/appdetails"
-        params = {"appids": gameId, "cc": "US"}
+        params = _appDetailsParams(gameId)
         
-        response = requests.get(url, params=params, timeout=API_TIMEOUT_SECONDS)
+        response = _steamGet(url, params, remainingOr(deadline, API_TIMEOUT_SECONDS))
+
+        if response.status_code == 429:
+            reportRetryAfter(STEAM_STORE_BUCKET, parseRetryAfter(response.headers.get("Retry-After")))
+            breaker.recordFailure()
+            print(f"[fetchGameDetails] Rate limited by Steam for {gameId}")
+            return None
+
         response.raise_for_status()
+        breaker.recordSuccess()
         
         data = response.json()
 
@@ -50,85 +167,206 @@ def fetchGameDetails(gameId: str) -> Optional[dict]:
             return None
         
         print(f"[fetchGameDetails] Fetched: {gameData.get('name', 'Unknown')}")
-        return gameData
+        return trimGameData(gameData)
         
     except requests.exceptions.Timeout:
+        breaker.recordFailure()
         print(f"[fetchGameDetails] Timeout for game {gameId}")
         return None
     except requests.exceptions.RequestException as e:
+        _recordRequestFailure(STEAM_STORE_CIRCUIT, e)
         print(f"[fetchGameDetails] Request error for {gameId}: {e}")
         return None
     except Exception as e:
         print(f"[fetchGameDetails] Unexpected error for {gameId}: {e}")
         return None    
+    finally:
+        # Frees a half-open trial slot if the call ended without a verdict
+        breaker.release()
 
 
-def fetchGameDetailsWithRetry(gameId: str, maxRetries: int = 3) -> Optional[dict]:
+def fetchGameDetailsWithRetry(
+    gameId: str,
+    maxRetries: int = STEAM_STORE_RETRY.maxAttempts,
+    priority: str = PRIORITY_INTERACTIVE,
+    deadline: Optional[Deadline] = None
+) -> Optional[dict]:
     """
     Fetch game details with retry logic for transient failures
+    Every attempt, wait and backoff is capped by the deadline if given
     """
+    breaker = getCircuitBreaker(STEAM_STORE_CIRCUIT)
+    STEAM_STORE_RETRY.recordAttempt()
+
     for attempt in range(maxRetries):
         shouldRetry = False
+        rateLimited = False
+
+        if deadline and deadline.expired():
+            print(f"Deadline exceeded, giving up on {gameId}")
+            return None
+
+        # Fail fast while Steam is unhealthy
+        if not breaker.allowRequest():
+            print(f"Steam store circuit open, skipping {gameId}")
+            return None
+
         try:
+            # Wait for a shared token (also honors any Retry-After block)
+            maxWait = remainingOr(deadline, RATE_LIMIT_MAX_WAIT_SECONDS[priority])
+            if not acquireToken(STEAM_STORE_BUCKET, priority, maxWait):
+                print(f"Rate limit wait exceeded for {gameId}")
+                return None
+
             url = f"{STEAM_STORE_API}/appdetails"
-            params = {"appids": gameId, "cc": "US"}
+            params = _appDetailsParams(gameId)
 
-            response = requests.get(url, params=params, timeout=API_TIMEOUT_SECONDS)
+            response = _steamGet(url, params, remainingOr(deadline, API_TIMEOUT_SECONDS))
 
             # Success
             if response.status_code == 200:
+                breaker.recordSuccess()
                 data = response.json()
                 
                 if data.get(gameId, {}).get("success"):
                     gameData = data[gameId]["data"]
-                    return gameData
+                    return trimGameData(gameData)
                 else:
                     # Game doesn't exist or is region-locked
                     return None
             
-            # Rate limited
+            # Rate limited - block the shared bucket for all workers
             elif response.status_code == 429:
+                reportRetryAfter(STEAM_STORE_BUCKET, parseRetryAfter(response.headers.get("Retry-After")))
+                breaker.recordFailure()
                 shouldRetry = True
+                rateLimited = True
 
             # Server error    
             elif response.status_code >= 500:
-                shouldRetry = True
+                breaker.recordFailure()
+                shouldRetry = isRetryableStatus(response.status_code)
 
              # Client error (404, 403, etc.)
             else:
+                breaker.recordSuccess()
                 return None
         
         except requests.Timeout:
+            breaker.recordFailure()
             shouldRetry = True
         
         except requests.RequestException as e:
-            shouldRetry = True
+            _recordRequestFailure(STEAM_STORE_CIRCUIT, e)
+            shouldRetry = isRetryableError(e)
         
         except Exception as e:
             shouldRetry = False # Unknown error - don't retry
 
-        # Retry logic with exponential backoff
-        if shouldRetry and attempt < maxRetries - 1:
-            waitTime = 2 ** attempt  # 1s, 2s, 4s
-            print(f"Retrying in {waitTime}s")
-            time.sleep(waitTime)
-        elif not shouldRetry:
-            break     
-         
+        finally:
+            # Frees a half-open trial slot if the attempt ended without a verdict
+            breaker.release()
+
+        # Retry transient failures (shared policy: jittered backoff, retry budget, deadline)
+        if not shouldRetry:
+            break
+
+        if rateLimited:
+            # The next acquireToken waits out the Retry-After block
+            print(f"Rate limited on {gameId}, waiting for limiter")
+
+        if not STEAM_STORE_RETRY.retryAfterFailure(attempt, deadline, waitForBackoff=not rateLimited, maxAttempts=maxRetries):
+            break
+
     # All retries failed
     print(f"Failed to fetch {gameId} after {maxRetries} attempts")
     return None
 
 
+def fetchPriceOverviews(gameIds: List[str], priority: str = PRIORITY_BACKGROUND) -> Optional[Dict[str, Optional[Dict]]]:
+    """
+    Fetch price_overview for many games in one appdetails request
+    Returns gameId -> price_overview (None for free games), skipping unknown
+    games, or None if the request failed
+    """
+    if not gameIds:
+        return {}
+
+    breaker = getCircuitBreaker(STEAM_STORE_CIRCUIT)
+    if not breaker.allowRequest():
+        print(f"[fetchPriceOverviews] Steam store circuit open, skipping {len(gameIds)} games")
+        return None
+
+    try:
+        if not acquireToken(STEAM_STORE_BUCKET, priority):
+            print(f"[fetchPriceOverviews] Rate limit wait exceeded")
+            return None
+
+        # Steam only accepts multiple appids with the price_overview filter
+        url = f"{STEAM_STORE_API}/appdetails"
+        params = {"appids": ",".join(gameIds), "cc": "US", "filters": "price_overview"}
+
+        response = _steamGet(url, params)
+
+        if response.status_code == 429:
+            reportRetryAfter(STEAM_STORE_BUCKET, parseRetryAfter(response.headers.get("Retry-After")))
+            breaker.recordFailure()
+            print(f"[fetchPriceOverviews] Rate limited by Steam")
+            return None
+
+        response.raise_for_status()
+        breaker.recordSuccess()
+
+        data = response.json() or {}
+        prices = {}
+
+        for gameId in gameIds:
+            entry = data.get(gameId) or {}
+            if not entry.get("success"):
+                continue
+
+            # Free games come back with an empty list instead of a dict
+            gameData = entry.get("data")
+            prices[gameId] = gameData.get("price_overview") if isinstance(gameData, dict) else None
+
+        print(f"[fetchPriceOverviews] Fetched prices for {len(prices)}/{len(gameIds)} games")
+        return prices
+
+    except requests.exceptions.Timeout:
+        breaker.recordFailure()
+        print(f"[fetchPriceOverviews] Timeout for {len(gameIds)} games")
+        return None
+    except requests.exceptions.RequestException as e:
+        _recordRequestFailure(STEAM_STORE_CIRCUIT, e)
+        print(f"[fetchPriceOverviews] Request error: {e}")
+        return None
+    except Exception as e:
+        print(f"[fetchPriceOverviews] Unexpected error: {e}")
+        return None
+    finally:
+        # Frees a half-open trial slot if the call ended without a verdict
+        breaker.release()
+
+
 # USER DATA
-def fetchUserOwnedGames(steamId: str) -> List[Dict]:
+def fetchUserOwnedGames(steamId: str, deadline: Optional[Deadline] = None) -> List[Dict]:
     """
     Fetch user's game library
+    Retries and timeouts are capped by the deadline if given
     """
     if not STEAM_API_KEY:
         print("[fetchUserOwnedGames] ERROR: STEAM_API_KEY not set in environment")
         return []
 
+    if deadline and deadline.expired():
+        print(f"[fetchUserOwnedGames] Deadline exceeded, skipping {steamId}")
+        return []
+
+    breaker = getCircuitBreaker(STEAM_WEB_API_CIRCUIT)
+    if not breaker.allowRequest():
+        print(f"[fetchUserOwnedGames] Steam Web API circuit open, skipping {steamId}")
+        return []
+
     try:
         print(f"[fetchUserOwnedGames] Fetching from Steam API: {steamId}")
 
@@ -141,8 +379,9 @@ def fetchUserOwnedGames(steamId: str) -> List[Dict]:
             "format": "json"
         }
 
-        response = requests.get(url, params=params, timeout=API_TIMEOUT_SECONDS)
+        response = _steamGet(url, params, retryPolicy=STEAM_WEB_API_RETRY, deadline=deadline)
         response.raise_for_status()
+        breaker.recordSuccess()
         
         data = response.json()
         games = data.get("response", {}).get("games", [])
@@ -151,56 +390,135 @@ def fetchUserOwnedGames(steamId: str) -> List[Dict]:
         return games
         
     except requests.exceptions.Timeout:
+        breaker.recordFailure()
         print(f"[fetchUserOwnedGames] Timeout for {steamId}")
         return []
     except requests.exceptions.RequestException as e:
+        _recordRequestFailure(STEAM_WEB_API_CIRCUIT, e)
         print(f"[fetchUserOwnedGames] Request error: {e}")
         return []
     except Exception as e:
         print(f"[fetchUserOwnedGames] Unexpected error: {e}")
         return []
+    finally:
+        # Frees a half-open trial slot if the call ended without a verdict
+        breaker.release()
 
 
-def fetchUserProfile(steamId: str) -> Optional[Dict]:
+def fetchRecentlyPlayedGames(steamId: str, deadline: Optional[Deadline] = None) -> Optional[List[Dict]]:
     """
-    Fetch user profile
+    Fetch games played in the last 2 weeks (cheap probe for library changes)
+    Returns None if the request failed
+    """
+    if not STEAM_API_KEY:
+        print("[fetchRecentlyPlayedGames] ERROR: STEAM_API_KEY not set in environment")
+        return None
+
+    if deadline and deadline.expired():
+        print(f"[fetchRecentlyPlayedGames] Deadline exceeded, skipping {steamId}")
+        return None
+
+    breaker = getCircuitBreaker(STEAM_WEB_API_CIRCUIT)
+    if not breaker.allowRequest():
+        print(f"[fetchRecentlyPlayedGames] Steam Web API circuit open, skipping {steamId}")
+        return None
+
+    try:
+        url = f"{STEAM_API_BASE}/IPlayerService/GetRecentlyPlayedGames/v0001/"
+        params = {
+            "key": STEAM_API_KEY,
+            "steamid": steamId,
+            "format": "json"
+        }
+
+        response = _steamGet(url, params, retryPolicy=STEAM_WEB_API_RETRY, deadline=deadline)
+        response.raise_for_status()
+        breaker.recordSuccess()
+
+        data = response.json()
+        games = data.get("response", {}).get("games", [])
+
+        print(f"[fetchRecentlyPlayedGames] {len(games)} recently played games for user {steamId}")
+        return games
+
+    except requests.exceptions.Timeout:
+        breaker.recordFailure()
+        print(f"[fetchRecentlyPlayedGames] Timeout for {steamId}")
+        return None
+    except requests.exceptions.RequestException as e:
+        _recordRequestFailure(STEAM_WEB_API_CIRCUIT, e)
+        print(f"[fetchRecentlyPlayedGames] Request error: {e}")
+        return None
+    except Exception as e:
+        print(f"[fetchRecentlyPlayedGames] Unexpected error: {e}")
+        return None
+    finally:
+        # Frees a half-open trial slot if the call ended without a verdict
+        breaker.release()
+
+
+def fetchPlayerSummaries(steamIds: List[str]) -> Optional[List[Dict]]:
+    """
+    Fetch profiles for up to 100 users in one GetPlayerSummaries call
+    Returns None if the request failed
     """
     if not STEAM_API_KEY:
-        print("[fetchUserProfile] ERROR: STEAM_API_KEY not set in environment")
+        print("[fetchPlayerSummaries] ERROR: STEAM_API_KEY not set in environment")
+        return None
+
+    if not steamIds:
+        return []
+
+    breaker = getCircuitBreaker(STEAM_WEB_API_CIRCUIT)
+    if not breaker.allowRequest():
+        print(f"[fetchPlayerSummaries] Steam Web API circuit open, skipping {len(steamIds)} users")
         return None
     
     try:
-        print(f"[fetchUserProfile] Fetching profile for {steamId}...")
+        print(f"[fetchPlayerSummaries] Fetching {len(steamIds)} profiles...")
         
         url = f"{STEAM_API_BASE}/ISteamUser/GetPlayerSummaries/v0002/"
         params = {
             "key": STEAM_API_KEY,
-            "steamids": steamId
+            "steamids": ",".join(steamIds[:PLAYER_SUMMARIES_MAX_IDS])
         }
         
-        response = requests.get(url, params=params, timeout=API_TIMEOUT_SECONDS)
+        response = _steamGet(url, params, retryPolicy=STEAM_WEB_API_RETRY)
         response.raise_for_status()
+        breaker.recordSuccess()
         
         data = response.json()
-        players = data.get("response", {}).get("players", [])
-        
-        if not players:
-            print(f"[fetchUserProfile] No profile found")
-            return None
-        
-        profile = players[0]
-        print(f"[fetchUserProfile] Found: {profile.get('personaname')}")
-        return profile
+        return data.get("response", {}).get("players", [])
         
     except requests.exceptions.Timeout:
-        print(f"[fetchUserProfile] Timeout for {steamId}")
+        breaker.recordFailure()
+        print(f"[fetchPlayerSummaries] Timeout for {len(steamIds)} users")
         return None
     except requests.exceptions.RequestException as e:
-        print(f"[fetchUserProfile] Request error: {e}")
+        _recordRequestFailure(STEAM_WEB_API_CIRCUIT, e)
+        print(f"[fetchPlayerSummaries] Request error: {e}")
         return None
     except Exception as e:
-        print(f"[fetchUserProfile] Unexpected error: {e}")
+        print(f"[fetchPlayerSummaries] Unexpected error: {e}")
         return None
+    finally:
+        # Frees a half-open trial slot if the call ended without a verdict
+        breaker.release()
+
+
+def fetchUserProfile(steamId: str) -> Optional[Dict]:
+    """
+    Fetch user profile
+    """
+    players = fetchPlayerSummaries([steamId])
+    
+    if not players:
+        print(f"[fetchUserProfile] No profile found for {steamId}")
+        return None
+    
+    profile = players[0]
+    print(f"[fetchUserProfile] Found: {profile.get('personaname')}")
+    return profile
 
 # DATA TRANSFORMATION
 def transformGameData(gameData: Dict) -> Dict:
@@ -0,0 +1,94 @@
+# Local Steam app catalog (appid -> title index)
+
+import json
+import re
+import sys
+
+from typing import List, Optional
+from db_helper import saveCatalogApps, getCatalogApp
+
+
+def normalizeTitle(title: str) -> str:
+    """
+    Remove non-alphanumeric chars and convert to lowercase
+    """
+    if not title:
+        return ""
+    return re.sub(r'[^a-zA-Z0-9]', '', title).lower()
+
+
+def titlesMatch(title: str, otherTitle: str) -> Optional[bool]:
+    """
+    Check if two titles refer to the same game (one contains the other)
+    Returns None when a title has nothing to compare (e.g. no ASCII letters or digits)
+    """
+    titleNorm = normalizeTitle(title)
+    otherTitleNorm = normalizeTitle(otherTitle)
+
+    if not titleNorm or not otherTitleNorm:
+        return None
+
+    return titleNorm in otherTitleNorm or otherTitleNorm in titleNorm
+
+
+# CATALOG INGEST
+def loadAppList(path: str) -> List[tuple]:
+    """
+    Load a GetAppList JSON dump into (gameId, name, normalizedTitle) rows
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    apps = data.get("applist", {}).get("apps", [])
+
+    # v1 of the endpoint nests the list under "app"
+    if isinstance(apps, dict):
+        apps = apps.get("app", [])
+
+    rows = []
+    for app in apps:
+        gameId = app.get("appid")
+        name = (app.get("name") or "").strip()
+        normalized = normalizeTitle(name)
+
+        # Skip unnamed entries (tools, deleted apps)
+        if gameId is None or not normalized:
+            continue
+
+        rows.append((str(gameId), name, normalized))
+
+    return rows
+
+
+def ingestAppList(path: str) -> int:
+    """
+    Replace the local app catalog with the contents of a GetAppList dump
+    """
+    rows = loadAppList(path)
+    count = saveCatalogApps(rows)
+    print(f"[SteamCatalog] Stored {count} apps from {path}")
+    return count
+
+
+# VALIDATION
+def checkCatalogTitle(gameId: str, title: str) -> Optional[bool]:
+    """
+    Check an appid/title pair against the local catalog
+    Returns None when the app is not in the catalog or the titles can't be
+    compared (caller must ask Steam)
+    """
+    app = getCatalogApp(gameId)
+    if not app:
+        return None
+
+    return titlesMatch(title, app["name"])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python steam_catalog.py <applist.json>")
+        sys.exit(1)
+
+    print("Ingesting Steam app list...")
+    ingestAppList(sys.argv[1])
+    print("Catalog ready")
@@ -13,7 +13,27 @@ from pathlib import Path
 BACKEND_DIR = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(BACKEND_DIR))
 
+# Run background jobs only when a test calls them directly
+os.environ.setdefault("BACKGROUND_JOBS_ENABLED", "false")
+
+# Retry without real backoff delays
+for dependency in ("STEAM_STORE", "STEAM_WEB_API", "GEMINI"):
+    os.environ.setdefault(f"{dependency}_RETRY_BASE_DELAY_SECONDS", "0")
+
+# Cache AI candidates only in tests that opt in (with a temporary database)
+os.environ.setdefault("LLM_CANDIDATE_CACHE_TTL_HOURS", "0")
+
+# Precompute recommendations only in tests that opt in
+os.environ.setdefault("RECOMMENDATION_QUEUE_SIZE", "0")
+
+# Fall back to cached games only in tests that opt in
+os.environ.setdefault("FALLBACK_RECOMMENDER_ENABLED", "false")
+
 import db_helper
+import circuit_breaker
+import retry_policy
+import hedge_policy
+import llm_handler
 
 # Database Fixtures
 @pytest.fixture
@@ -59,6 +79,27 @@ def test_db_connection():
         except:
             pass
 
+@pytest.fixture(autouse=True)
+def reset_circuit_breakers():
+    """Start every test with closed circuit breakers"""
+    circuit_breaker.resetCircuitBreakers()
+    yield
+    circuit_breaker.resetCircuitBreakers()
+
+@pytest.fixture(autouse=True)
+def reset_retry_budgets():
+    """Start every test with full retry and hedge budgets"""
+    retry_policy.resetRetryBudgets()
+    hedge_policy.resetHedgePolicy()
+    yield
+
+@pytest.fixture(autouse=True)
+def reset_llm_handlers():
+    """Don't share LLM handlers (or their mocked models) between tests"""
+    llm_handler.resetLLMHandlers()
+    yield
+    llm_handler.resetLLMHandlers()
+
 # User Data Fixtures
 @pytest.fixture
 def sample_user_data():
@@ -43,6 +43,52 @@ class TestAuthEndpoints:
         assert "last_login" in data
 
 
+class TestLibrarySyncEndpoints:
+    """Test owned games sync off the login path"""
+
+    @patch('main.syncUserLibraryOnce')
+    @patch('profile_service.fetchPlayerSummaries')
+    def test_callback_redirects_before_library_sync(
+        self,
+        mock_fetch_profiles,
+        mock_sync,
+        test_db_connection,
+        mock_steam_api
+    ):
+        """Test Steam callback redirects and queues library sync as a background task"""
+        mock_fetch_profiles.return_value = [mock_steam_api['user_profile']]
+
+        response = client.get(
+            "/api/auth/steam/callback",
+            params={"openid.claimed_id": "https://steamcommunity.com/openid/id/76561197960287930"},
+            follow_redirects=False
+        )
+
+        assert response.status_code in (302, 307)
+        assert "token=" in response.headers["location"]
+        mock_sync.assert_called_once_with("76561197960287930")
+
+    def test_library_status(self, test_db_connection, sample_user_data):
+        """Test GET /api/library/status reports sync progress"""
+        from db_helper import saveUser, saveLibrarySyncStatus
+        steamId = sample_user_data['steamId']
+        token = createJwtToken(steamId, sample_user_data['displayName'], "")
+
+        saveUser(steamId, sample_user_data['displayName'])
+        saveLibrarySyncStatus(steamId, "ready", gameCount=42)
+
+        response = client.get(
+            "/api/library/status",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "ready"
+        assert data["game_count"] == 42
+        assert data["finished_at"] is not None
+
+
 class TestRecommendationEndpoints:
     """Test recommendation endpoints"""
 
@@ -114,6 +160,345 @@ class TestRecommendationEndpoints:
         assert "reasoning" in data
         assert data["game"]["gameId"] == "570"
 
+    @patch('main.scheduleQueueRefill')
+    @patch('main.saveFilterGenres')
+    @patch('main.saveRecommendation')
+    @patch('main.generateSmartRecommendation')
+    @patch('main.popRecommendation')
+    def test_get_recommendation_served_from_queue(
+        self,
+        mock_pop,
+        mock_generate,
+        mock_save,
+        mock_save_genres,
+        mock_refill
+    ):
+        """Test a queued recommendation is served without calling the AI"""
+        token = createJwtToken(
+            steamId="76561197960287930",
+            displayName="Test User",
+            avatarUrl=""
+        )
+        mock_pop.return_value = {
+            "game": {"gameId": "570", "title": "Dota 2"},
+            "reasoning": "Great MOBA game",
+            "matchScore": 90
+        }
+        mock_save.return_value = 1
+
+        response = client.post(
+            "/api/recommendations",
+            json={"genres": ["Action"]},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+        assert response.status_code == 200
+        assert response.json()["game"]["gameId"] == "570"
+        assert mock_generate.call_count == 0
+        mock_refill.assert_called_once_with("76561197960287930", ["Action"])
+
+    @patch('main.scheduleQueueRefill')
+    @patch('main.saveFilterGenres')
+    @patch('main.saveRecommendation')
+    @patch('main.streamSmartRecommendation')
+    @patch('main.getPreferenceGameIds')
+    @patch('main.getRecommendedGameIds')
+    @patch('main.getOwnedGamesIds')
+    @patch('main.getUserGamingProfile')
+    @patch('main.isOwnedGamesCacheRecent')
+    def test_stream_recommendation_events(
+        self,
+        mock_cache_recent,
+        mock_profile,
+        mock_owned,
+        mock_recommended,
+        mock_preferences,
+        mock_stream,
+        mock_save,
+        mock_save_genres,
+        mock_refill,
+        sample_gaming_profile
+    ):
+        """Test POST /api/recommendations/stream emits progress, then game, reasoning and done"""
+        token = createJwtToken(
+            steamId="76561197960287930",
+            displayName="Test User",
+            avatarUrl=""
+        )
+        mock_cache_recent.return_value = True
+        mock_profile.return_value = sample_gaming_profile
+        mock_owned.return_value = []
+        mock_recommended.return_value = []
+        mock_preferences.return_value = []
+        mock_save.return_value = 1
+
+        recommendation = {
+            "game": {"gameId": "570", "title": "Dota 2"},
+            "reasoning": "Great MOBA game",
+            "matchScore": 90
+        }
+
+        def streamPipeline(onProgress, **kwargs):
+            onProgress("generating", {"attempt": 1})
+            onProgress("validating", {"gameId": "570", "title": "Dota 2"})
+            onProgress("result", recommendation)
+            return recommendation
+        mock_stream.side_effect = streamPipeline
+
+        response = client.post(
+            "/api/recommendations/stream",
+            json={"genres": ["Action"]},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [line[len("event: "):] for line in response.text.splitlines() if line.startswith("event: ")]
+        assert events[0] == "progress"
+        assert events[-3:] == ["game", "reasoning", "done"]
+        assert '"gameId": "570"' in response.text
+        mock_save.assert_called_once()
+
+    @patch('main.scheduleQueueRefill')
+    @patch('main.saveFilterGenres')
+    @patch('main.saveRecommendations')
+    @patch('main.generateSmartRecommendations')
+    @patch('main.popRecommendation')
+    @patch('main.getPreferenceGameIds')
+    @patch('main.getRecommendedGameIds')
+    @patch('main.getOwnedGamesIds')
+    @patch('main.getUserGamingProfile')
+    @patch('main.isOwnedGamesCacheRecent')
+    def test_get_recommendation_batch(
+        self,
+        mock_cache_recent,
+        mock_profile,
+        mock_owned,
+        mock_recommended,
+        mock_preferences,
+        mock_pop,
+        mock_generate,
+        mock_save,
+        mock_save_genres,
+        mock_refill,
+        sample_gaming_profile
+    ):
+        """Test POST /api/recommendations/batch serves queued picks, generates the rest and saves them together"""
+        token = createJwtToken(
+            steamId="76561197960287930",
+            displayName="Test User",
+            avatarUrl=""
+        )
+        mock_cache_recent.return_value = True
+        mock_profile.return_value = sample_gaming_profile
+        mock_owned.return_value = ["72850"]
+        mock_recommended.return_value = []
+        mock_preferences.return_value = []
+        mock_pop.side_effect = [
+            {"game": {"gameId": "570", "title": "Dota 2"}, "reasoning": "Great MOBA game", "matchScore": 90},
+            None
+        ]
+        mock_generate.return_value = [
+            {"game": {"gameId": "730", "title": "Counter-Strike 2"}, "reasoning": "Great shooter", "matchScore": 85},
+            {"game": {"gameId": "440", "title": "Team Fortress 2"}, "reasoning": "Classic shooter", "matchScore": 80}
+        ]
+        mock_save.return_value = ["570", "730", "440"]
+
+        response = client.post(
+            "/api/recommendations/batch",
+            json={"genres": ["Action"], "count": 3},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+        assert response.status_code == 200
+        assert [r["game"]["gameId"] for r in response.json()["recommendations"]] == ["570", "730", "440"]
+        assert mock_generate.call_args.kwargs["count"] == 2
+        assert mock_generate.call_args.kwargs["excludeGameIds"] == {"72850", "570"}
+        mock_save.assert_called_once()
+        assert len(mock_save.call_args.args[1]) == 3
+
+    @patch('main.generateSmartRecommendation')
+    def test_get_recommendation_fails_fast_when_ai_circuit_open(self, mock_generate):
+        """Test POST /api/recommendations returns 503 while Gemini is unhealthy"""
+        import circuit_breaker
+        token = createJwtToken(
+            steamId="76561197960287930",
+            displayName="Test User",
+            avatarUrl=""
+        )
+
+        breaker = circuit_breaker.getCircuitBreaker(circuit_breaker.GEMINI_CIRCUIT)
+        for _ in range(breaker.failureThreshold):
+            breaker.recordFailure()
+
+        response = client.post(
+            "/api/recommendations",
+            json={"genres": ["Action"]},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+        assert response.status_code == 503
+        assert mock_generate.call_count == 0
+
+    @patch('main.FALLBACK_RECOMMENDER_ENABLED', True)
+    @patch('main.saveFilterGenres')
+    @patch('main.saveRecommendation')
+    @patch('main.recommendFromCache')
+    @patch('main.generateSmartRecommendation')
+    @patch('main.getPreferenceGameIds')
+    @patch('main.getRecommendedGameIds')
+    @patch('main.getOwnedGamesIds')
+    @patch('main.getUserGamingProfile')
+    @patch('main.isOwnedGamesCacheRecent')
+    def test_get_recommendation_falls_back_when_ai_circuit_open(
+        self,
+        mock_cache_recent,
+        mock_profile,
+        mock_owned,
+        mock_recommended,
+        mock_preferences,
+        mock_generate,
+        mock_fallback,
+        mock_save,
+        mock_save_genres,
+        sample_gaming_profile
+    ):
+        """Test a cached-game pick is served instead of a 503 while Gemini is unhealthy"""
+        import circuit_breaker
+        token = createJwtToken(
+            steamId="76561197960287930",
+            displayName="Test User",
+            avatarUrl=""
+        )
+        mock_cache_recent.return_value = True
+        mock_profile.return_value = sample_gaming_profile
+        mock_owned.return_value = ["72850"]
+        mock_recommended.return_value = []
+        mock_preferences.return_value = []
+        mock_save.return_value = 1
+        mock_fallback.return_value = {
+            "game": {"gameId": "1245620", "title": "ELDEN RING"},
+            "reasoning": "ELDEN RING matches your favorite genres: RPG.",
+            "matchScore": 80
+        }
+
+        breaker = circuit_breaker.getCircuitBreaker(circuit_breaker.GEMINI_CIRCUIT)
+        for _ in range(breaker.failureThreshold):
+            breaker.recordFailure()
+
+        response = client.post(
+            "/api/recommendations",
+            json={"genres": ["Action"]},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+        assert response.status_code == 200
+        assert response.json()["game"]["gameId"] == "1245620"
+        assert mock_generate.call_count == 0
+        assert mock_fallback.call_args[0][2] == {"72850"}
+
+    @patch('main.FALLBACK_RECOMMENDER_ENABLED', True)
+    @patch('main.saveFilterGenres')
+    @patch('main.saveRecommendation')
+    @patch('main.recommendFromCache')
+    @patch('main.streamSmartRecommendation')
+    @patch('main.getPreferenceGameIds')
+    @patch('main.getRecommendedGameIds')
+    @patch('main.getOwnedGamesIds')
+    @patch('main.getUserGamingProfile')
+    @patch('main.isOwnedGamesCacheRecent')
+    def test_stream_falls_back_when_ai_circuit_open(
+        self,
+        mock_cache_recent,
+        mock_profile,
+        mock_owned,
+        mock_recommended,
+        mock_preferences,
+        mock_stream,
+        mock_fallback,
+        mock_save,
+        mock_save_genres,
+        sample_gaming_profile
+    ):
+        """Test the stream endpoint serves the same cached-game pick instead of a 503 error event"""
+        import circuit_breaker
+        token = createJwtToken(
+            steamId="76561197960287930",
+            displayName="Test User",
+            avatarUrl=""
+        )
+        mock_cache_recent.return_value = True
+        mock_profile.return_value = sample_gaming_profile
+        mock_owned.return_value = ["72850"]
+        mock_recommended.return_value = []
+        mock_preferences.return_value = []
+        mock_save.return_value = 1
+        mock_fallback.return_value = {
+            "game": {"gameId": "1245620", "title": "ELDEN RING"},
+            "reasoning": "ELDEN RING matches your favorite genres: RPG.",
+            "matchScore": 80
+        }
+
+        breaker = circuit_breaker.getCircuitBreaker(circuit_breaker.GEMINI_CIRCUIT)
+        for _ in range(breaker.failureThreshold):
+            breaker.recordFailure()
+
+        response = client.post(
+            "/api/recommendations/stream",
+            json={"genres": ["Action"]},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+        events = [line[len("event: "):] for line in response.text.splitlines() if line.startswith("event: ")]
+        assert events[-3:] == ["game", "reasoning", "done"]
+        assert '"gameId": "1245620"' in response.text
+        assert mock_stream.call_count == 0
+        assert mock_fallback.call_args[0][2] == {"72850"}
+
+    @patch('main.generateSmartRecommendation')
+    @patch('main.getPreferenceGameIds')
+    @patch('main.getRecommendedGameIds')
+    @patch('main.getOwnedGamesIds')
+    @patch('main.getUserGamingProfile')
+    @patch('main.isOwnedGamesCacheRecent')
+    def test_get_recommendation_times_out(
+        self,
+        mock_cache_recent,
+        mock_profile,
+        mock_owned,
+        mock_recommended,
+        mock_preferences,
+        mock_generate,
+        sample_gaming_profile
+    ):
+        """Test POST /api/recommendations returns 504 once the deadline runs out"""
+        token = createJwtToken(
+            steamId="76561197960287930",
+            displayName="Test User",
+            avatarUrl=""
+        )
+        mock_cache_recent.return_value = True
+        mock_profile.return_value = sample_gaming_profile
+        mock_owned.return_value = []
+        mock_recommended.return_value = []
+        mock_preferences.return_value = []
+
+        # The first attempt uses up the whole budget
+        def slowGeneration(**kwargs):
+            kwargs['deadline'].cancel()
+            return None
+        mock_generate.side_effect = slowGeneration
+
+        with patch('main.saveFilterGenres'):
+            response = client.post(
+                "/api/recommendations",
+                json={"genres": ["Action"]},
+                headers={"Authorization": f"Bearer {token}"}
+            )
+
+        assert response.status_code == 504
+        assert mock_generate.call_count == 1
+
 
 class TestPreferenceEndpoints:
     """Test Preference Endpoints"""
@@ -4,6 +4,7 @@ Integration tests for endpoints authentication and authorization security
 
 import pytest
 import jwt
+from unittest.mock import patch
 from fastapi.testclient import TestClient
 from main import app, createJwtToken, SECRET_KEY, JWT_ALGORITHM
 from db_helper import saveUser
@@ -53,6 +54,28 @@ class TestProtectedEndpoints:
         assert response.status_code == 403
 
 
+class TestMetricsAccess:
+    """Test /metrics is not public"""
+
+    def test_metrics_forbidden_from_outside_without_token(self):
+        """Test non-loopback clients can't read metrics when no token is configured"""
+        with patch('main.METRICS_TOKEN', ''):
+            response = client.get("/metrics")
+
+        assert response.status_code == 403
+
+    def test_metrics_require_configured_token(self):
+        """Test the configured bearer token unlocks metrics"""
+        with patch('main.METRICS_TOKEN', 'metrics-secret'):
+            assert client.get("/metrics").status_code == 401
+            assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+            response = client.get("/metrics", headers={"Authorization": "Bearer metrics-secret"})
+
+        assert response.status_code == 200
+        assert "counters" in response.json()
+
+
 class TestUnprotectedEndpoints:
     """Test that public endpoints don't require authentication"""
     
@@ -151,6 +151,7 @@ class TestGamingProfile:
         assert len(profile['topGames']) == 3
         assert profile['topGames'][0][1] == 'The Elder Scrolls V: Skyrim' # Most played
         assert profile['topGames'][0][2] == 245.0
+        assert profile['ownedGameIds'][0] == profile['topGames'][0][0]
     
     def test_get_user_gaming_profile_empty(self, test_db_connection, sample_user_data):
         """Test gaming profile with no cached games"""
@@ -160,6 +161,17 @@ class TestGamingProfile:
         assert profile['totalPlaytime'] == 0
         assert len(profile['topGames']) == 0
 
+    def test_gaming_profile_includes_prompt_exclusions(self, test_db_connection, sample_user_data, sample_game_data):
+        """Test recent recommendations and dislikes are listed by title"""
+        steamId = sample_user_data['steamId']
+        db_helper.saveRecommendation(steamId, sample_game_data, 'Great RPG', 90, ['RPG'])
+        db_helper.savePreference(steamId, '292030', 'disliked')
+
+        profile = db_helper.getUserGamingProfile(steamId)
+
+        assert profile['recentRecommendations'] == [('292030', 'The Witcher 3: Wild Hunt')]
+        assert profile['dislikedGames'] == [('292030', 'The Witcher 3: Wild Hunt')]
+
 
 class TestRecommendationHistory:
     """Test recommendation history management"""
@@ -343,6 +355,117 @@ class TestFilterGenres:
         assert 'RPG' not in saved_genres
     
 
+class TestGameCacheStaleWhileRevalidate:
+    """Test soft/hard TTL handling of cached game details"""
+
+    def _ageCacheEntry(self, dbPath, gameId, hours):
+        import sqlite3
+        conn = sqlite3.connect(dbPath)
+        conn.execute(
+            "UPDATE gameCache SET cachedAt = ? WHERE gameId = ?",
+            (int(time.time()) - hours * 3600, gameId)
+        )
+        conn.commit()
+        conn.close()
+
+    def test_stale_entry_served_and_refresh_requested(self, test_db_connection, mock_steam_api):
+        """Test an entry past the soft TTL is served and queued for refresh"""
+        from unittest.mock import Mock
+        import metrics
+
+        handler = Mock()
+        original_handler = db_helper._staleGameHandler
+        db_helper.setStaleGameHandler(handler)
+
+        try:
+            db_helper.cacheGameDetails('292030', mock_steam_api['game_details'])
+            self._ageCacheEntry(test_db_connection, '292030', 200)
+            stale_before = metrics.getCounters().get('gameCacheStaleServes', 0)
+
+            result = db_helper.getCachedGameDetails('292030', maxAgeHours=168, hardMaxAgeHours=720)
+
+            assert result is not None
+            assert result['name'] == 'The Witcher 3: Wild Hunt'
+            handler.assert_called_once_with('292030')
+            assert metrics.getCounters()['gameCacheStaleServes'] == stale_before + 1
+        finally:
+            db_helper.setStaleGameHandler(original_handler)
+
+    def test_entry_past_hard_ttl_is_missing(self, test_db_connection, mock_steam_api):
+        """Test an entry past the hard TTL forces a refetch"""
+        db_helper.cacheGameDetails('292030', mock_steam_api['game_details'])
+        self._ageCacheEntry(test_db_connection, '292030', 800)
+
+        assert db_helper.getCachedGameDetails('292030', maxAgeHours=168, hardMaxAgeHours=720) is None
+
+
+class TestBatchRecommendations:
+    """Test saving several recommendations at once"""
+
+    def test_save_recommendations_skips_duplicates(self, test_db_connection, sample_user_data, sample_game_data):
+        """Test one insert saves new games and skips ones already recommended"""
+        db_helper.saveUser(**sample_user_data)
+        steamId = sample_user_data['steamId']
+        db_helper.saveRecommendation(steamId, sample_game_data, 'Earlier pick', 90, ['RPG'])
+
+        saved = db_helper.saveRecommendations(steamId, [
+            {'game': sample_game_data, 'reasoning': 'Duplicate', 'matchScore': 90},
+            {'game': dict(sample_game_data, gameId='570', title='Dota 2'), 'reasoning': 'Great MOBA', 'matchScore': 85},
+            {'game': dict(sample_game_data, gameId='570', title='Dota 2'), 'reasoning': 'Repeated', 'matchScore': 85},
+        ], ['RPG'])
+
+        assert saved == ['570']
+        assert db_helper.getRecommendationsCount(steamId) == 2
+
+class TestGameCacheTrimming:
+    """Test appdetails field whitelist for cached game details"""
+
+    def test_cache_stores_only_whitelisted_fields(self, test_db_connection, mock_steam_api):
+        """Test unused appdetails fields are dropped when caching"""
+        gameData = dict(
+            mock_steam_api['game_details'],
+            detailed_description='<p>' + 'x' * 5000 + '</p>',
+            screenshots=[{'id': 0, 'path_full': 'https://example.com/0.jpg'}]
+        )
+
+        db_helper.cacheGameDetails('292030', gameData)
+        result = db_helper.getCachedGameDetails('292030')
+
+        assert 'detailed_description' not in result
+        assert 'screenshots' not in result
+        assert result['genres'] == mock_steam_api['game_details']['genres']
+
+    def test_trim_game_cache_strips_existing_rows(self, test_db_connection, mock_steam_api):
+        """Test the migration rewrites rows cached before trimming"""
+        import json
+        import sqlite3
+
+        gameData = dict(mock_steam_api['game_details'], movies=[{'id': 1}])
+        conn = sqlite3.connect(test_db_connection)
+        conn.execute(
+            "INSERT INTO gameCache (gameId, gameData, cachedAt) VALUES (?, ?, ?)",
+            ('292030', json.dumps(gameData), int(time.time()))
+        )
+        conn.commit()
+        conn.close()
+
+        assert db_helper.trimGameCache() == 1
+        assert 'movies' not in db_helper.getCachedGameDetails('292030')
+        # Already trimmed rows are left alone
+        assert db_helper.trimGameCache() == 0
+
+
+    def test_cached_game_details_many(self, test_db_connection, mock_steam_api):
+        """Test several games are read in one call and misses are left out"""
+        db_helper.cacheGameDetails('292030', mock_steam_api['game_details'])
+        db_helper.cacheGameDetails('570', dict(mock_steam_api['game_details'], name='Dota 2'))
+
+        result = db_helper.getCachedGameDetailsMany(['292030', '570', '730'])
+
+        assert set(result) == {'292030', '570'}
+        assert result['570']['name'] == 'Dota 2'
+        assert db_helper.getCachedGameDetailsMany([]) == {}
+
 class TestDatabaseErrorHandling:
     """Test error handling in database operations"""
     
@@ -0,0 +1,203 @@
+"""
+Unit tests for background jobs
+"""
+
+import sys
+import pytest
+from unittest.mock import patch, Mock
+import db_helper
+import background_jobs
+from pathlib import Path
+
+# Add backend to path
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+class TestJobQueue:
+    """Test job submission"""
+
+    def test_submit_disabled(self):
+        """Test jobs are not queued when background jobs are disabled"""
+        job = Mock()
+
+        with patch.object(background_jobs, 'BACKGROUND_JOBS_ENABLED', False):
+            assert background_jobs.submitJob('job', job) is False
+
+        assert job.call_count == 0
+
+    def test_duplicate_job_not_queued(self):
+        """Test a pending job key can't be queued twice"""
+        with patch.object(background_jobs, 'BACKGROUND_JOBS_ENABLED', True), \
+             patch.object(background_jobs, '_pendingJobs', {'warmup:1'}):
+            assert background_jobs.submitJob('warmup:1', Mock()) is False
+
+
+class TestPeriodicJobs:
+    """Test the periodic job loop"""
+
+    @patch('background_jobs.acquireJobLease')
+    def test_failing_tick_does_not_stop_loop(self, mock_lease):
+        """Test a lease or schedule error is logged and the other jobs still run"""
+        import sqlite3
+
+        mock_lease.side_effect = [sqlite3.OperationalError("database is locked"), True, True]
+        failingSchedule = Mock(side_effect=RuntimeError("boom"))
+        lastSchedule = Mock(side_effect=lambda: background_jobs._periodicStop.set())
+
+        jobs = {
+            'locked': (60, Mock()),
+            'failing': (60, failingSchedule),
+            'last': (60, lastSchedule),
+        }
+
+        background_jobs._periodicStop.clear()
+        with patch.object(background_jobs, '_periodicJobs', jobs):
+            background_jobs.runPeriodicJobs()
+
+        assert jobs['locked'][1].call_count == 0
+        assert failingSchedule.call_count == 1
+        assert lastSchedule.call_count == 1
+
+
+class TestGameDetailsWarmUp:
+    """Test game details warm-up for a user's top games"""
+
+    @patch('background_jobs.fetchGameDetailsWithRetry')
+    def test_warm_up_fetches_uncached_top_games(
+        self,
+        mock_fetch,
+        test_db_connection,
+        sample_user_data,
+        mock_steam_api
+    ):
+        """Test only uncached top games are fetched, at background priority"""
+        steamId = sample_user_data['steamId']
+        db_helper.cacheOwnedGames(steamId, mock_steam_api['owned_games'])
+        db_helper.cacheGameDetails('72850', {'name': 'Skyrim', 'genres': [{'description': 'RPG'}]})
+
+        mock_fetch.side_effect = lambda gameId, priority, deadline=None: {
+            'name': f'Game {gameId}',
+            'genres': [{'description': 'Action'}]
+        }
+
+        warmed = background_jobs.warmUpGameDetails(steamId, topN=2)
+
+        # Skyrim (cached) and Witcher 3 are the top 2
+        assert warmed == 1
+        mock_fetch.assert_called_once_with('292030', priority=background_jobs.PRIORITY_BACKGROUND, deadline=None)
+        assert db_helper.getCachedGameDetails('292030') is not None
+
+    @patch('background_jobs.fetchGameDetailsWithRetry')
+    def test_warm_up_fills_favorite_genres(
+        self,
+        mock_fetch,
+        test_db_connection,
+        sample_user_data,
+        mock_steam_api
+    ):
+        """Test a new user's profile has favorite genres after warm-up"""
+        steamId = sample_user_data['steamId']
+        db_helper.cacheOwnedGames(steamId, mock_steam_api['owned_games'])
+
+        assert db_helper.getUserGamingProfile(steamId)['favoriteGenres'] == []
+
+        mock_fetch.return_value = mock_steam_api['game_details']
+        background_jobs.warmUpGameDetails(steamId)
+
+        assert 'RPG' in db_helper.getUserGamingProfile(steamId)['favoriteGenres']
+
+
+class TestPriceRefresh:
+    """Test bulk price refresh"""
+
+    def _seedGames(self, steamId, mock_steam_api):
+        """Cache details for a liked game, a recommended game and a plain cached game"""
+        db_helper.saveUser(steamId, 'TestUser')
+        for gameId in ['100', '200', '300']:
+            db_helper.cacheGameDetails(gameId, dict(mock_steam_api['game_details'], steam_appid=int(gameId)))
+        db_helper.savePreference(steamId, '300', 'liked')
+        db_helper.saveRecommendation(
+            steamId,
+            {'gameId': '200', 'title': 'Game 200', 'price': '$9.99', 'salePrice': '$9.99'},
+            'Reason',
+            90
+        )
+
+    def test_refresh_order_prioritizes_liked_and_recommended(
+        self,
+        test_db_connection,
+        sample_user_data,
+        mock_steam_api
+    ):
+        """Test liked games come first, then recent recommendations"""
+        self._seedGames(sample_user_data['steamId'], mock_steam_api)
+
+        gameIds = db_helper.getPriceRefreshGameIds(limit=10, maxAgeHours=0)
+
+        assert gameIds == ['300', '200', '100']
+        assert db_helper.getPriceRefreshGameIds(limit=10, maxAgeHours=24) == []
+
+    @patch('background_jobs.fetchPriceOverviews')
+    def test_refresh_updates_only_prices(
+        self,
+        mock_fetch,
+        test_db_connection,
+        sample_user_data,
+        mock_steam_api
+    ):
+        """Test prices are fetched in batches and written to the cache and recommendations"""
+        steamId = sample_user_data['steamId']
+        self._seedGames(steamId, mock_steam_api)
+        newPrice = {'currency': 'USD', 'initial': 3999, 'final': 3999, 'discount_percent': 0}
+        mock_fetch.side_effect = lambda gameIds: {gameId: newPrice for gameId in gameIds}
+
+        with patch.object(background_jobs, 'PRICE_REFRESH_MAX_AGE_HOURS', 0):
+            updated = background_jobs.refreshPrices(batchSize=2)
+
+        assert updated == 3
+        assert mock_fetch.call_count == 2
+        cached = db_helper.getCachedGameDetails('200')
+        assert cached['price_overview'] == newPrice
+        assert cached['name'] == mock_steam_api['game_details']['name']
+        recommendation = db_helper.getUserRecommendations(steamId)[0]
+        assert recommendation['price'] == '$39.99'
+        assert recommendation['salePrice'] == ''
+        # Just refreshed, nothing left to do
+        assert db_helper.getPriceRefreshGameIds(limit=10, maxAgeHours=1) == []
+
+    @patch('background_jobs.fetchPriceOverviews')
+    def test_refresh_stops_on_failed_batch(
+        self,
+        mock_fetch,
+        test_db_connection,
+        sample_user_data,
+        mock_steam_api
+    ):
+        """Test a failed request ends the run without touching prices"""
+        self._seedGames(sample_user_data['steamId'], mock_steam_api)
+        mock_fetch.return_value = None
+
+        with patch.object(background_jobs, 'PRICE_REFRESH_MAX_AGE_HOURS', 0):
+            assert background_jobs.refreshPrices(batchSize=1) == 0
+
+        assert mock_fetch.call_count == 1
+
+    def test_job_lease_separate_from_fetch_leases(self, test_db_connection):
+        """Test periodic job leases don't share keys with single-flight fetch leases"""
+        assert db_helper.acquireJobLease('priceRefresh', 'worker-1', 60) is True
+        assert db_helper.acquireJobLease('priceRefresh', 'worker-2', 60) is False
+        assert db_helper.acquireFetchLease('priceRefresh', 'worker-2', 60) is True
+
+    @patch('main.warmLLMHandlers')
+    def test_jobs_registered_on_startup(self, mock_warm):
+        """Test periodic jobs are registered by the app's lifespan, not on import"""
+        from fastapi.testclient import TestClient
+        from main import app
+
+        jobs = {}
+        with patch.object(background_jobs, '_periodicJobs', jobs):
+            assert jobs == {}
+            with TestClient(app):
+                assert set(jobs) == {'priceRefresh', 'activeProfileRefresh', 'llmCandidatePurge'}
+
+        assert mock_warm.call_count == 1
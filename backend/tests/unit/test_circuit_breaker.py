@@ -0,0 +1,119 @@
+"""
+Unit tests for circuit breakers around Steam and Gemini
+"""
+
+import sys
+import time
+import pytest
+from unittest.mock import patch, Mock
+import circuit_breaker
+import steam_api
+from circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from pathlib import Path
+
+# Add backend to path
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+class TestBreakerStates:
+    """Test closed/open/half-open transitions"""
+
+    def test_opens_after_threshold(self):
+        """Test breaker opens after consecutive failures"""
+        breaker = CircuitBreaker('test', failureThreshold=3, cooldownSeconds=60)
+
+        for _ in range(2):
+            breaker.recordFailure()
+        assert breaker.state == CLOSED
+
+        breaker.recordFailure()
+        assert breaker.state == OPEN
+        assert breaker.allowRequest() is False
+
+    def test_success_resets_failures(self):
+        """Test a success clears the failure count"""
+        breaker = CircuitBreaker('test', failureThreshold=2, cooldownSeconds=60)
+
+        breaker.recordFailure()
+        breaker.recordSuccess()
+        breaker.recordFailure()
+
+        assert breaker.state == CLOSED
+
+    def test_half_open_allows_one_trial(self):
+        """Test cool-down lets a single trial call through"""
+        breaker = CircuitBreaker('test', failureThreshold=1, cooldownSeconds=0)
+        breaker.recordFailure()
+
+        assert breaker.state == HALF_OPEN
+        assert breaker.allowRequest() is True
+        assert breaker.allowRequest() is False
+
+        breaker.recordSuccess()
+        assert breaker.state == CLOSED
+
+    def test_failed_trial_reopens(self):
+        """Test a failed trial call opens the breaker again"""
+        breaker = CircuitBreaker('test', failureThreshold=5, cooldownSeconds=60)
+        breaker._state = HALF_OPEN
+
+        breaker.recordFailure()
+
+        assert breaker.state == OPEN
+
+
+    def test_unreported_trial_expires(self):
+        """Test a trial call that never reports back frees its slot after the probe timeout"""
+        breaker = CircuitBreaker('test', failureThreshold=1, cooldownSeconds=0, probeTimeoutSeconds=0.05)
+        breaker.recordFailure()
+
+        assert breaker.allowRequest() is True
+        assert breaker.allowRequest() is False
+
+        time.sleep(0.06)
+        assert breaker.allowRequest() is True
+
+class TestSteamFailFast:
+    """Test Steam calls fail fast while the circuit is open"""
+
+    @patch('steam_api.requests.get')
+    def test_fetch_skipped_when_open(self, mock_get):
+        """Test no request is sent while the store circuit is open"""
+        breaker = circuit_breaker.getCircuitBreaker(circuit_breaker.STEAM_STORE_CIRCUIT)
+        for _ in range(breaker.failureThreshold):
+            breaker.recordFailure()
+
+        result = steam_api.fetchGameDetailsWithRetry('292030')
+
+        assert result is None
+        assert mock_get.call_count == 0
+
+    @patch('steam_api.acquireToken')
+    @patch('steam_api.requests.get')
+    def test_timeouts_open_circuit(self, mock_get, mock_acquire):
+        """Test repeated timeouts open the store circuit"""
+        mock_acquire.return_value = True
+        mock_get.side_effect = steam_api.requests.exceptions.Timeout
+
+        breaker = circuit_breaker.getCircuitBreaker(circuit_breaker.STEAM_STORE_CIRCUIT)
+        for _ in range(breaker.failureThreshold):
+            steam_api.fetchGameDetails('292030')
+
+        assert circuit_breaker.isCircuitOpen(circuit_breaker.STEAM_STORE_CIRCUIT)
+
+    @patch('steam_api.acquireToken')
+    @patch('steam_api.requests.get')
+    def test_trial_slot_released_without_verdict(self, mock_get, mock_acquire):
+        """Test a half-open trial that ends on the rate limiter doesn't wedge the breaker"""
+        mock_acquire.return_value = False
+
+        breaker = CircuitBreaker('steam_store', failureThreshold=1, cooldownSeconds=0)
+        breaker.recordFailure()
+
+        with patch('steam_api.getCircuitBreaker', return_value=breaker):
+            assert steam_api.fetchGameDetails('292030') is None
+            assert steam_api.fetchGameDetailsWithRetry('292030') is None
+
+        assert mock_get.call_count == 0
+        assert breaker.state == HALF_OPEN
+        assert breaker.allowRequest() is True
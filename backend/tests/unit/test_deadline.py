@@ -0,0 +1,86 @@
+"""
+Unit tests for request deadlines
+"""
+
+import sys
+import time
+import pytest
+from unittest.mock import patch, Mock
+import steam_api
+from deadline import Deadline, remainingOr
+from game_recommender import GameRecommender
+from pathlib import Path
+
+# Add backend to path
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+class TestDeadline:
+    """Test deadline bookkeeping"""
+
+    def test_remaining_and_timeout(self):
+        """Test timeouts are capped by the time left"""
+        deadline = Deadline(5)
+
+        assert 4 < deadline.remaining() <= 5
+        assert deadline.timeout(10) <= 5
+        assert deadline.timeout(1) == 1
+        assert remainingOr(None, 10) == 10
+
+    def test_cancel_expires(self):
+        """Test a cancelled deadline is expired"""
+        deadline = Deadline(5)
+        deadline.cancel()
+
+        assert deadline.expired()
+        assert deadline.remaining() == 0
+
+    def test_sleep_refused_past_deadline(self):
+        """Test backoff longer than the time left is skipped"""
+        deadline = Deadline(0.5)
+        startTime = time.monotonic()
+
+        assert deadline.sleep(2) is False
+        assert time.monotonic() - startTime < 0.1
+        assert deadline.sleep(0.01) is True
+
+
+class TestDeadlinePropagation:
+    """Test retries stop when the budget runs out"""
+
+    @patch('steam_api.STEAM_STORE_RETRY.backoffSeconds', return_value=1.0)
+    @patch('steam_api.requests.get')
+    def test_steam_retry_backoff_respects_deadline(self, mock_get, mock_backoff, test_db_connection):
+        """Test a 5xx is not retried when backoff would pass the deadline"""
+        mock_response = Mock()
+        mock_response.status_code = 503
+        mock_get.return_value = mock_response
+
+        startTime = time.monotonic()
+        result = steam_api.fetchGameDetailsWithRetry('292030', deadline=Deadline(0.5))
+
+        assert result is None
+        assert mock_get.call_count == 1
+        assert time.monotonic() - startTime < 0.5
+        # HTTP timeout is capped by the deadline
+        assert mock_get.call_args.kwargs['timeout'] <= 0.5
+
+    @patch('game_recommender.getLLMHandler')
+    def test_recommender_stops_when_deadline_expires(self, mock_get_llm, sample_gaming_profile):
+        """Test no further AI attempts are made after the deadline"""
+        deadline = Deadline(5)
+        mock_llm = Mock()
+        mock_llm.discoverGames.side_effect = lambda **kwargs: deadline.cancel()
+        mock_get_llm.return_value = mock_llm
+
+        result = GameRecommender().generateRecommendation(
+            gamingProfile=sample_gaming_profile,
+            requestedGenres=['RPG'],
+            excludeGameIds=set(),
+            logPrefix='Test',
+            deadline=deadline
+        )
+
+        assert result is None
+        assert mock_llm.discoverGames.call_count == 1
+        assert mock_llm.discoverGames.call_args.kwargs['deadline'] is deadline
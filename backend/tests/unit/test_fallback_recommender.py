@@ -0,0 +1,97 @@
+"""
+Unit tests for the local content-based fallback recommender
+"""
+
+import sys
+import pytest
+from unittest.mock import patch
+import db_helper
+import fallback_recommender
+from fallback_recommender import recommendFromCache, scoreGame
+from pathlib import Path
+
+# Add backend to path
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def steamGame(appid, name, genres, categories=(), type='game'):
+    """Cached appdetails entry"""
+    return {
+        'type': type,
+        'name': name,
+        'steam_appid': int(appid),
+        'genres': [{'id': str(i), 'description': genre} for i, genre in enumerate(genres)],
+        'categories': [{'id': i, 'description': category} for i, category in enumerate(categories)],
+    }
+
+
+@pytest.fixture
+def cached_catalog(test_db_connection):
+    """Cache the user's top games plus a few unowned ones"""
+    games = [
+        steamGame('72850', 'The Elder Scrolls V: Skyrim', ['RPG', 'Action'], ['Single-player']),
+        steamGame('292030', 'The Witcher 3: Wild Hunt', ['RPG'], ['Single-player']),
+        steamGame('1245620', 'ELDEN RING', ['Action', 'RPG'], ['Single-player']),
+        steamGame('1794680', 'Vampire Survivors', ['Action', 'Casual'], ['Single-player']),
+        steamGame('570', 'Dota 2', ['Strategy'], ['Multi-player']),
+        steamGame('1245621', 'ELDEN RING Soundtrack', ['Action', 'RPG'], type='dlc'),
+    ]
+    for game in games:
+        db_helper.cacheGameDetails(str(game['steam_appid']), game)
+    return test_db_connection
+
+
+class TestScoring:
+    """Test cached games are scored by overlap with the user's taste"""
+
+    def test_requested_genres_required(self):
+        """Test games without any requested genre are skipped"""
+        game = steamGame('570', 'Dota 2', ['Strategy'])
+
+        assert scoreGame(game, {'Strategy': 1}, {}, ['RPG']) is None
+        assert scoreGame(game, {'Strategy': 1}, {}, []) > 0
+
+    def test_more_overlap_scores_higher(self):
+        """Test a game sharing the heaviest genres outranks a partial match"""
+        weights = {'RPG': 400, 'Action': 245}
+
+        both = scoreGame(steamGame('1', 'A', ['RPG', 'Action']), weights, {}, [])
+        one = scoreGame(steamGame('2', 'B', ['Action']), weights, {}, [])
+
+        assert both > one
+
+
+@patch.object(fallback_recommender, 'FALLBACK_RECOMMENDER_ENABLED', True)
+class TestRecommendFromCache:
+    """Test picking a recommendation from cached games"""
+
+    def test_best_unseen_game(self, cached_catalog, sample_gaming_profile):
+        """Test the pick skips owned games and DLC and explains itself from the top games"""
+        excluded = {'72850', '292030', '1091500'}
+
+        recommendation = recommendFromCache(sample_gaming_profile, ['Action'], excluded)
+
+        assert recommendation['game']['gameId'] == '1245620'
+        assert 'Skyrim' in recommendation['reasoning']
+        assert 50 <= recommendation['matchScore'] <= 90
+
+    def test_excluded_and_unmatched(self, cached_catalog, sample_gaming_profile):
+        """Test nothing is returned when every matching game is excluded"""
+        excluded = {'72850', '292030', '1091500', '1245620', '1794680'}
+
+        assert recommendFromCache(sample_gaming_profile, ['RPG'], excluded) is None
+
+    def test_non_numeric_cached_id(self, cached_catalog, sample_gaming_profile):
+        """Test a non-numeric cached id doesn't break the tie-break"""
+        db_helper.cacheGameDetails('bundle-1', steamGame('1245620', 'ELDEN RING', ['Action', 'RPG'], ['Single-player']))
+        excluded = {'72850', '292030', '1091500'}
+
+        recommendation = recommendFromCache(sample_gaming_profile, ['Action'], excluded)
+
+        assert recommendation['game']['title'] == 'ELDEN RING'
+
+    def test_disabled(self, cached_catalog, sample_gaming_profile):
+        """Test the fallback can be turned off"""
+        with patch.object(fallback_recommender, 'FALLBACK_RECOMMENDER_ENABLED', False):
+            assert recommendFromCache(sample_gaming_profile, ['Action'], set()) is None
@@ -54,7 +54,7 @@ class TestRecommendationGeneration:
     """Test recommendation generation workflow"""
     
     @patch('game_recommender.getLLMHandler')
-    @patch('game_recommender.fetchGameDetailsWithRetry')
+    @patch('background_jobs.fetchGameDetailsWithRetry')
     @patch('game_recommender.transformGameData')
     def test_generate_recommendation_success(
         self, 
@@ -67,12 +67,12 @@ class TestRecommendationGeneration:
         """Test successful recommendation generation"""
         # Setup LLM mock
         mock_llm = Mock()
-        mock_llm.discoverGame.return_value = {
+        mock_llm.discoverGames.return_value = [{
             'gameId': '570',
             'title': 'Dota 2',
             'reasoning': 'Great MOBA game',
             'matchScore': 90
-        }
+        }]
         mock_get_llm.return_value = mock_llm
         
         # Setup Steam API mock
@@ -96,7 +96,7 @@ class TestRecommendationGeneration:
     def test_generate_recommendation_llm_fails(self, mock_get_llm, sample_gaming_profile):
         """Test handling when LLM fails to generate recommendation"""
         mock_llm = Mock()
-        mock_llm.discoverGame.return_value = None
+        mock_llm.discoverGames.return_value = None
         mock_get_llm.return_value = mock_llm
         
         recommender = GameRecommender()
@@ -115,9 +115,10 @@ class TestAIValidationAndRetryLogic:
     """Test AI validation and retry mechanisms"""
     
     @patch('game_recommender.transformGameData')
+    @patch('game_recommender.getCachedGameDetailsMany')
     @patch('game_recommender.getCachedGameDetails')
-    @patch('game_recommender.fetchGameDetailsWithRetry')
-    @patch('game_recommender.cacheGameDetails')
+    @patch('background_jobs.fetchGameDetailsWithRetry')
+    @patch('background_jobs.cacheGameDetails')
     @patch('game_recommender.getLLMHandler')
     def test_title_mismatch_triggers_retry(
         self,
@@ -125,14 +126,15 @@ class TestAIValidationAndRetryLogic:
         mock_cache,
         mock_fetch,
         mock_get_cached,
+        mock_get_cached_many,
         mock_transform,
         sample_gaming_profile,
         sample_game_data
     ):
-        """Test that title mismatch between AI and Steam triggers retry"""
+        """Test that title mismatch between AI and Steam moves on to the next candidate"""
         mock_llm = Mock()
         
-        # First attempt: AI suggests title that won't match Steam's normalized title
+        # First candidate: title that won't match Steam's normalized title
         wrong_response = {
             'gameId': '292030',
             'title': 'Completely Different Game',  # Won't match "The Witcher 3"
@@ -140,7 +142,7 @@ class TestAIValidationAndRetryLogic:
             'matchScore': 90
         }
         
-        # Second attempt: Correct title
+        # Second candidate: Correct title
         correct_response = {
             'gameId': '570',
             'title': 'Dota 2',
@@ -148,17 +150,19 @@ class TestAIValidationAndRetryLogic:
             'matchScore': 85
         }
         
-        mock_llm.discoverGame.side_effect = [wrong_response, correct_response]
+        mock_llm.discoverGames.return_value = [wrong_response, correct_response]
         mock_get_llm.return_value = mock_llm
         
         # Mock cache misses
         mock_get_cached.return_value = None
+        mock_get_cached_many.return_value = {}
         
-        # Mock Steam API responses
-        mock_fetch.side_effect = [
-            {'name': 'The Witcher 3: Wild Hunt'},  # Doesn't match "Completely Different Game"
-            {'name': 'Dota 2'}  # Matches
-        ]
+        # Mock Steam API responses (both candidates are fetched in parallel)
+        steamGames = {
+            '292030': {'name': 'The Witcher 3: Wild Hunt'},  # Doesn't match "Completely Different Game"
+            '570': {'name': 'Dota 2'}  # Matches
+        }
+        mock_fetch.side_effect = lambda gameId, priority=None, deadline=None: steamGames[gameId]
         mock_transform.return_value = sample_game_data
         
         recommender = GameRecommender()
@@ -169,7 +173,291 @@ class TestAIValidationAndRetryLogic:
             logPrefix='Test'
         )
         
-        # Should succeed on second attempt
+        # Should succeed on the second candidate without another AI call
         assert result is not None
-        assert mock_llm.discoverGame.call_count == 2
-        assert mock_fetch.call_count == 2
\ No newline at end of file
+        assert mock_llm.discoverGames.call_count == 1
+        assert mock_fetch.call_count == 2
+
+    @patch('game_recommender.transformGameData')
+    @patch('game_recommender.getCachedGameDetailsMany')
+    @patch('game_recommender.getLLMHandler')
+    def test_excluded_candidates_filtered_locally(
+        self,
+        mock_get_llm,
+        mock_get_cached,
+        mock_transform,
+        sample_gaming_profile,
+        sample_game_data
+    ):
+        """Test excluded candidates are skipped locally and the rest kept as spares"""
+        mock_llm = Mock()
+        mock_llm.discoverGames.return_value = [
+            {'gameId': '292030', 'title': 'The Witcher 3', 'reasoning': 'Owned', 'matchScore': 95},
+            {'gameId': '570', 'title': 'Dota 2', 'reasoning': 'Great MOBA', 'matchScore': 90},
+            {'gameId': '730', 'title': 'Counter-Strike 2', 'reasoning': 'Great shooter', 'matchScore': 80}
+        ]
+        mock_get_llm.return_value = mock_llm
+        mock_get_cached.return_value = {'570': {'name': 'Dota 2'}, '730': {'name': 'Counter-Strike 2'}}
+        mock_transform.return_value = sample_game_data
+
+        recommender = GameRecommender()
+        result = recommender.generateRecommendation(
+            gamingProfile=sample_gaming_profile,
+            requestedGenres=['Action'],
+            excludeGameIds={'292030'},
+            logPrefix='Test'
+        )
+
+        assert result['reasoning'] == 'Great MOBA'
+        mock_get_cached.assert_called_once_with(['570', '730'])
+        # Ranked below the winner, so not checked yet
+        assert [c['gameId'] for c in recommender.spareCandidates] == ['730']
+
+
+    @patch('game_recommender.transformGameData')
+    @patch('game_recommender.getCachedGameDetailsMany')
+    @patch('game_recommender.getCachedGameDetails')
+    @patch('background_jobs.fetchGameDetailsWithRetry')
+    @patch('background_jobs.cacheGameDetails')
+    @patch('game_recommender.getLLMHandler')
+    def test_cache_misses_fetched_in_parallel(
+        self,
+        mock_get_llm,
+        mock_cache,
+        mock_fetch,
+        mock_get_cached,
+        mock_get_cached_many,
+        mock_transform,
+        sample_gaming_profile,
+        sample_game_data
+    ):
+        """Test a rejected candidate doesn't add a serial Steam round trip"""
+        import threading
+
+        mock_llm = Mock()
+        mock_llm.discoverGames.return_value = [
+            {'gameId': '292030', 'title': 'Completely Different Game', 'reasoning': 'Great RPG', 'matchScore': 90},
+            {'gameId': '570', 'title': 'Dota 2', 'reasoning': 'Great MOBA', 'matchScore': 85},
+            {'gameId': '730', 'title': 'Counter-Strike 2', 'reasoning': 'Great shooter', 'matchScore': 80}
+        ]
+        mock_get_llm.return_value = mock_llm
+        mock_get_cached.return_value = None
+        mock_get_cached_many.return_value = {'730': {'name': 'Counter-Strike 2'}}
+
+        steamGames = {'292030': {'name': 'The Witcher 3: Wild Hunt'}, '570': {'name': 'Dota 2'}}
+        # Each fetch waits for the other, so a serial fetch would break the barrier
+        bothFetching = threading.Barrier(2, timeout=5)
+
+        def concurrentFetch(gameId, priority=None, deadline=None):
+            bothFetching.wait()
+            return steamGames[gameId]
+        mock_fetch.side_effect = concurrentFetch
+        mock_transform.return_value = sample_game_data
+
+        recommender = GameRecommender()
+        result = recommender.generateRecommendation(
+            gamingProfile=sample_gaming_profile,
+            requestedGenres=['Action'],
+            excludeGameIds=set(),
+            logPrefix='Test'
+        )
+
+        assert result['reasoning'] == 'Great MOBA'
+        assert not bothFetching.broken
+        assert sorted(call.args[0] for call in mock_fetch.call_args_list) == ['292030', '570']
+        assert [c['gameId'] for c in recommender.spareCandidates] == ['730']
+
+
+class TestBatchRecommendations:
+    """Test several recommendations from one profile"""
+
+    @patch('game_recommender.transformGameData')
+    @patch('game_recommender.getCachedGameDetailsMany')
+    @patch('game_recommender.getLLMHandler')
+    def test_batch_from_one_ai_call(self, mock_get_llm, mock_get_cached, mock_transform, sample_gaming_profile):
+        """Test one AI call covers the batch and each pick is distinct"""
+        steamGames = {
+            '570': {'name': 'Dota 2', 'steam_appid': 570},
+            '730': {'name': 'Counter-Strike 2', 'steam_appid': 730},
+            '440': {'name': 'Team Fortress 2', 'steam_appid': 440}
+        }
+        mock_llm = Mock()
+        mock_llm.discoverGames.return_value = [
+            {'gameId': gameId, 'title': game['name'], 'reasoning': 'Fun', 'matchScore': 80}
+            for gameId, game in steamGames.items()
+        ]
+        mock_get_llm.return_value = mock_llm
+        mock_get_cached.side_effect = lambda gameIds: {gameId: steamGames[gameId] for gameId in gameIds}
+        mock_transform.side_effect = lambda gameData: {'gameId': str(gameData['steam_appid']), 'title': gameData['name']}
+
+        excludeGameIds = set()
+        results = GameRecommender().generateRecommendations(
+            gamingProfile=sample_gaming_profile,
+            requestedGenres=['Action'],
+            excludeGameIds=excludeGameIds,
+            count=3,
+            logPrefix='Test'
+        )
+
+        assert [r['game']['gameId'] for r in results] == ['570', '730', '440']
+        assert mock_llm.discoverGames.call_count == 1
+        assert mock_llm.discoverGames.call_args.kwargs['count'] >= 6
+        assert excludeGameIds == {'570', '730', '440'}
+
+class TestCandidateCache:
+    """Test unused AI candidates are reused across requests"""
+
+    @patch('game_recommender.LLM_CANDIDATE_CACHE_TTL_HOURS', 6)
+    @patch('game_recommender.transformGameData')
+    @patch('game_recommender.getCachedGameDetailsMany')
+    @patch('game_recommender.getLLMHandler')
+    def test_repeat_request_uses_cached_candidates(
+        self,
+        mock_get_llm,
+        mock_get_cached,
+        mock_transform,
+        test_db_connection,
+        sample_gaming_profile,
+        sample_game_data
+    ):
+        """Test a second request with the same profile and genres skips the AI call"""
+        mock_llm = Mock()
+        mock_llm.discoverGames.return_value = [
+            {'gameId': '570', 'title': 'Dota 2', 'reasoning': 'Great MOBA', 'matchScore': 90},
+            {'gameId': '730', 'title': 'Counter-Strike 2', 'reasoning': 'Great shooter', 'matchScore': 80}
+        ]
+        mock_get_llm.return_value = mock_llm
+        steamGames = {'570': {'name': 'Dota 2'}, '730': {'name': 'Counter-Strike 2'}}
+        mock_get_cached.side_effect = lambda gameIds: {gameId: steamGames[gameId] for gameId in gameIds}
+        mock_transform.return_value = sample_game_data
+
+        first = GameRecommender().generateRecommendation(
+            gamingProfile=sample_gaming_profile,
+            requestedGenres=['Action'],
+            excludeGameIds=set(),
+            logPrefix='Test'
+        )
+        # The first pick is now recommended, so it is excluded next time
+        second = GameRecommender().generateRecommendation(
+            gamingProfile=sample_gaming_profile,
+            requestedGenres=['action'],
+            excludeGameIds={'570'},
+            logPrefix='Test'
+        )
+
+        assert first['reasoning'] == 'Great MOBA'
+        assert second['reasoning'] == 'Great shooter'
+        assert mock_llm.discoverGames.call_count == 1
+
+    def test_cache_key_ignores_playtime_changes(self, sample_gaming_profile):
+        """Test the key is stable across playtime changes but not genre changes"""
+        from llm_handler import candidateCacheKey
+
+        played = dict(sample_gaming_profile)
+        played['topGames'] = [(gameId, title, hours + 2) for gameId, title, hours in sample_gaming_profile['topGames']]
+        played['recentRecommendations'] = [('570', 'Dota 2')]
+
+        key = candidateCacheKey(sample_gaming_profile, ['RPG'])
+        assert candidateCacheKey(played, ['RPG']) == key
+        assert candidateCacheKey(sample_gaming_profile, ['Action']) != key
+
+
+class TestStreamingRecommendation:
+    """Test streamed recommendation generation"""
+
+    @patch('game_recommender.transformGameData')
+    @patch('game_recommender.getCachedGameDetailsMany')
+    @patch('game_recommender.getLLMHandler')
+    def test_streamed_candidates_validated_as_they_arrive(
+        self,
+        mock_get_llm,
+        mock_get_cached,
+        mock_transform,
+        sample_gaming_profile,
+        sample_game_data
+    ):
+        """Test the result is reported before the rest of the stream is read into spares"""
+        events = []
+
+        def candidates(**kwargs):
+            yield {'gameId': '570', 'title': 'Dota 2', 'reasoning': 'Great MOBA', 'matchScore': 90}
+            events.append(('streamed', 'rest'))
+            yield {'gameId': '730', 'title': 'Counter-Strike 2', 'reasoning': 'Great shooter', 'matchScore': 80}
+
+        mock_llm = Mock()
+        mock_llm.streamCandidates.side_effect = candidates
+        mock_get_llm.return_value = mock_llm
+        mock_get_cached.return_value = {'570': {'name': 'Dota 2'}}
+        mock_transform.return_value = sample_game_data
+
+        recommender = GameRecommender()
+        result = recommender.generateRecommendation(
+            gamingProfile=sample_gaming_profile,
+            requestedGenres=['Action'],
+            excludeGameIds=set(),
+            logPrefix='Test',
+            stream=True,
+            onProgress=lambda stage, data: events.append((stage, data))
+        )
+
+        stages = [stage for stage, _ in events]
+        assert result['reasoning'] == 'Great MOBA'
+        assert stages == ['generating', 'validating', 'result', 'streamed']
+        assert [c['gameId'] for c in recommender.spareCandidates] == ['730']
+        assert mock_llm.discoverGames.call_count == 0
+
+    @patch('game_recommender.GEMINI_RETRY')
+    @patch('game_recommender.transformGameData')
+    @patch('game_recommender.getCachedGameDetailsMany')
+    @patch('game_recommender.getLLMHandler')
+    def test_empty_stream_retried_through_policy(
+        self,
+        mock_get_llm,
+        mock_get_cached,
+        mock_transform,
+        mock_retry,
+        sample_gaming_profile,
+        sample_game_data
+    ):
+        """Test the call after an empty stream backs off like any failed AI call"""
+        mock_llm = Mock()
+        mock_llm.streamCandidates.return_value = iter([])
+        mock_llm.discoverGames.return_value = [
+            {'gameId': '570', 'title': 'Dota 2', 'reasoning': 'Great MOBA', 'matchScore': 90}
+        ]
+        mock_get_llm.return_value = mock_llm
+        mock_get_cached.return_value = {'570': {'name': 'Dota 2'}}
+        mock_transform.return_value = sample_game_data
+        mock_retry.retryAfterFailure.return_value = True
+
+        result = GameRecommender().generateRecommendation(
+            gamingProfile=sample_gaming_profile,
+            requestedGenres=['Action'],
+            excludeGameIds=set(),
+            logPrefix='Test',
+            stream=True
+        )
+
+        assert result['reasoning'] == 'Great MOBA'
+        assert mock_retry.retryAfterFailure.call_count == 1
+        assert mock_llm.discoverGames.call_count == 1
+
+    @patch('game_recommender.GEMINI_RETRY')
+    @patch('game_recommender.getLLMHandler')
+    def test_empty_stream_not_retried_without_budget(self, mock_get_llm, mock_retry, sample_gaming_profile):
+        """Test no follow-up call is made when the retry policy says stop"""
+        mock_llm = Mock()
+        mock_llm.streamCandidates.return_value = iter([])
+        mock_get_llm.return_value = mock_llm
+        mock_retry.retryAfterFailure.return_value = False
+
+        result = GameRecommender().generateRecommendation(
+            gamingProfile=sample_gaming_profile,
+            requestedGenres=['Action'],
+            excludeGameIds=set(),
+            logPrefix='Test',
+            stream=True
+        )
+
+        assert result is None
+        assert mock_llm.discoverGames.call_count == 0
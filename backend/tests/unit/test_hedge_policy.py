@@ -0,0 +1,53 @@
+"""
+Unit tests for hedged LLM request policy
+"""
+
+import sys
+import pytest
+from hedge_policy import HedgePolicy
+from pathlib import Path
+
+# Add backend to path
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+class TestHedgeDelay:
+    """Test when a backup call is sent"""
+
+    def test_no_hedge_without_history(self):
+        """Test hedging waits for enough latency samples"""
+        policy = HedgePolicy(minSamples=5)
+
+        for _ in range(4):
+            policy.recordLatency(1.0)
+
+        assert policy.hedgeDelay() is None
+
+    def test_delay_follows_percentile(self):
+        """Test the delay is the configured percentile of recent latencies, with a floor"""
+        policy = HedgePolicy(percentile=90, minDelaySeconds=0, minSamples=1)
+
+        for latency in range(1, 101):
+            policy.recordLatency(latency / 100)
+
+        assert policy.hedgeDelay() == pytest.approx(0.91)
+
+        policy.minDelaySeconds = 2.0
+        assert policy.hedgeDelay() == 2.0
+
+
+class TestHedgeRate:
+    """Test hedges are capped at a fraction of calls"""
+
+    def test_budget_caps_hedges(self):
+        """Test hedges stop once the budget is spent and resume with new calls"""
+        policy = HedgePolicy(maxRate=0.5)
+        policy.budget.maxTokens = 1
+        policy.budget._tokens = 1
+
+        assert policy.tryHedge()
+        assert not policy.tryHedge()
+
+        policy.recordCall()
+        policy.recordCall()
+        assert policy.tryHedge()
@@ -0,0 +1,170 @@
+"""
+Unit tests for background owned games sync
+"""
+
+import sys
+import pytest
+from unittest.mock import patch
+import db_helper
+from library_sync import syncUserLibrary, syncUserLibraryOnce
+from pathlib import Path
+
+# Add backend to path
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+class TestLibrarySync:
+    """Test library sync job"""
+
+    @patch('library_sync.scheduleGameDetailsWarmUp')
+    @patch('library_sync.fetchUserOwnedGames')
+    def test_sync_caches_games_and_marks_ready(
+        self,
+        mock_fetch,
+        mock_warm_up,
+        test_db_connection,
+        sample_user_data,
+        mock_steam_api
+    ):
+        """Test successful sync caches games, records status and warms up details"""
+        steamId = sample_user_data['steamId']
+        mock_fetch.return_value = mock_steam_api['owned_games']
+
+        assert syncUserLibrary(steamId) is True
+
+        status = db_helper.getLibrarySyncStatus(steamId)
+        assert status['status'] == 'ready'
+        assert status['gameCount'] == 3
+        assert len(db_helper.getOwnedGamesIds(steamId)) == 3
+        mock_warm_up.assert_called_once_with(steamId)
+
+    @patch('library_sync.fetchUserOwnedGames')
+    def test_sync_failure_recorded(self, mock_fetch, test_db_connection, sample_user_data):
+        """Test empty Steam response marks the sync failed"""
+        steamId = sample_user_data['steamId']
+        mock_fetch.return_value = []
+
+        assert syncUserLibrary(steamId) is False
+
+        status = db_helper.getLibrarySyncStatus(steamId)
+        assert status['status'] == 'failed'
+        assert status['error']
+
+    @patch('steam_api.requests.get')
+    def test_sync_bounded_by_deadline(self, mock_get, test_db_connection, sample_user_data):
+        """Test a request's sync makes no Steam call once its deadline has run out"""
+        from deadline import Deadline
+
+        steamId = sample_user_data['steamId']
+        deadline = Deadline(5)
+        deadline.cancel()
+
+        assert syncUserLibrary(steamId, deadline=deadline) is False
+
+        assert mock_get.call_count == 0
+        assert db_helper.getLibrarySyncStatus(steamId)['error'] == 'Library sync ran out of time'
+
+    @patch('library_sync.scheduleGameDetailsWarmUp')
+    @patch('library_sync.fetchUserOwnedGames')
+    def test_request_sync_joins_login_sync(
+        self,
+        mock_fetch,
+        mock_warm_up,
+        test_db_connection,
+        sample_user_data,
+        mock_steam_api
+    ):
+        """Test a request made while the login sync runs waits for it instead of fetching again"""
+        import threading
+
+        steamId = sample_user_data['steamId']
+        fetching = threading.Event()
+        release = threading.Event()
+
+        def slowFetch(steamId, deadline=None):
+            fetching.set()
+            release.wait(5)
+            return mock_steam_api['owned_games']
+        mock_fetch.side_effect = slowFetch
+
+        loginSync = threading.Thread(target=syncUserLibraryOnce, args=(steamId,))
+        loginSync.start()
+        assert fetching.wait(5)
+
+        results = []
+        requestSync = threading.Thread(target=lambda: results.append(syncUserLibraryOnce(steamId)))
+        requestSync.start()
+        release.set()
+        loginSync.join(5)
+        requestSync.join(5)
+
+        assert results == [True]
+        assert mock_fetch.call_count == 1
+
+
+class TestLibraryChangeDetection:
+    """Test recently played probe before full library refresh"""
+
+    @patch('library_sync.scheduleGameDetailsWarmUp')
+    @patch('library_sync.fetchRecentlyPlayedGames')
+    @patch('library_sync.fetchUserOwnedGames')
+    def test_unchanged_library_skips_full_fetch(
+        self,
+        mock_fetch_owned,
+        mock_fetch_recent,
+        mock_warm_up,
+        test_db_connection,
+        sample_user_data,
+        mock_steam_api
+    ):
+        """Test an unchanged probe costs one small call"""
+        steamId = sample_user_data['steamId']
+        mock_fetch_owned.return_value = mock_steam_api['owned_games']
+        syncUserLibrary(steamId)
+
+        # Same playtime for recently played games
+        mock_fetch_recent.return_value = [
+            {'appid': 292030, 'playtime_forever': 10800, 'playtime_2weeks': 60}
+        ]
+        mock_fetch_owned.reset_mock()
+
+        assert syncUserLibrary(steamId) is True
+
+        assert mock_fetch_owned.call_count == 0
+        profile = db_helper.getUserGamingProfile(steamId)
+        assert [game[0] for game in profile['recentlyActiveGames']] == ['292030']
+
+    @patch('library_sync.scheduleGameDetailsWarmUp')
+    @patch('library_sync.fetchRecentlyPlayedGames')
+    @patch('library_sync.fetchUserOwnedGames')
+    def test_changed_playtime_triggers_full_fetch(
+        self,
+        mock_fetch_owned,
+        mock_fetch_recent,
+        mock_warm_up,
+        test_db_connection,
+        sample_user_data,
+        mock_steam_api
+    ):
+        """Test new playtime in the probe triggers a full GetOwnedGames fetch"""
+        steamId = sample_user_data['steamId']
+        mock_fetch_owned.return_value = mock_steam_api['owned_games']
+        syncUserLibrary(steamId)
+
+        mock_fetch_recent.return_value = [
+            {'appid': 440, 'playtime_forever': 30, 'playtime_2weeks': 30}
+        ]
+        mock_fetch_owned.reset_mock()
+
+        syncUserLibrary(steamId)
+
+        assert mock_fetch_owned.call_count == 1
+
+    def test_fingerprint_ignores_order(self, mock_steam_api):
+        """Test fingerprint depends on games and playtime, not order"""
+        from library_sync import computeLibraryFingerprint
+        games = mock_steam_api['owned_games']
+
+        assert computeLibraryFingerprint(games) == computeLibraryFingerprint(list(reversed(games)))
+        changed = [dict(games[0], playtime_forever=1)] + games[1:]
+        assert computeLibraryFingerprint(games) != computeLibraryFingerprint(changed)
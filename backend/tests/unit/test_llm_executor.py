@@ -0,0 +1,50 @@
+"""
+Unit tests for the LLM executor
+"""
+
+import sys
+import asyncio
+import threading
+import pytest
+from unittest.mock import patch
+from deadline import Deadline
+from llm_executor import runInLLMExecutor
+from pathlib import Path
+
+# Add backend to path
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+class TestLLMExecutor:
+    """Test blocking LLM work runs off the event loop"""
+
+    def test_runs_off_event_loop(self):
+        """Test the work runs on an executor thread and gets the deadline"""
+        deadline = Deadline(5)
+
+        def work(value, deadline=None):
+            return (value, deadline, threading.current_thread().name)
+
+        value, passedDeadline, threadName = asyncio.run(runInLLMExecutor(work, 42, deadline=deadline))
+
+        assert value == 42
+        assert passedDeadline is deadline
+        assert threadName.startswith('steampal-llm')
+
+    @patch('llm_executor.DISCONNECT_POLL_SECONDS', 0.01)
+    def test_disconnect_cancels_deadline(self):
+        """Test a client disconnect cancels the deadline and returns right away"""
+        deadline = Deadline(5)
+
+        def work(deadline=None):
+            # Blocks until cancelled, like a retry backoff would
+            deadline.sleep(4)
+            return 'finished'
+
+        async def isDisconnected():
+            return True
+
+        result = asyncio.run(runInLLMExecutor(work, deadline=deadline, isDisconnected=isDisconnected))
+
+        assert result is None
+        assert deadline.expired()
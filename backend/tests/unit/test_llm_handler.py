@@ -6,7 +6,9 @@ import sys
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 import json
-from llm_handler import LLMHandler
+from llm_handler import LLMHandler, getLLMHandler, registerLLMProvider, warmLLMHandlers
+from llm_stub import StubModel
+from prompt_budget import estimateTokens, PROMPT_TOKEN_BUDGET
 from pathlib import Path
 
 # Add backend to path
@@ -131,4 +133,256 @@ class TestGameDiscovery:
         
         assert result is not None
         assert result['gameId'] == '292030'
-        assert result['title'] == 'The Witcher 3'
\ No newline at end of file
+        assert result['title'] == 'The Witcher 3'
+
+    @patch('llm_handler.genai.configure')
+    @patch('llm_handler.genai.GenerativeModel')
+    @patch('llm_handler.os.getenv')
+    def test_discover_games_ranked_candidates(self, mock_getenv, mock_model_class, mock_configure, sample_gaming_profile):
+        """Test one call returns a ranked list of candidates"""
+        mock_getenv.return_value = 'test_key'
+
+        mock_model = MagicMock()
+        mock_response = Mock()
+        mock_response.text = json.dumps({'candidates': [
+            {'gameId': 570, 'title': 'Dota 2', 'reasoning': 'Great MOBA', 'matchScore': 90},
+            {'gameId': '730', 'title': 'Counter-Strike 2', 'reasoning': 'Great shooter'},
+            {'gameId': '570', 'title': 'Dota 2', 'reasoning': 'Duplicate'},
+            {'title': 'Missing ID'}
+        ]})
+        mock_model.generate_content.return_value = mock_response
+        mock_model_class.return_value = mock_model
+
+        handler = LLMHandler()
+
+        result = handler.discoverGames(
+            gamingProfile=sample_gaming_profile,
+            requestedGenres=['Action'],
+            excludeGameIds=set(),
+            count=3
+        )
+
+        assert [c['gameId'] for c in result] == ['570', '730']
+        assert result[1]['matchScore'] == 85
+        assert mock_model.generate_content.call_count == 1
+        assert '"candidates"' in mock_model.generate_content.call_args.args[0]
+
+
+class TestPromptBudgeting:
+    """Test prompt size stays bounded"""
+
+    @patch('llm_handler.genai.configure')
+    @patch('llm_handler.genai.GenerativeModel')
+    @patch('llm_handler.os.getenv')
+    def test_prompt_bounded_for_large_library(self, mock_getenv, mock_model, mock_configure, sample_gaming_profile):
+        """Test a 4,000-game exclusion set doesn't grow the prompt past the budget"""
+        mock_getenv.return_value = 'test_key'
+        handler = LLMHandler()
+
+        profile = dict(sample_gaming_profile)
+        profile['recentRecommendations'] = [('1145360', 'Hades')]
+        profile['dislikedGames'] = [('570', 'Dota 2')]
+        excludeGameIds = {str(100000 + i) for i in range(4000)} | {'1145360', '570'}
+
+        prompt = handler.buildPrompt(profile, ['RPG'], excludeGameIds)
+
+        assert estimateTokens(prompt) <= PROMPT_TOKEN_BUDGET
+        assert handler.lastPromptTokens['total'] <= PROMPT_TOKEN_BUDGET
+        # Ranked exclusions are named first, the rest are summarized
+        assert 'Hades (1145360)' in prompt
+        assert 'Dota 2 (570)' in prompt
+        assert 'more)' in prompt
+
+    @patch('llm_handler.genai.configure')
+    @patch('llm_handler.genai.GenerativeModel')
+    @patch('llm_handler.os.getenv')
+    def test_most_played_exclusion_survives_trimming(self, mock_getenv, mock_model, mock_configure, sample_gaming_profile):
+        """Test raw exclusions are trimmed by playtime, not by ID text"""
+        mock_getenv.return_value = 'test_key'
+        handler = LLMHandler()
+
+        # The most played owned game has the ID that sorts last as text
+        ownedGameIds = ['999999'] + [str(100000 + i) for i in range(4000)]
+        profile = dict(sample_gaming_profile)
+        profile['ownedGameIds'] = ownedGameIds
+
+        prompt = handler.buildPrompt(profile, ['RPG'], set(ownedGameIds))
+
+        assert '999999' in prompt
+        assert 'more)' in prompt
+
+
+class TestStreamingDiscovery:
+    """Test candidates are yielded while the response streams in"""
+
+    @patch('llm_handler.genai.configure')
+    @patch('llm_handler.genai.GenerativeModel')
+    @patch('llm_handler.os.getenv')
+    def test_candidate_yielded_before_stream_ends(self, mock_getenv, mock_model_class, mock_configure, sample_gaming_profile):
+        """Test the first candidate arrives as soon as its JSON object is complete"""
+        mock_getenv.return_value = 'test_key'
+
+        text = json.dumps({'candidates': [
+            {'gameId': '570', 'title': 'Dota 2', 'reasoning': 'Great {MOBA}', 'matchScore': 90},
+            {'gameId': '730', 'title': 'Counter-Strike 2', 'reasoning': 'Great shooter'}
+        ]})
+        chunksSent = []
+
+        def chunks():
+            for start in range(0, len(text), 20):
+                chunksSent.append(start)
+                chunk = Mock()
+                chunk.text = text[start:start + 20]
+                yield chunk
+
+        mock_model = MagicMock()
+        mock_model.generate_content.return_value = chunks()
+        mock_model_class.return_value = mock_model
+
+        stream = LLMHandler().streamCandidates(sample_gaming_profile, ['Action'], set())
+        first = next(stream)
+
+        assert first['gameId'] == '570'
+        assert first['reasoning'] == 'Great {MOBA}'
+        assert len(chunksSent) < len(range(0, len(text), 20))
+        assert [c['gameId'] for c in stream] == ['730']
+        assert mock_model.generate_content.call_args.kwargs['stream'] is True
+
+    @patch('llm_handler.getCircuitBreaker')
+    @patch('llm_handler.genai.configure')
+    @patch('llm_handler.genai.GenerativeModel')
+    @patch('llm_handler.os.getenv')
+    def test_empty_stream_recorded(self, mock_getenv, mock_model_class, mock_configure, mock_get_breaker, sample_gaming_profile):
+        """Test a stream that ends without a chunk still reports to the breaker"""
+        mock_getenv.return_value = 'test_key'
+        mock_breaker = Mock()
+        mock_breaker.allowRequest.return_value = True
+        mock_get_breaker.return_value = mock_breaker
+
+        mock_model = MagicMock()
+        mock_model.generate_content.return_value = iter([])
+        mock_model_class.return_value = mock_model
+
+        assert list(LLMHandler().streamCandidates(sample_gaming_profile, ['Action'], set())) == []
+        assert mock_breaker.recordFailure.call_count == 1
+        assert mock_breaker.recordSuccess.call_count == 0
+
+
+class TestProviderRegistry:
+    """Test shared handlers and pluggable providers"""
+
+    def test_handler_shared_across_threads(self):
+        """Test every thread gets the same handler, created once"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        factory = Mock(return_value=Mock())
+        registerLLMProvider('counting', factory)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            handlers = list(executor.map(lambda _: getLLMHandler('counting'), range(16)))
+
+        assert all(handler is handlers[0] for handler in handlers)
+        factory.assert_called_once()
+
+    def test_unknown_provider(self):
+        """Test warming skips providers that fail to initialize"""
+        with pytest.raises(ValueError, match='Unsupported provider'):
+            LLMHandler(provider='missing')
+
+        assert warmLLMHandlers(['stub', 'missing']) == ['stub']
+
+    def test_stub_deterministic_candidates(self, sample_gaming_profile):
+        """Test the stub gives the same candidates for the same prompt, skipping mentioned games"""
+        handler = getLLMHandler('stub')
+
+        first = handler.discoverGames(sample_gaming_profile, ['RPG'], {'570'}, count=3)
+        second = handler.discoverGames(sample_gaming_profile, ['RPG'], {'570'}, count=3)
+
+        assert len(first) == 3
+        assert first == second
+
+        prompt = handler.buildPrompt(sample_gaming_profile, ['RPG'], {'570'}, count=3)
+        candidates = json.loads(StubModel(latencyMs=0).respond(prompt))['candidates']
+        assert all(candidate['gameId'] not in prompt for candidate in candidates)
+
+
+class TestHedgedDiscovery:
+    """Test backup calls for slow AI responses"""
+
+    def test_backup_call_wins_when_first_is_slow(self, sample_gaming_profile):
+        """Test a slow first call is hedged and the faster backup's candidates are used"""
+        import threading
+        from hedge_policy import HedgePolicy
+        from metrics import getCounters
+
+        release = threading.Event()
+        calls = []
+
+        def generate(prompt, **kwargs):
+            calls.append(prompt)
+            if len(calls) == 1:
+                # First call hangs until the test finishes
+                release.wait(2)
+                gameId, title = '570', 'Dota 2'
+            else:
+                gameId, title = '730', 'Counter-Strike 2'
+            response = Mock()
+            response.text = json.dumps({'candidates': [{'gameId': gameId, 'title': title, 'reasoning': 'Fun'}]})
+            return response
+
+        model = Mock()
+        model.generate_content.side_effect = generate
+        registerLLMProvider('hedged', lambda: model)
+
+        policy = HedgePolicy(minDelaySeconds=0.05, minSamples=1)
+        policy.recordLatency(0.01)
+        before = getCounters()
+
+        try:
+            with patch('llm_handler.LLM_HEDGE_ENABLED', True), patch('llm_handler.LLM_HEDGE', policy):
+                result = getLLMHandler('hedged').discoverGames(sample_gaming_profile, ['Action'], set(), count=1)
+        finally:
+            release.set()
+
+        after = getCounters()
+        assert [c['gameId'] for c in result] == ['730']
+        assert len(calls) == 2
+        assert after.get('llmHedgesIssued', 0) - before.get('llmHedgesIssued', 0) == 1
+        assert after.get('llmHedgesWon', 0) - before.get('llmHedgesWon', 0) == 1
+
+    def test_no_hedge_when_first_is_fast(self, sample_gaming_profile):
+        """Test a call faster than the hedge delay is not hedged"""
+        from hedge_policy import HedgePolicy
+
+        response = Mock()
+        response.text = json.dumps({'gameId': '570', 'title': 'Dota 2', 'reasoning': 'Fun'})
+        model = Mock()
+        model.generate_content.return_value = response
+        registerLLMProvider('hedged', lambda: model)
+
+        policy = HedgePolicy(minDelaySeconds=1, minSamples=1)
+        policy.recordLatency(0.01)
+
+        with patch('llm_handler.LLM_HEDGE_ENABLED', True), patch('llm_handler.LLM_HEDGE', policy):
+            result = getLLMHandler('hedged').discoverGames(sample_gaming_profile, ['Action'], set(), count=1)
+
+        assert result[0]['gameId'] == '570'
+        assert model.generate_content.call_count == 1
+
+    def test_timed_out_call_recorded_at_full_timeout(self, sample_gaming_profile):
+        """Test timeouts feed the latency history with the whole timeout, not just successes"""
+        from google.api_core.exceptions import DeadlineExceeded
+        from hedge_policy import HedgePolicy
+        from deadline import Deadline
+
+        model = Mock()
+        model.generate_content.side_effect = DeadlineExceeded("timed out")
+        registerLLMProvider('hedged', lambda: model)
+
+        policy = HedgePolicy(minDelaySeconds=0, minSamples=1)
+
+        with patch('llm_handler.LLM_HEDGE', policy):
+            result = getLLMHandler('hedged').discoverGames(sample_gaming_profile, ['Action'], set(), deadline=Deadline(30), count=1)
+
+        assert result is None
+        assert policy.hedgeDelay() > 25
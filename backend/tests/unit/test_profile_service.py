@@ -0,0 +1,121 @@
+"""
+Unit tests for cached Steam player profiles
+"""
+
+import sys
+import pytest
+from unittest.mock import patch
+import db_helper
+import profile_service
+from pathlib import Path
+
+# Add backend to path
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+class TestPlayerProfileCache:
+    """Test profile lookups through the cache"""
+
+    @patch('profile_service.fetchPlayerSummaries')
+    def test_missing_profile_fetched_and_cached(self, mock_fetch, test_db_connection, mock_steam_api):
+        """Test first lookup calls Steam once, later lookups use the cache"""
+        mock_fetch.return_value = [mock_steam_api['user_profile']]
+
+        first = profile_service.getPlayerProfile('76561197960287930')
+        second = profile_service.getPlayerProfile('76561197960287930')
+
+        assert first['personaname'] == 'Test User'
+        assert second == first
+        assert mock_fetch.call_count == 1
+
+    @patch('profile_service.scheduleProfileRefresh')
+    @patch('profile_service.fetchPlayerSummaries')
+    def test_stale_profile_served_and_queued(
+        self,
+        mock_fetch,
+        mock_schedule,
+        test_db_connection,
+        mock_steam_api
+    ):
+        """Test a stale profile is returned without waiting on Steam"""
+        steamId = '76561197960287930'
+        db_helper.cachePlayerSummaries([mock_steam_api['user_profile']])
+
+        with patch.object(profile_service, 'PROFILE_CACHE_TTL_HOURS', 0):
+            result = profile_service.getPlayerProfile(steamId)
+
+        assert result['personaname'] == 'Test User'
+        assert mock_fetch.call_count == 0
+        mock_schedule.assert_called_once_with(steamId)
+
+    @patch('profile_service.scheduleProfileRefresh')
+    @patch('profile_service.fetchPlayerSummaries')
+    def test_missing_profile_not_fetched_when_disabled(self, mock_fetch, mock_schedule, test_db_connection):
+        """Test fetchMissing=False queues a refresh instead of calling Steam"""
+        assert profile_service.getPlayerProfile('123', fetchMissing=False) is None
+        assert mock_fetch.call_count == 0
+        mock_schedule.assert_called_once_with('123')
+
+
+class TestBatchedProfileRefresh:
+    """Test batched GetPlayerSummaries refreshes"""
+
+    @patch('profile_service.fetchPlayerSummaries')
+    def test_refresh_batches_100_ids_per_call(self, mock_fetch, test_db_connection):
+        """Test 250 users take 3 calls"""
+        steamIds = [str(76561197960000000 + i) for i in range(250)]
+        mock_fetch.side_effect = lambda ids: [{'steamid': steamId, 'personaname': 'User'} for steamId in ids]
+
+        refreshed = profile_service.refreshPlayerSummaries(steamIds)
+
+        assert refreshed == 250
+        assert [len(call.args[0]) for call in mock_fetch.call_args_list] == [100, 100, 50]
+
+    @patch('profile_service.fetchPlayerSummaries')
+    def test_refresh_updates_user_row(self, mock_fetch, test_db_connection, sample_user_data):
+        """Test refreshed summaries update the stored display name and avatar"""
+        steamId = sample_user_data['steamId']
+        db_helper.saveUser(steamId, 'Old Name', 'old.jpg')
+        mock_fetch.return_value = [{'steamid': steamId, 'personaname': 'New Name', 'avatarfull': 'new.jpg'}]
+
+        assert db_helper.getStalePlayerSummaryIds(maxAgeHours=24, activeDays=7, limit=10) == [steamId]
+        profile_service.refreshActiveProfiles()
+
+        user = db_helper.getUser(steamId)
+        assert user['displayName'] == 'New Name'
+        assert user['avatarUrl'] == 'new.jpg'
+        assert db_helper.getStalePlayerSummaryIds(maxAgeHours=24, activeDays=7, limit=10) == []
+
+    @patch('profile_service.fetchPlayerSummaries')
+    def test_user_queued_during_flush_rescheduled(self, mock_fetch, test_db_connection):
+        """Test a user queued after the flush drained the queue, but before it finished, is still refreshed"""
+        import threading
+        import background_jobs
+
+        refreshedIds = []
+        secondRefresh = threading.Event()
+        realFlush = profile_service.flushProfileRefreshes
+
+        def fetch(ids):
+            refreshedIds.extend(ids)
+            if '2' in ids:
+                secondRefresh.set()
+            return []
+
+        def flushThenQueue():
+            refreshed = realFlush()
+            if not refreshedIds[1:]:
+                # The job key is still held, so this schedule is deduped
+                assert profile_service.scheduleProfileRefresh('2') is False
+            return refreshed
+
+        mock_fetch.side_effect = fetch
+
+        with patch.object(background_jobs, 'BACKGROUND_JOBS_ENABLED', True), \
+             patch.object(background_jobs, '_pendingJobs', set()), \
+             patch.object(profile_service, '_pendingRefreshIds', set()), \
+             patch('profile_service.flushProfileRefreshes', flushThenQueue):
+            assert profile_service.scheduleProfileRefresh('1') is True
+            assert secondRefresh.wait(timeout=5)
+
+        assert refreshedIds == ['1', '2']
@@ -0,0 +1,37 @@
+"""
+Unit tests for prompt token budgeting
+"""
+
+import sys
+import pytest
+from prompt_budget import PromptBudget, estimateTokens
+from pathlib import Path
+
+# Add backend to path
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+class TestPromptBudget:
+    """Test sections are trimmed to the budget"""
+
+    def test_fit_lines_keeps_ranked_prefix(self):
+        """Test lines are kept in order until the section cap is reached"""
+        budget = PromptBudget(totalTokens=100)
+        lines = [f"Game number {i}" for i in range(50)]
+
+        kept = budget.fitLines('games', lines, maxTokens=20)
+
+        assert kept == lines[:len(kept)]
+        assert 0 < len(kept) < len(lines)
+        assert budget.report()['games'] <= 20
+
+    def test_sections_share_total_budget(self):
+        """Test later sections only get what earlier ones left"""
+        budget = PromptBudget(totalTokens=50)
+        budget.add('template', 'x' * 160)
+
+        kept = budget.fitLines('ids', [str(100000 + i) for i in range(100)], separator=", ")
+
+        assert budget.report()['template'] == estimateTokens('x' * 160)
+        assert budget.report()['total'] <= 50
+        assert len(kept) < 100
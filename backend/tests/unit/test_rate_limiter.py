@@ -0,0 +1,102 @@
+"""
+Unit tests for the shared token-bucket rate limiter
+"""
+
+import sys
+import time
+import pytest
+from unittest.mock import patch, Mock
+import rate_limiter
+import steam_api
+from pathlib import Path
+
+# Add backend to path
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+class TestTokenBucket:
+    """Test token bucket accounting"""
+
+    @patch.dict(rate_limiter.BUCKETS, {'test_bucket': (3, 300)})
+    def test_tokens_run_out_at_capacity(self, test_db_connection):
+        """Test bucket allows capacity calls then refuses without waiting"""
+        for _ in range(3):
+            assert rate_limiter.acquireToken('test_bucket', maxWaitSeconds=0) is True
+
+        assert rate_limiter.acquireToken('test_bucket', maxWaitSeconds=0) is False
+
+    @patch.dict(rate_limiter.BUCKETS, {'test_bucket': (4, 300)})
+    def test_background_leaves_reserve_for_interactive(self, test_db_connection):
+        """Test background callers can't drain the interactive reserve"""
+        with patch.object(rate_limiter, 'RATE_LIMIT_BACKGROUND_RESERVE', 0.5):
+            assert rate_limiter.acquireToken('test_bucket', rate_limiter.PRIORITY_BACKGROUND, 0) is True
+            assert rate_limiter.acquireToken('test_bucket', rate_limiter.PRIORITY_BACKGROUND, 0) is True
+            assert rate_limiter.acquireToken('test_bucket', rate_limiter.PRIORITY_BACKGROUND, 0) is False
+
+            # Interactive callers still get the reserved tokens
+            assert rate_limiter.acquireToken('test_bucket', rate_limiter.PRIORITY_INTERACTIVE, 0) is True
+            assert rate_limiter.acquireToken('test_bucket', rate_limiter.PRIORITY_INTERACTIVE, 0) is True
+
+    @patch.dict(rate_limiter.BUCKETS, {'test_bucket': (10, 300)})
+    def test_retry_after_blocks_bucket(self, test_db_connection):
+        """Test a reported Retry-After blocks every caller"""
+        rate_limiter.reportRetryAfter('test_bucket', 60)
+
+        assert rate_limiter.acquireToken('test_bucket', maxWaitSeconds=1) is False
+
+
+class TestRetryAfterParsing:
+    """Test Retry-After header parsing"""
+
+    def test_parse_seconds(self):
+        """Test delay-seconds form"""
+        assert rate_limiter.parseRetryAfter('120') == 120
+
+    def test_parse_missing_header(self):
+        """Test missing header falls back to default"""
+        assert rate_limiter.parseRetryAfter(None, default=15) == 15
+
+    def test_parse_http_date(self):
+        """Test HTTP-date form"""
+        future = time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime(time.time() + 90))
+
+        assert 80 <= rate_limiter.parseRetryAfter(future) <= 91
+
+
+class TestSteamApiRateLimiting:
+    """Test Steam API calls go through the limiter"""
+
+    @patch('steam_api.acquireToken')
+    @patch('steam_api.requests.get')
+    def test_fetch_skipped_when_no_token(self, mock_get, mock_acquire):
+        """Test no request is sent when the limiter refuses a token"""
+        mock_acquire.return_value = False
+
+        result = steam_api.fetchGameDetailsWithRetry('292030')
+
+        assert result is None
+        assert mock_get.call_count == 0
+
+    @patch('steam_api.reportRetryAfter')
+    @patch('steam_api.acquireToken')
+    @patch('steam_api.requests.get')
+    def test_429_reports_retry_after(self, mock_get, mock_acquire, mock_report, mock_steam_api):
+        """Test a 429 blocks the shared bucket instead of sleeping locally"""
+        mock_acquire.return_value = True
+
+        limited = Mock()
+        limited.status_code = 429
+        limited.headers = {'Retry-After': '45'}
+
+        ok = Mock()
+        ok.status_code = 200
+        ok.json.return_value = {'292030': {'success': True, 'data': mock_steam_api['game_details']}}
+
+        mock_get.side_effect = [limited, ok]
+
+        with patch('steam_api.time.sleep') as mock_sleep:
+            result = steam_api.fetchGameDetailsWithRetry('292030')
+
+        assert result is not None
+        mock_report.assert_called_once_with(rate_limiter.STEAM_STORE_BUCKET, 45)
+        assert mock_sleep.call_count == 0
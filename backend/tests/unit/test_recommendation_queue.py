@@ -0,0 +1,109 @@
+"""
+Unit tests for the precomputed recommendation queue
+"""
+
+import sys
+import pytest
+from unittest.mock import patch
+import db_helper
+import recommendation_queue
+from pathlib import Path
+
+# Add backend to path
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+def makeRecommendation(gameId, title):
+    """Recommendation as returned by generateSmartRecommendation"""
+    return {
+        'game': {'gameId': gameId, 'title': title},
+        'reasoning': f'You will like {title}',
+        'matchScore': 90
+    }
+
+
+@pytest.fixture
+def queue_enabled():
+    """Keep two recommendations ready per selection"""
+    with patch.object(recommendation_queue, 'RECOMMENDATION_QUEUE_SIZE', 2):
+        yield
+
+
+class TestRecommendationQueue:
+    """Test queue refill, pop and invalidation"""
+
+    @patch('recommendation_queue.generateSmartRecommendation')
+    def test_refill_then_pop(self, mock_generate, test_db_connection, queue_enabled, sample_user_data):
+        """Test a refill fills the queue and pops come out oldest first"""
+        steamId = sample_user_data['steamId']
+        mock_generate.side_effect = [
+            makeRecommendation('570', 'Dota 2'),
+            makeRecommendation('730', 'Counter-Strike 2')
+        ]
+
+        assert recommendation_queue.refillQueue(steamId, ['Action', 'RPG']) == 2
+        # Already-queued games are excluded from the second generation
+        assert '570' in mock_generate.call_args_list[1].kwargs['excludeGameIds']
+
+        # Genre order and case don't matter
+        first = recommendation_queue.popRecommendation(steamId, ['rpg', 'action'])
+        second = recommendation_queue.popRecommendation(steamId, ['Action', 'RPG'])
+
+        assert first['game']['gameId'] == '570'
+        assert second['game']['gameId'] == '730'
+        assert recommendation_queue.popRecommendation(steamId, ['Action', 'RPG']) is None
+
+    @patch('recommendation_queue.generateSmartRecommendation')
+    def test_full_queue_skips_generation(self, mock_generate, test_db_connection, queue_enabled, sample_user_data):
+        """Test no AI work is done while the queue is full"""
+        steamId = sample_user_data['steamId']
+        db_helper.enqueueRecommendation(steamId, 'action', makeRecommendation('570', 'Dota 2'))
+        db_helper.enqueueRecommendation(steamId, 'action', makeRecommendation('730', 'Counter-Strike 2'))
+
+        assert recommendation_queue.refillQueue(steamId, ['Action']) == 0
+        assert mock_generate.call_count == 0
+
+    def test_invalidate_drops_every_selection(self, test_db_connection, queue_enabled, sample_user_data):
+        """Test a library or dislike change empties the user's queues"""
+        steamId = sample_user_data['steamId']
+        db_helper.enqueueRecommendation(steamId, 'action', makeRecommendation('570', 'Dota 2'))
+        db_helper.enqueueRecommendation(steamId, 'rpg', makeRecommendation('292030', 'The Witcher 3'))
+
+        assert recommendation_queue.invalidateQueue(steamId) == 2
+        assert recommendation_queue.popRecommendation(steamId, ['Action']) is None
+
+    @patch('recommendation_queue.generateSmartRecommendation')
+    def test_refill_discarded_after_invalidation(self, mock_generate, test_db_connection, queue_enabled, sample_user_data):
+        """Test picks generated before an invalidation are not queued"""
+        steamId = sample_user_data['steamId']
+
+        def generateThenInvalidate(**kwargs):
+            recommendation_queue.invalidateQueue(steamId)
+            return makeRecommendation('570', 'Dota 2')
+        mock_generate.side_effect = generateThenInvalidate
+
+        assert recommendation_queue.refillQueue(steamId, ['Action']) == 0
+        assert db_helper.getQueuedGameIds(steamId) == []
+
+    def test_invalidation_seen_across_workers(self, test_db_connection, queue_enabled, sample_user_data):
+        """Test a pick generated before another worker invalidated the queue is not queued"""
+        steamId = sample_user_data['steamId']
+        generation = db_helper.getQueueGeneration(steamId)
+
+        # Another worker drops the queue (only the DB is shared)
+        db_helper.clearRecommendationQueue(steamId)
+
+        assert db_helper.enqueueRecommendation(steamId, 'action', makeRecommendation('570', 'Dota 2'), generation) is False
+        assert db_helper.getQueuedGameIds(steamId) == []
+
+    def test_ineligible_entries_skipped_on_pop(self, test_db_connection, queue_enabled, sample_user_data, mock_steam_api):
+        """Test a queued game the user has since bought is dropped and the next one served"""
+        steamId = sample_user_data['steamId']
+        db_helper.enqueueRecommendation(steamId, 'action', makeRecommendation('292030', 'The Witcher 3'))
+        db_helper.enqueueRecommendation(steamId, 'action', makeRecommendation('570', 'Dota 2'))
+        db_helper.cacheOwnedGames(steamId, mock_steam_api['owned_games'])
+
+        recommendation = recommendation_queue.popRecommendation(steamId, ['Action'])
+
+        assert recommendation['game']['gameId'] == '570'
+        assert db_helper.getQueuedGameIds(steamId) == []
@@ -0,0 +1,128 @@
+"""
+Unit tests for record/replay of Steam and Gemini traffic
+"""
+
+import sys
+import json
+import threading
+import pytest
+from unittest.mock import patch, Mock
+import steam_api
+import record_replay
+from replay_server import createReplayServer
+from pathlib import Path
+
+# Add backend to path
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+@pytest.fixture
+def replay_dir(tmp_path):
+    """Record into a temporary fixtures directory"""
+    with patch.object(record_replay, 'RECORDINGS_DIR', str(tmp_path)):
+        yield tmp_path
+
+
+@pytest.fixture
+def recorded_game(replay_dir, test_db_connection, mock_steam_api):
+    """Record one appdetails exchange through steam_api"""
+    payload = {'292030': {'success': True, 'data': mock_steam_api['game_details']}}
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.headers = {}
+    mock_response.text = json.dumps(payload)
+    mock_response.json.return_value = payload
+    mock_response.raise_for_status = Mock()
+
+    with patch.object(record_replay, 'RECORD_MODE', True), \
+         patch('steam_api.requests.get', return_value=mock_response):
+        steam_api.fetchGameDetails('292030')
+
+    return replay_dir
+
+
+def startReplayServer(directory, profile):
+    """Run a replay server on a free port"""
+    server = createReplayServer(port=0, directory=str(directory), profile=profile)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class TestSteamRecordReplay:
+    """Test recording Steam responses and replaying them from the stand-in server"""
+
+    def test_recording_drops_api_key(self, replay_dir):
+        """Test recorded keys never contain the Steam API key"""
+        key = record_replay.requestKey('/ISteamUser/GetPlayerSummaries/v0002/', {'key': 'secret', 'steamids': '1'})
+
+        assert 'secret' not in key
+        assert key == '/ISteamUser/GetPlayerSummaries/v0002/?steamids=1'
+
+    def test_replayed_game_details_match_recording(self, recorded_game):
+        """Test steam_api gets the recorded response from the stand-in server"""
+        server, url = startReplayServer(recorded_game, record_replay.ReplayProfile('none'))
+
+        try:
+            with patch.object(steam_api, 'STEAM_STORE_API', f"{url}/api"):
+                result = steam_api.fetchGameDetails('292030')
+        finally:
+            server.shutdown()
+
+        assert result is not None
+        assert result['name'] == 'The Witcher 3: Wild Hunt'
+
+    def test_injected_errors(self, recorded_game):
+        """Test the configured error rate turns responses into 503s"""
+        server, url = startReplayServer(recorded_game, record_replay.ReplayProfile('none', errorRate=1.0))
+
+        try:
+            with patch.object(steam_api, 'STEAM_STORE_API', f"{url}/api"):
+                result = steam_api.fetchGameDetails('292030')
+        finally:
+            server.shutdown()
+
+        assert result is None
+
+
+class TestReplayProfile:
+    """Test latency distributions"""
+
+    def test_seeded_lognormal_is_reproducible(self):
+        """Test the same seed gives the same latencies"""
+        first = record_replay.ReplayProfile('lognormal:100:0.5', seed=7)
+        second = record_replay.ReplayProfile('lognormal:100:0.5', seed=7)
+
+        assert [first.sampleLatencyMs() for _ in range(5)] == [second.sampleLatencyMs() for _ in range(5)]
+
+    def test_recorded_and_fixed_latency(self):
+        """Test recorded timings and fixed latency"""
+        assert record_replay.ReplayProfile('recorded').sampleLatencyMs(42.0) == 42.0
+        assert record_replay.ReplayProfile('fixed:15').sampleLatencyMs(42.0) == 15.0
+
+    def test_invalid_spec(self):
+        """Test unknown latency specs are rejected"""
+        with pytest.raises(ValueError):
+            record_replay.ReplayProfile('uniform:1:2')
+
+
+class TestLLMReplay:
+    """Test the replay LLM provider"""
+
+    def test_replay_provider_serves_recorded_response(self, replay_dir, sample_gaming_profile):
+        """Test discoverGame works offline from recorded Gemini output"""
+        from llm_handler import LLMHandler
+
+        recorded = {'gameId': '1145360', 'title': 'Hades', 'reasoning': 'Fast combat.', 'matchScore': 90}
+        record_replay.recordExchange(
+            record_replay.GEMINI_SERVICE,
+            'some-other-prompt',
+            {'text': json.dumps(recorded)},
+            elapsedMs=1200
+        )
+
+        with patch.dict('os.environ', {'LLM_REPLAY_LATENCY': 'none'}):
+            handler = LLMHandler(provider='replay')
+        result = handler.discoverGame(sample_gaming_profile, ['Action'], set())
+
+        assert result['gameId'] == '1145360'
+        assert result['title'] == 'Hades'
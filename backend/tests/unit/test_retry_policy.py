@@ -0,0 +1,101 @@
+"""
+Unit tests for the shared retry policy
+"""
+
+import sys
+import pytest
+from unittest.mock import patch, Mock
+import requests
+import steam_api
+from retry_policy import (
+    RetryBudget,
+    RetryPolicy,
+    STEAM_WEB_API_RETRY,
+    isRetryableStatus,
+    isRetryableError,
+)
+from pathlib import Path
+
+# Add backend to path
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+class TestErrorClassification:
+    """Test which failures are retried"""
+
+    def test_statuses(self):
+        """Test throttling and server errors are retryable, client errors are not"""
+        assert isRetryableStatus(429)
+        assert isRetryableStatus(503)
+        assert not isRetryableStatus(404)
+        assert not isRetryableStatus(501)
+
+    def test_exceptions(self):
+        """Test timeouts and connection errors are retryable, bugs are not"""
+        assert isRetryableError(requests.exceptions.ReadTimeout())
+        assert isRetryableError(requests.exceptions.ConnectionError())
+        assert isRetryableError(TimeoutError())
+        assert not isRetryableError(ValueError())
+        assert not isRetryableError(requests.exceptions.InvalidURL())
+
+
+class TestBackoffAndBudget:
+    """Test jittered backoff and retry budgets"""
+
+    def test_full_jitter_bounds(self):
+        """Test delays stay between 0 and the capped exponential"""
+        policy = RetryPolicy('test', baseDelaySeconds=1.0, maxDelaySeconds=3.0)
+
+        for attempt in range(6):
+            delay = policy.backoffSeconds(attempt)
+            assert 0 <= delay <= min(3.0, 2 ** attempt)
+
+    def test_budget_caps_retries(self):
+        """Test retries stop once the budget is spent and resume with new traffic"""
+        budget = RetryBudget(ratio=0.5, maxTokens=2)
+
+        assert budget.tryRetry()
+        assert budget.tryRetry()
+        assert not budget.tryRetry()
+
+        budget.recordAttempt()
+        budget.recordAttempt()
+        assert budget.tryRetry()
+
+    def test_max_attempts(self):
+        """Test no retry after the last attempt"""
+        policy = RetryPolicy('test', maxAttempts=2, baseDelaySeconds=0)
+
+        assert policy.retryAfterFailure(0)
+        assert not policy.retryAfterFailure(1)
+
+
+class TestSteamWebApiRetries:
+    """Test Steam Web API calls use the shared policy"""
+
+    @patch('steam_api.requests.get')
+    def test_owned_games_retried_after_503(self, mock_get, mock_steam_api):
+        """Test a transient 503 is retried once"""
+        unavailable = Mock()
+        unavailable.status_code = 503
+        ok = Mock()
+        ok.status_code = 200
+        ok.json.return_value = {'response': {'games': mock_steam_api['owned_games']}}
+
+        mock_get.side_effect = [unavailable, ok]
+
+        result = steam_api.fetchUserOwnedGames('76561197960287930')
+
+        assert len(result) == len(mock_steam_api['owned_games'])
+        assert mock_get.call_count == 2
+
+    @patch('steam_api.requests.get')
+    def test_exhausted_budget_stops_retries(self, mock_get):
+        """Test an outage costs one request per call once the budget is gone"""
+        mock_get.side_effect = requests.exceptions.ConnectTimeout
+
+        with patch.object(STEAM_WEB_API_RETRY, 'budget', RetryBudget(ratio=0, maxTokens=0)):
+            for _ in range(3):
+                assert steam_api.fetchRecentlyPlayedGames('76561197960287930') is None
+
+        assert mock_get.call_count == 3
@@ -0,0 +1,100 @@
+"""
+Unit tests for single-flight request coalescing
+"""
+
+import sys
+import time
+import threading
+import pytest
+from unittest.mock import patch, Mock
+import db_helper
+import single_flight
+from pathlib import Path
+
+# Add backend to path
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+class TestInProcessCoalescing:
+    """Test concurrent callers in one process share a fetch"""
+
+    def test_concurrent_callers_share_one_fetch(self):
+        """Test only one fetch runs for many concurrent callers"""
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(2)
+            return {'name': 'Dota 2'}
+
+        results = []
+
+        def caller():
+            results.append(single_flight.singleFlight('appdetails:570', fetch))
+
+        leader = threading.Thread(target=caller)
+        leader.start()
+        started.wait(2)
+
+        followers = [threading.Thread(target=caller) for _ in range(4)]
+        for thread in followers:
+            thread.start()
+
+        time.sleep(0.1)
+        release.set()
+
+        for thread in [leader] + followers:
+            thread.join(2)
+
+        assert len(calls) == 1
+        assert results == [{'name': 'Dota 2'}] * 5
+
+    def test_sequential_callers_fetch_again(self):
+        """Test a finished fetch is not reused by later callers"""
+        fetch = Mock(return_value={'name': 'Dota 2'})
+
+        single_flight.singleFlight('appdetails:570', fetch)
+        single_flight.singleFlight('appdetails:570', fetch)
+
+        assert fetch.call_count == 2
+
+    def test_leader_error_propagates(self):
+        """Test fetch errors are raised to the caller"""
+        fetch = Mock(side_effect=RuntimeError('boom'))
+
+        with pytest.raises(RuntimeError):
+            single_flight.singleFlight('appdetails:570', fetch)
+
+
+class TestCrossWorkerLease:
+    """Test lease rows coalesce fetches across workers"""
+
+    def test_lease_is_exclusive(self, test_db_connection):
+        """Test a second owner can't take an unexpired lease"""
+        assert db_helper.acquireFetchLease('appdetails:570', 'worker-a', 30) is True
+        assert db_helper.acquireFetchLease('appdetails:570', 'worker-b', 30) is False
+
+        db_helper.releaseFetchLease('appdetails:570', 'worker-a')
+
+        assert db_helper.acquireFetchLease('appdetails:570', 'worker-b', 30) is True
+
+    def test_expired_lease_can_be_taken(self, test_db_connection):
+        """Test a lease left by a crashed worker expires"""
+        assert db_helper.acquireFetchLease('appdetails:570', 'worker-a', -1) is True
+        assert db_helper.acquireFetchLease('appdetails:570', 'worker-b', 30) is True
+
+    def test_waits_for_other_worker_result(self, test_db_connection):
+        """Test a caller reads the result stored by the lease holder"""
+        db_helper.acquireFetchLease('appdetails:570', 'other-worker', 5)
+
+        fetch = Mock(return_value={'name': 'fetched'})
+        lookup = Mock(side_effect=[None, {'name': 'from cache'}])
+
+        with patch.object(single_flight, 'SINGLE_FLIGHT_POLL_SECONDS', 0.01):
+            result = single_flight.singleFlight('appdetails:570', fetch, lookup, leaseSeconds=5)
+
+        assert result == {'name': 'from cache'}
+        assert fetch.call_count == 0
@@ -33,6 +33,25 @@ class TestGameDetailsFetching:
         assert result is not None
         assert result['name'] == 'The Witcher 3: Wild Hunt'
         assert result['steam_appid'] == 292030
+
+    @patch('steam_api.requests.get')
+    def test_fetch_game_details_trimmed(self, mock_get, mock_steam_api):
+        """Test appdetails is requested with filters and unused fields are dropped"""
+        mock_response = Mock()
+        mock_response.json.return_value = {
+            '292030': {
+                'success': True,
+                'data': dict(mock_steam_api['game_details'], pc_requirements={'minimum': '...'})
+            }
+        }
+        mock_response.raise_for_status = Mock()
+        mock_get.return_value = mock_response
+
+        result = steam_api.fetchGameDetails('292030')
+
+        assert mock_get.call_args.kwargs['params']['filters'] == steam_api.STEAM_STORE_FILTERS
+        assert 'pc_requirements' not in result
+        assert result['price_overview']['final'] == 999
     
     @patch('steam_api.requests.get')
     def test_fetch_game_details_not_found(self, mock_get):
@@ -75,6 +94,29 @@ class TestGameDetailsFetching:
         assert result is not None
         assert mock_get.call_count == 1
 
+    @patch('steam_api.requests.get')
+    def test_fetch_price_overviews_multiple_appids(self, mock_get):
+        """Test one request returns prices for many games"""
+        price = {'currency': 'USD', 'initial': 1999, 'final': 999, 'discount_percent': 50}
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            '10': {'success': True, 'data': {'price_overview': price}},
+            '20': {'success': True, 'data': []},
+            '30': {'success': False}
+        }
+        mock_response.raise_for_status = Mock()
+        mock_get.return_value = mock_response
+
+        result = steam_api.fetchPriceOverviews(['10', '20', '30'])
+
+        assert mock_get.call_count == 1
+        params = mock_get.call_args.kwargs['params']
+        assert params['appids'] == '10,20,30'
+        assert params['filters'] == 'price_overview'
+        # Free game maps to None, unknown game is skipped
+        assert result == {'10': price, '20': None}
+
 
 class TestUserDataFetching:
     """Test fetching user data from Steam API"""
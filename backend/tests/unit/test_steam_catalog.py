@@ -0,0 +1,100 @@
+"""
+Unit tests for the local Steam app catalog
+"""
+
+import sys
+import json
+import pytest
+from unittest.mock import patch, Mock
+import steam_catalog
+from game_recommender import GameRecommender
+from pathlib import Path
+
+# Add backend to path
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+@pytest.fixture
+def app_list_file(tmp_path):
+    """GetAppList dump on disk"""
+    path = tmp_path / "applist.json"
+    path.write_text(json.dumps({
+        'applist': {
+            'apps': [
+                {'appid': 570, 'name': 'Dota 2'},
+                {'appid': 292030, 'name': 'The Witcher 3: Wild Hunt'},
+                {'appid': 12345, 'name': ''}
+            ]
+        }
+    }))
+    return str(path)
+
+
+class TestCatalogIngest:
+    """Test loading app list dumps"""
+
+    def test_load_app_list_skips_unnamed_apps(self, app_list_file):
+        """Test unnamed apps are dropped and titles normalized"""
+        rows = steam_catalog.loadAppList(app_list_file)
+
+        assert ('570', 'Dota 2', 'dota2') in rows
+        assert len(rows) == 2
+
+    def test_ingest_app_list(self, test_db_connection, app_list_file):
+        """Test ingest stores apps in the catalog table"""
+        count = steam_catalog.ingestAppList(app_list_file)
+
+        assert count == 2
+        assert steam_catalog.checkCatalogTitle('292030', 'The Witcher 3') is True
+
+
+class TestCatalogValidation:
+    """Test appid/title checks against the catalog"""
+
+    def test_mismatch_and_unknown(self, test_db_connection, app_list_file):
+        """Test mismatched titles fail and unknown apps defer to Steam"""
+        steam_catalog.ingestAppList(app_list_file)
+
+        assert steam_catalog.checkCatalogTitle('570', 'Team Fortress 2') is False
+        assert steam_catalog.checkCatalogTitle('440', 'Team Fortress 2') is None
+
+    def test_titles_without_ascii_defer_to_steam(self):
+        """Test titles that normalize to nothing are unknown rather than a mismatch"""
+        assert steam_catalog.titlesMatch('東方紅魔郷', 'Touhou Koumakyou') is None
+        assert steam_catalog.titlesMatch('Dota 2', '') is None
+        assert steam_catalog.titlesMatch('Dota 2', 'Dota 2') is True
+
+    @patch('background_jobs.fetchGameDetailsWithRetry')
+    @patch('game_recommender.getLLMHandler')
+    def test_recommender_skips_steam_on_catalog_mismatch(
+        self,
+        mock_get_llm,
+        mock_fetch,
+        test_db_connection,
+        app_list_file,
+        sample_gaming_profile
+    ):
+        """Test a catalog mismatch is rejected without a Steam fetch"""
+        steam_catalog.ingestAppList(app_list_file)
+
+        mock_llm = Mock()
+        mock_llm.discoverGames.return_value = [{
+            'gameId': '570',
+            'title': 'Team Fortress 2',
+            'reasoning': 'Great shooter',
+            'matchScore': 80
+        }]
+        mock_get_llm.return_value = mock_llm
+
+        excludeGameIds = set()
+        result = GameRecommender().generateRecommendation(
+            gamingProfile=sample_gaming_profile,
+            requestedGenres=[],
+            excludeGameIds=excludeGameIds,
+            logPrefix='Test',
+            maxRetries=1
+        )
+
+        assert result is None
+        assert mock_fetch.call_count == 0
+        assert '570' in excludeGameIds